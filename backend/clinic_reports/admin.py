@@ -2,13 +2,18 @@ from django.contrib import admin
 from .models import ClinicReport, Sport, HealthcareProvider
 from django.http import HttpResponse
 from django.utils import timezone
-import openpyxl
+
+from core.query_budget import StatementTimeoutChangeListMixin
+from core.replica import ReplicaChangeListMixin
 
 
 def export_raw_data_to_excel(modeladmin, request, queryset):
     """
     Downloads selected rows as an Excel file from the admin portal.
     """
+    # Imported here so admin autodiscovery at worker boot does not load openpyxl.
+    import openpyxl
+
     # Create a virtual workbook and sheet
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -65,7 +70,7 @@ def export_raw_data_to_excel(modeladmin, request, queryset):
 export_raw_data_to_excel.short_description = "Export selected records to Excel"
 
 @admin.register(ClinicReport)
-class ClinicReportAdmin(admin.ModelAdmin):
+class ClinicReportAdmin(ReplicaChangeListMixin, StatementTimeoutChangeListMixin, admin.ModelAdmin):
     list_display = ('first_name', 'last_name', 'sport', 'created_at')
     search_fields = ('first_name', 'last_name', 'email')
     list_filter = ('sport', 'created_at')
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ClinicReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinic_reports'
+
+    def ready(self):
+        """Import signal handlers and system checks so they are registered at startup."""
+        import clinic_reports.checks  # noqa: F401
+        import clinic_reports.signals  # noqa: F401
@@ -0,0 +1,104 @@
+"""Load many ClinicReport rows at once with Postgres COPY.
+
+Used by the bulk management commands. Rows are plain tuples in
+``REPORT_COLUMNS`` order with the term (semester and year) already set,
+because COPY, like bulk_create, never calls ``ClinicReport.save()``.
+``load_reports`` stamps ``updated_at`` itself when the rows are written.
+"""
+import csv
+import io
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import ClinicReport
+from .reporting import CARE_COUNT_FIELDS, UPSERT_UPDATE_FIELDS, one_report_per_week
+
+# Model attribute names, in the order each row tuple supplies them.
+REPORT_COLUMNS = (
+    'first_name', 'last_name', 'email', 'sport_id',
+    *CARE_COUNT_FIELDS,
+    'interacted_hcps', 'healthcare_provider_id',
+    'created_at', 'semester', 'year', 'week',
+)
+
+STAGING_TABLE = 'clinic_report_bulk_staging'
+
+
+def column_names(model, names):
+    """Return the database columns for model field names or attnames (e.g. ``sport_id``)."""
+    columns = {}
+    for field in model._meta.concrete_fields:
+        columns[field.name] = columns[field.attname] = field.column
+    return [columns[name] for name in names]
+
+
+def _column(name):
+    """Return the database column for a ClinicReport field name or attname."""
+    return column_names(ClinicReport, [name])[0]
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Stream rows into table with one COPY ... FROM STDIN statement.
+
+    ``None`` is written as an unquoted empty field, which COPY reads as NULL.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    quote = cursor.db.ops.quote_name
+    cursor.copy_expert(
+        f'COPY {quote(table)} ({", ".join(quote(column) for column in columns)}) '
+        'FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+
+
+def load_reports(rows, using='default'):
+    """Insert report rows with COPY and return how many were sent.
+
+    When CLINIC_REPORTS_ONE_REPORT_PER_WEEK is on, rows go through a staging
+    table and an INSERT ... ON CONFLICT DO UPDATE on the weekly natural key,
+    so the newest row per key wins just like a resubmission. Imported rows
+    replace existing reports, except ones written after this chunk was
+    stamped (a submission made while the chunk loads). Call inside a
+    transaction so a failed chunk leaves nothing behind.
+    """
+    if not rows:
+        return 0
+    connection = connections[using]
+    table = ClinicReport._meta.db_table
+    columns = column_names(ClinicReport, [*REPORT_COLUMNS, 'updated_at'])
+    # Stamped at write time rather than parse time, so the change feed's
+    # safety lag only has to cover this chunk's transaction.
+    updated_at = timezone.now().isoformat()
+    rows = [(*row, updated_at) for row in rows]
+
+    with connection.cursor() as cursor:
+        if not one_report_per_week():
+            copy_rows(cursor, table, columns, rows)
+            return len(rows)
+
+        quote = connection.ops.quote_name
+        column_list = ', '.join(quote(column) for column in columns)
+        key_list = ', '.join(quote(_column(name)) for name in ClinicReport.NATURAL_KEY_FIELDS)
+        updates = ', '.join(
+            f'{quote(_column(name))} = EXCLUDED.{quote(_column(name))}' for name in UPSERT_UPDATE_FIELDS
+        )
+        updated_at_column = quote(_column('updated_at'))
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {quote(STAGING_TABLE)} ON COMMIT DROP AS '
+            f'SELECT {column_list} FROM {quote(table)} WITH NO DATA'
+        )
+        copy_rows(cursor, STAGING_TABLE, columns, rows)
+        # Postgres cannot update one row twice per statement: keep the newest row per key.
+        cursor.execute(
+            f'INSERT INTO {quote(table)} ({column_list}) '
+            f'SELECT DISTINCT ON ({key_list}) {column_list} FROM {quote(STAGING_TABLE)} '
+            f'ORDER BY {key_list}, {quote(_column("created_at"))} DESC '
+            f'ON CONFLICT ({key_list}) DO UPDATE SET {updates} '
+            # Leave reports written after the stamp alone rather than reverting them.
+            f'WHERE EXCLUDED.{updated_at_column} >= {quote(table)}.{updated_at_column}'
+        )
+        cursor.execute(f'TRUNCATE {quote(STAGING_TABLE)}')
+    return len(rows)
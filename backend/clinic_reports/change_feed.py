@@ -0,0 +1,126 @@
+"""Incremental feed of clinic report changes for BI consumers.
+
+Instead of re-reading the whole table, a consumer passes the watermark it
+got from its previous pull and receives only the reports inserted or edited
+since then (by ``updated_at``) and the reports deleted since then (from
+``ClinicReportTombstone``), each in keyset order, followed by the next
+watermark.
+
+``updated_at`` is set when a row is written, not when its transaction
+commits, so rows newer than a safety lag are held back until the next pull;
+otherwise a slow transaction could commit a row behind a consumer's
+watermark and it would never be sent.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ClinicReport, ClinicReportTombstone
+from .reporting import CARE_COUNT_FIELDS
+
+DEFAULT_SAFETY_LAG_SECONDS = 60
+# Rows of each kind (changes, deletions) returned by one pull at most.
+DEFAULT_LIMIT = 50000
+# Rows fetched per keyset query while streaming.
+PAGE_SIZE = 1000
+
+FEED_FIELDS = (
+    'id', 'created_at', 'updated_at', 'first_name', 'last_name', 'email', 'sport_name',
+    'semester', 'year', 'week', *CARE_COUNT_FIELDS, 'interacted_hcps', 'healthcare_provider_name',
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class Watermark(namedtuple('Watermark', 'updated_at report_id deleted_at tombstone_id')):
+    """Position of a consumer in both keyset streams, passed around as an opaque token."""
+
+    def encode(self):
+        """Return the watermark as a URL-safe token."""
+        raw = json.dumps([self.updated_at.isoformat(), self.report_id, self.deleted_at.isoformat(), self.tombstone_id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, token):
+        """Parse a token from encode(); an empty token means "from the beginning".
+
+        Raises ValueError for anything that is not a valid token.
+        """
+        if not token:
+            return cls(_EPOCH, 0, _EPOCH, 0)
+        try:
+            updated_at, report_id, deleted_at, tombstone_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return cls(
+                datetime.fromisoformat(updated_at), int(report_id),
+                datetime.fromisoformat(deleted_at), int(tombstone_id),
+            )
+        except (TypeError, ValueError, UnicodeError) as error:
+            raise ValueError('Invalid watermark') from error
+
+
+def _keyset(queryset, time_field, after_time, after_id, cutoff, limit):
+    """Yield rows after ``(after_time, after_id)`` and before cutoff in (time, id) order, at most limit."""
+    queryset = queryset.filter(**{f'{time_field}__lt': cutoff}).order_by(time_field, 'id')
+    remaining = limit
+    while remaining > 0:
+        page = list(queryset.filter(
+            Q(**{f'{time_field}__gt': after_time}) | Q(**{time_field: after_time, 'id__gt': after_id})
+        )[:min(PAGE_SIZE, remaining)])
+        yield from page
+        if len(page) < PAGE_SIZE:
+            return
+        remaining -= len(page)
+        after_time, after_id = page[-1][time_field], page[-1]['id']
+
+
+def changes_since(watermark, limit=DEFAULT_LIMIT, now=None):
+    """Yield the feed records after watermark.
+
+    Records are ``{'op': 'upsert', 'report': {...}}`` for each inserted or
+    edited report, then ``{'op': 'delete', 'id': ..., 'deleted_at': ...}`` for
+    each deletion, and finally ``{'watermark': ..., 'has_more': ...}``. When
+    has_more is true the consumer should pull again right away.
+    """
+    lag = getattr(settings, 'CHANGE_FEED_SAFETY_LAG_SECONDS', DEFAULT_SAFETY_LAG_SECONDS)
+    cutoff = (now or timezone.now()) - timedelta(seconds=lag)
+    updated_at, report_id, deleted_at, tombstone_id = watermark
+
+    reports = ClinicReport.objects.annotate(
+        sport_name=F('sport__name'),
+        healthcare_provider_name=F('healthcare_provider__name'),
+    ).values(*FEED_FIELDS)
+    sent = 0
+    for report in _keyset(reports, 'updated_at', updated_at, report_id, cutoff, limit):
+        sent += 1
+        updated_at, report_id = report['updated_at'], report['id']
+        report['sport'] = report.pop('sport_name')
+        report['healthcare_provider'] = report.pop('healthcare_provider_name')
+        yield {'op': 'upsert', 'report': report}
+    has_more = sent >= limit
+
+    tombstones = ClinicReportTombstone.objects.values('id', 'report_id', 'deleted_at')
+    sent = 0
+    for tombstone in _keyset(tombstones, 'deleted_at', deleted_at, tombstone_id, cutoff, limit):
+        sent += 1
+        deleted_at, tombstone_id = tombstone['deleted_at'], tombstone['id']
+        yield {'op': 'delete', 'id': tombstone['report_id'], 'deleted_at': tombstone['deleted_at']}
+    has_more = has_more or sent >= limit
+
+    yield {
+        'watermark': Watermark(updated_at, report_id, deleted_at, tombstone_id).encode(),
+        'has_more': has_more,
+    }
+
+
+def json_lines(records):
+    """Encode records as newline-delimited JSON, one bytes line per record."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in records:
+        yield (encoder.encode(record) + '\n').encode()
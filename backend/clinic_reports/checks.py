@@ -0,0 +1,36 @@
+from django.core.checks import Error, Tags, register
+from django.db import connections, router
+
+from .models import ClinicReport
+from .reporting import natural_key_index_valid, one_report_per_week
+
+
+@register(Tags.database)
+def check_natural_key_index(app_configs, databases=None, **kwargs):
+    """Refuse CLINIC_REPORTS_ONE_REPORT_PER_WEEK while the natural-key unique index is missing or invalid.
+
+    Resubmissions are upserted with ON CONFLICT on that index, which only
+    ``remove_superseded_reports --enforce`` creates. Runs with the other
+    database checks (``check --database``, ``migrate``, ``migrate_if_needed``).
+    """
+    if not databases or not one_report_per_week():
+        return []
+    alias = router.db_for_write(ClinicReport)
+    if alias not in databases:
+        return []
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        # Before the first migrate there is nothing to check yet; migrate_if_needed checks again afterwards.
+        if ClinicReport._meta.db_table not in connection.introspection.table_names(cursor):
+            return []
+    valid = natural_key_index_valid(connection)
+    if valid:
+        return []
+    state = 'does not exist' if valid is None else 'is invalid (an earlier build failed)'
+    return [Error(
+        f'CLINIC_REPORTS_ONE_REPORT_PER_WEEK is on, but the unique index '
+        f'{ClinicReport.NATURAL_KEY_INDEX_NAME} {state}.',
+        hint='Run "manage.py remove_superseded_reports --enforce" first, or turn the setting off.',
+        obj='clinic_reports.ClinicReport',
+        id='clinic_reports.E001',
+    )]
@@ -0,0 +1,114 @@
+"""Idempotency-Key support for the report submission endpoints.
+
+Clients send an ``Idempotency-Key`` header that stays the same across
+retries of one logical submission. The first successful response is stored
+with the key; a retry within the window gets that response back without
+inserting the report again.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# How long (seconds) a stored response is replayed for the same key.
+DEFAULT_IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+
+
+def idempotency_window():
+    """Return the replay window as a timedelta."""
+    return timedelta(seconds=getattr(
+        settings, 'IDEMPOTENCY_KEY_TTL_SECONDS', DEFAULT_IDEMPOTENCY_KEY_TTL_SECONDS
+    ))
+
+
+def _request_hash(request):
+    """Fingerprint the request path and body so a reused key with a new payload is detected."""
+    digest = hashlib.sha256(request.path.encode())
+    digest.update(b'\n')
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _stored_response(user, key, request_hash):
+    """Return the replayed response for key, or None if there is no live stored response."""
+    stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if stored is None:
+        return None
+
+    if stored.created_at < timezone.now() - idempotency_window():
+        # Expired but not purged yet: free the key so this request can reuse it.
+        stored.delete()
+        return None
+
+    if stored.request_hash != request_hash:
+        return JsonResponse(
+            {'success': False, 'error': 'This Idempotency-Key was already used for a different request'},
+            status=422,
+        )
+
+    response = JsonResponse(stored.response_body, status=stored.response_status)
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """Make a JSON submission view replay its first successful response for a repeated key.
+
+    Requests without the header, and anonymous requests, go straight to the
+    view. Only successful responses are stored, so a client can fix a
+    validation error and retry with the same key.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'success': False, 'error': f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters'},
+                status=400,
+            )
+
+        request_hash = _request_hash(request)
+        replay = _stored_response(request.user, key, request_hash)
+        if replay is not None:
+            return replay
+
+        try:
+            # The report insert and the key row commit together, so a stored
+            # response always corresponds to a saved report.
+            with transaction.atomic():
+                response = view_func(request, *args, **kwargs)
+                if 200 <= response.status_code < 300:
+                    IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        request_hash=request_hash,
+                        response_status=response.status_code,
+                        response_body=json.loads(response.content),
+                    )
+        except IntegrityError:
+            # A concurrent retry with the same key committed first; replay its response.
+            replay = _stored_response(request.user, key, request_hash)
+            if replay is not None:
+                return replay
+            return JsonResponse(
+                {'success': False, 'error': 'A request with this Idempotency-Key is already in progress'},
+                status=409,
+            )
+        return response
+
+    return _wrapped_view
@@ -0,0 +1,55 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic_reports import change_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the clinic reports inserted, edited or deleted since a watermark as JSON '
+        'lines, ending with the next watermark. Pass --state-file to have the command '
+        'remember the watermark between nightly runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='File to write, or - for standard output.')
+        parser.add_argument('--since', help='Watermark from the previous pull (default: read --state-file).')
+        parser.add_argument(
+            '--state-file',
+            help='File holding the last watermark; read when --since is not given and updated after a run.',
+        )
+
+    def handle(self, *args, **options):
+        """Write every change after the watermark, then save the new watermark."""
+        since = options['since']
+        state_file = options['state_file']
+        if since is None and state_file and os.path.exists(state_file):
+            with open(state_file) as state:
+                since = state.read().strip()
+        try:
+            watermark = change_feed.Watermark.decode(since or '')
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        target = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            # Each pull returns at most DEFAULT_LIMIT rows of each kind; keep pulling until caught up.
+            has_more = True
+            while has_more:
+                for record in change_feed.changes_since(watermark):
+                    if 'watermark' in record:
+                        watermark = change_feed.Watermark.decode(record['watermark'])
+                        has_more = record['has_more']
+                    else:
+                        target.writelines(change_feed.json_lines([record]))
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
+
+        token = watermark.encode()
+        if state_file:
+            with open(state_file, 'w') as state:
+                state.write(token + '\n')
+        self.stderr.write(f'Next watermark: {token}')
@@ -0,0 +1,286 @@
+import csv
+import hashlib
+import os
+import time
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from clinic_reports.bulk_load import load_reports
+from clinic_reports.models import HealthcareProvider, ImportCheckpoint, Sport, term_for
+from clinic_reports.reporting import CARE_COUNT_FIELDS, parse_interacted
+
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email', 'sport', 'date', 'week')
+OPTIONAL_COLUMNS = (*CARE_COUNT_FIELDS, 'interacted_hcps', 'healthcare_provider')
+
+# Date formats accepted besides ISO 8601, for hand-entered spreadsheets.
+EXTRA_DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%y')
+
+
+def _normalise_header(value):
+    """Turn a header cell like "Sport Name " into "sport_name"."""
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _read_csv(path):
+    """Yield the header and then each data row of a CSV file."""
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        yield from csv.reader(source)
+
+
+def _read_xlsx(path):
+    """Yield the header and then each data row of the first worksheet, without loading it all."""
+    from openpyxl import load_workbook  # imported lazily, see core.importtime
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+READERS = {'csv': _read_csv, 'xlsx': _read_xlsx}
+
+
+def _file_sha256(path):
+    """Hash the source file so a rerun on the same file finds its checkpoint."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_date(value):
+    """Return value as an aware datetime; raise ValueError if it is not a date."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value or '').strip()
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            for date_format in EXTRA_DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, date_format)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f'Invalid date {text!r}') from None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class RowCleaner:
+    """Validate source rows and turn them into bulk_load row tuples.
+
+    Sport and provider names are resolved case-insensitively against maps
+    loaded once, including inactive entries, since historical records may
+    use sports that are no longer offered.
+    """
+
+    def __init__(self, header):
+        index = {}
+        for position, name in enumerate(header):
+            index.setdefault(_normalise_header(name), position)
+        missing = [name for name in REQUIRED_COLUMNS if name not in index]
+        if missing:
+            raise CommandError(f'Missing required columns: {", ".join(missing)}')
+        self.sports = {name.lower(): pk for pk, name in Sport.objects.values_list('id', 'name')}
+        self.providers = {name.lower(): pk for pk, name in HealthcareProvider.objects.values_list('id', 'name')}
+        # Absent optional columns point one past the header, at the padding added in clean().
+        self.width = len(header) + 1
+        self.positions = {name: index.get(name, len(header)) for name in (*REQUIRED_COLUMNS, *OPTIONAL_COLUMNS)}
+        self.care_positions = [self.positions[name] for name in CARE_COUNT_FIELDS]
+        self.terms = {}
+
+    def clean(self, row):
+        """Return ``(row_tuple, error)`` for one source row."""
+        if len(row) < self.width:
+            row = (*row, *[None] * (self.width - len(row)))
+        row = [value.strip() if isinstance(value, str) else value for value in row]
+        at = self.positions
+
+        first_name, last_name, email = row[at['first_name']], row[at['last_name']], row[at['email']]
+        if not first_name or not last_name or not email:
+            return None, 'first_name, last_name and email are required'
+
+        sport_id = self.sports.get(str(row[at['sport']] or '').lower())
+        if sport_id is None:
+            return None, f'Unknown sport {row[at["sport"]]!r}'
+
+        raw_date = row[at['date']]
+        term = self.terms.get(raw_date)
+        if term is None:
+            try:
+                created_at = _parse_date(raw_date)
+            except ValueError as error:
+                return None, str(error)
+            # Many rows share a date, so the parsed value and its term are reused.
+            term = self.terms[raw_date] = (created_at.isoformat(), *term_for(timezone.localtime(created_at)))
+
+        try:
+            week = int(row[at['week']])
+        except (TypeError, ValueError):
+            return None, 'Invalid week value'
+        if not (1 <= week <= 16):
+            return None, 'Week must be between 1 and 16'
+
+        counts = []
+        for name, position in zip(CARE_COUNT_FIELDS, self.care_positions):
+            value = row[position]
+            if value is None or value == '':
+                counts.append(0)
+                continue
+            try:
+                count = int(value)
+            except (TypeError, ValueError):
+                return None, f'Invalid value for {name}'
+            if count < 0:
+                return None, f'Invalid value for {name}'
+            counts.append(count)
+
+        interacted = parse_interacted(row[at['interacted_hcps']] or 0)
+        provider_id = None
+        if interacted:
+            provider_name = row[at['healthcare_provider']]
+            if not provider_name:
+                return None, 'Healthcare provider is required when interacted_hcps is set'
+            provider_id = self.providers.get(str(provider_name).lower())
+            if provider_id is None:
+                return None, f'Unknown healthcare provider {provider_name!r}'
+
+        return (
+            first_name, last_name, email, sport_id, *counts,
+            interacted, provider_id, *term, week,
+        ), None
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import historical clinic reports from a CSV or XLSX file. Rows are '
+        'validated and loaded in chunks with COPY; rejected rows are written to an '
+        'errors file, and rerunning on the same file resumes after the last chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with one report per row.')
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Source format (default: taken from the file extension).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Rows validated and committed per transaction (default: 10000).',
+        )
+        parser.add_argument(
+            '--errors-file',
+            help='CSV file for rejected rows (default: <path>.errors.csv).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the whole file and report errors without loading anything.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore a previous checkpoint for this file and import it from the top.',
+        )
+
+    def handle(self, *args, **options):
+        """Stream the file, loading each valid chunk and its checkpoint in one transaction."""
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        source_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if source_format not in READERS:
+            raise CommandError('Unknown file format; pass --format csv or --format xlsx')
+        chunk_size = max(1, options['chunk_size'])
+        dry_run = options['dry_run']
+
+        rows = READERS[source_format](path)
+        header = next(rows, None)
+        if header is None:
+            raise CommandError(f'{path} is empty')
+        cleaner = RowCleaner(header)
+
+        checkpoint = None
+        resume_from = 0
+        if not dry_run:
+            checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+                source_hash=_file_sha256(path),
+                defaults={'source_name': os.path.basename(path)[:255]},
+            )
+            if options['restart']:
+                checkpoint.rows_processed = checkpoint.rows_loaded = checkpoint.rows_rejected = 0
+                checkpoint.completed_at = None
+                checkpoint.save()
+            elif checkpoint.completed_at is not None:
+                self.stdout.write(
+                    f'{path} was already imported ({checkpoint.rows_loaded} rows loaded). '
+                    'Use --restart to import it again.'
+                )
+                return
+            resume_from = checkpoint.rows_processed
+            if resume_from:
+                self.stdout.write(f'Resuming after {resume_from} rows.')
+
+        errors_path = options['errors_file'] or f'{path}.errors.csv'
+        started = time.monotonic()
+        loaded = rejected = 0
+        with open(errors_path, 'a' if resume_from else 'w', newline='') as errors_file:
+            errors = csv.writer(errors_file)
+            if not resume_from:
+                errors.writerow(['row', 'error'])
+
+            chunk, chunk_errors = [], []
+            processed = 0
+            # Row 1 is the header, so data rows are numbered from 2 as in a spreadsheet.
+            for row_number, row in enumerate(rows, start=2):
+                processed += 1
+                if processed <= resume_from or not any(row):
+                    continue
+                values, error = cleaner.clean(row)
+                if error:
+                    chunk_errors.append((row_number, error))
+                else:
+                    chunk.append(values)
+                if len(chunk) + len(chunk_errors) >= chunk_size:
+                    loaded += self._commit_chunk(checkpoint, chunk, chunk_errors, processed, errors)
+                    rejected += len(chunk_errors)
+                    chunk, chunk_errors = [], []
+            loaded += self._commit_chunk(checkpoint, chunk, chunk_errors, processed, errors, final=True)
+            rejected += len(chunk_errors)
+
+        elapsed = time.monotonic() - started
+        rate = (loaded + rejected) / elapsed if elapsed else 0
+        verb = 'validated' if dry_run else 'loaded'
+        self.stdout.write(
+            f'{loaded} reports {verb}, {rejected} rows rejected in {elapsed:.1f}s ({rate:,.0f} rows/s).'
+        )
+        if rejected:
+            self.stdout.write(f'Rejected rows were written to {errors_path}.')
+
+    def _commit_chunk(self, checkpoint, chunk, chunk_errors, processed, errors, final=False):
+        """Load one chunk and advance the checkpoint atomically; return the rows loaded."""
+        if checkpoint is not None:
+            with transaction.atomic():
+                load_reports(chunk)
+                checkpoint.rows_processed = processed
+                checkpoint.rows_loaded += len(chunk)
+                checkpoint.rows_rejected += len(chunk_errors)
+                if final:
+                    checkpoint.completed_at = timezone.now()
+                checkpoint.save()
+        errors.writerows(chunk_errors)
+        return len(chunk)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from clinic_reports.idempotency import idempotency_window
+from clinic_reports.models import IdempotencyKey
+from core.purge import delete_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired report submission idempotency keys in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows deleted per statement (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        """Delete keys older than the replay window, one short DELETE per batch."""
+        total = delete_expired(IdempotencyKey, timezone.now() - idempotency_window(), options['batch_size'])
+        self.stdout.write(f'Purged {total} expired idempotency keys.')
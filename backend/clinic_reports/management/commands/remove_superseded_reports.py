@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from clinic_reports.models import ClinicReport
+from clinic_reports.reporting import natural_key_index_valid
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete clinic reports superseded by a later report for the same student, sport, week '
+        'and term. Only the latest submission is kept; the older reports are deleted, not '
+        'combined into it. Optionally create the unique index that enforces this.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of duplicate rows deleted per transaction (default: 1000).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many duplicate rows would be removed.',
+        )
+        parser.add_argument(
+            '--enforce',
+            action='store_true',
+            help='Afterwards, create the unique index used by CLINIC_REPORTS_ONE_REPORT_PER_WEEK.',
+        )
+
+    def _superseded_reports(self):
+        """Return reports that have a newer report with the same natural key."""
+        key_columns = [F(name) for name in ClinicReport.NATURAL_KEY_FIELDS]
+        return ClinicReport.objects.filter(
+            week__isnull=False,
+            year__isnull=False,
+        ).annotate(
+            # The newest submission (highest id) is row 1 and is the one kept,
+            # matching how a resubmission replaces the earlier report.
+            position=Window(RowNumber(), partition_by=key_columns, order_by=F('id').desc()),
+        ).filter(position__gt=1)
+
+    def handle(self, *args, **options):
+        """Delete superseded duplicates batch by batch, then optionally add the unique index."""
+        batch_size = max(1, options['batch_size'])
+
+        if options['dry_run']:
+            count = self._superseded_reports().count()
+            self.stdout.write(f'{count} duplicate reports would be removed.')
+            return
+
+        # The window query scans the whole table, so it runs once; a superseded
+        # report stays superseded, so the list is still valid batches later.
+        ids = list(self._superseded_reports().order_by('id').values_list('id', flat=True))
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            with transaction.atomic():
+                deleted, _ = ClinicReport.objects.filter(id__in=ids[start:start + batch_size]).delete()
+            total += deleted
+            self.stdout.write(f'Removed {total} duplicate reports so far...')
+
+        self.stdout.write(f'Done: {total} superseded reports removed.')
+
+        if options['enforce']:
+            self._create_unique_index()
+
+    def _create_unique_index(self):
+        """Create the natural-key unique index, without blocking writes when possible.
+
+        An INVALID index left by an earlier failed build is dropped and rebuilt.
+        """
+        name = ClinicReport.NATURAL_KEY_INDEX_NAME
+        valid = natural_key_index_valid(connection)
+        if valid:
+            self.stdout.write(f'Unique index {name} is already in place.')
+            return
+
+        table = ClinicReport._meta.db_table
+        columns = [ClinicReport._meta.get_field(field).column for field in ClinicReport.NATURAL_KEY_FIELDS]
+        # CONCURRENTLY cannot run inside a transaction block (e.g. under tests).
+        concurrently = 'CONCURRENTLY ' if not connection.in_atomic_block else ''
+        quote = connection.ops.quote_name
+        drop_sql = f'DROP INDEX {concurrently}IF EXISTS {quote(name)}'
+        with connection.cursor() as cursor:
+            if valid is False:
+                cursor.execute(drop_sql)
+                self.stdout.write(f'Dropped invalid index {name} left by an earlier build.')
+            try:
+                cursor.execute(
+                    f'CREATE UNIQUE INDEX {concurrently}{quote(name)} '
+                    f'ON {quote(table)} ({", ".join(quote(column) for column in columns)})'
+                )
+            except IntegrityError:
+                # A concurrent build that fails leaves an INVALID index behind.
+                if concurrently:
+                    cursor.execute(drop_sql)
+                raise CommandError(
+                    f'New duplicate reports arrived while {name} was built; run the command again.'
+                )
+        self.stdout.write(f'Unique index {name} is in place.')
@@ -0,0 +1,259 @@
+import json
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from clinic_reports.bulk_load import REPORT_COLUMNS, column_names, copy_rows
+from clinic_reports.models import ClinicReport, HealthcareProvider, Sport
+from clinic_reports.reporting import CARE_COUNT_FIELDS
+from user_logging.models import AdminPortalLog
+
+# Seeded students use this domain, so their rows are easy to find and delete.
+SEED_EMAIL_DOMAIN = 'seed.example.edu'
+
+FIRST_NAMES = ('Avery', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Quinn', 'Jamie', 'Drew', 'Reese')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Davis', 'Miller', 'Wilson', 'Moore')
+
+# Chance that a student files a report in a given week of the term.
+WEEKLY_SUBMISSION_RATE = 0.8
+# Chance that each care counter is non-zero; most counters are zero on most reports.
+CARE_NONZERO_RATES = {
+    'immediate_emergency_care': 0.08,
+    'musculoskeletal_exam': 0.45,
+    'non_musculoskeletal_exam': 0.15,
+    'taping_bracing': 0.55,
+    'rehabilitation_reconditioning': 0.35,
+    'modalities': 0.25,
+    'pharmacology': 0.05,
+    'injury_illness_prevention': 0.3,
+    'non_sport_patient': 0.1,
+}
+INTERACTED_HCPS_RATE = 0.15
+# Chance a student works a different sport than their usual one in a term.
+SPORT_SWITCH_RATE = 0.1
+
+# (Month, day) each term's week 1 starts; week 16 ends in early May / early December.
+TERM_STARTS = {'Spring': (1, 12), 'Fall': (8, 18)}
+
+LOG_EVENTS = (
+    (AdminPortalLog.EVENT_ACTIVITY, 0.9),
+    (AdminPortalLog.EVENT_LOGIN, 0.07),
+    (AdminPortalLog.EVENT_LOGOUT, 0.02),
+    (AdminPortalLog.EVENT_LOGIN_FAILED, 0.01),
+)
+LOG_PATHS = ('/', '/clinic-reports/', '/dashboard/student/', '/dashboard/admin/', '/dashboard/fetch_student_data/')
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15',
+)
+LOG_COLUMNS = ('username', 'email', 'event_type', 'ip_address', 'user_agent', 'path', 'extra_data', 'created_at')
+
+
+def _skewed_weights(count, exponent=1.1):
+    """Zipf-like weights: the first item is the most popular, with a long tail."""
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def _student(seed, number):
+    """Return ``(first_name, last_name, email)`` for seeded student number."""
+    rng = random.Random(f'{seed}:student:{number}')
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return first, last, f'{first}.{last}.{number}@{SEED_EMAIL_DOMAIN}'.lower()
+
+
+class SeedPlan:
+    """Everything a worker needs to generate its chunk deterministically."""
+
+    def __init__(self, seed, terms, sport_ids, provider_ids, today):
+        self.seed = seed
+        self.today = today.isoformat()
+        self.terms = terms
+        self.sport_ids = sport_ids
+        self.sport_weights = _skewed_weights(len(sport_ids))
+        self.provider_ids = provider_ids
+        # week_days[term_index][week - 1] lists the five weekday date strings of that week.
+        self.week_days = [
+            [
+                [(date(year, *TERM_STARTS[semester]) + timedelta(weeks=week, days=offset)).isoformat()
+                 for offset in range(5)]
+                for week in range(16)
+            ]
+            for semester, year in terms
+        ]
+
+    def report_rows(self, student_terms):
+        """Generate the weekly reports of each (student, term) index in student_terms."""
+        rows = []
+        for index in student_terms:
+            student_number, term_index = divmod(index, len(self.terms))
+            rng = random.Random(f'{self.seed}:reports:{index}')
+            first, last, email = _student(self.seed, student_number)
+            usual_sport = random.Random(f'{self.seed}:sport:{student_number}').choices(
+                self.sport_ids, self.sport_weights)[0]
+            sport_id = usual_sport
+            if rng.random() < SPORT_SWITCH_RATE:
+                sport_id = rng.choices(self.sport_ids, self.sport_weights)[0]
+            semester, year = self.terms[term_index]
+
+            for week in range(1, 17):
+                if rng.random() >= WEEKLY_SUBMISSION_RATE:
+                    continue
+                counts = [
+                    rng.randint(1, 6) if rng.random() < CARE_NONZERO_RATES[field] else 0
+                    for field in CARE_COUNT_FIELDS
+                ]
+                interacted = self.provider_ids and rng.random() < INTERACTED_HCPS_RATE
+                provider_id = rng.choice(self.provider_ids) if interacted else None
+                day = rng.choice(self.week_days[term_index][week - 1])
+                if day > self.today:
+                    break  # The current term is only seeded up to today.
+                created_at = f'{day} {rng.randint(8, 20):02d}:{rng.randint(0, 59):02d}:00+00'
+                rows.append((
+                    first, last, email, sport_id, *counts,
+                    bool(interacted), provider_id, created_at, semester, year, week, created_at,
+                ))
+        return rows
+
+    def log_rows(self, chunk_index, count, student_count):
+        """Generate count AdminPortalLog rows spread over the seeded terms."""
+        rng = random.Random(f'{self.seed}:logs:{chunk_index}')
+        events, event_weights = zip(*LOG_EVENTS)
+        rows = []
+        for _ in range(count):
+            first, last, email = _student(self.seed, rng.randrange(student_count))
+            term_index = rng.randrange(len(self.terms))
+            day = min(rng.choice(rng.choice(self.week_days[term_index])), self.today)
+            rows.append((
+                email.split('@')[0], email, rng.choices(events, event_weights)[0],
+                f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+                rng.choice(USER_AGENTS), rng.choice(LOG_PATHS), json.dumps({}),
+                f'{day} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}+00',
+            ))
+        return rows
+
+
+def _copy(model, columns, rows):
+    """COPY rows into model's table; the statement commits on its own."""
+    try:
+        with connection.cursor() as cursor:
+            copy_rows(cursor, model._meta.db_table, column_names(model, columns), rows)
+        return len(rows)
+    finally:
+        # Pool workers are not request-managed, so close their connections here.
+        connection.close()
+
+
+def copy_report_chunk(plan, start, stop):
+    """Generate and COPY the reports of student-terms ``start..stop-1``."""
+    # Seeded reports count as never edited, so updated_at repeats created_at.
+    return _copy(ClinicReport, (*REPORT_COLUMNS, 'updated_at'), plan.report_rows(range(start, stop)))
+
+
+def copy_log_chunk(plan, chunk_index, count, student_count):
+    """Generate and COPY one chunk of admin portal logs."""
+    return _copy(AdminPortalLog, LOG_COLUMNS, plan.log_rows(chunk_index, count, student_count))
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed reproducible synthetic clinic reports and admin portal logs for load '
+        'testing. Rows are generated in chunks and streamed in with parallel COPY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reports',
+            type=int,
+            default=100000,
+            help='Approximate number of clinic reports to create (default: 100000).',
+        )
+        parser.add_argument(
+            '--logs',
+            type=int,
+            help='Number of admin portal log rows to create (default: a fifth of --reports).',
+        )
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=5,
+            help='Number of past years, up to and including this one, to spread reports over (default: 5).',
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; the same seed gives the same data.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Approximate rows generated and copied per chunk (default: 50000).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Processes generating and copying chunks in parallel; 1 runs in-process '
+                 '(default: CPU count, at most 4).',
+        )
+
+    def handle(self, *args, **options):
+        """Plan the student/term grid, then generate and COPY chunks on a process pool."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_clinic_data uses COPY and needs PostgreSQL.')
+        if connection.in_atomic_block:
+            raise CommandError('seed_clinic_data cannot run inside a transaction; each chunk commits on its own.')
+
+        sport_ids = list(Sport.objects.order_by('id').values_list('id', flat=True))
+        if not sport_ids:
+            raise CommandError('No sports found; run migrate first.')
+        provider_ids = list(HealthcareProvider.objects.order_by('id').values_list('id', flat=True))
+
+        this_year = timezone.now().year
+        terms = [
+            (semester, year)
+            for year in range(this_year - max(1, options['years']) + 1, this_year + 1)
+            for semester in ('Spring', 'Fall')
+        ]
+        plan = SeedPlan(options['seed'], terms, sport_ids, provider_ids, timezone.localdate())
+
+        # Each student-term yields about 16 * WEEKLY_SUBMISSION_RATE weekly reports.
+        reports_per_student_term = 16 * WEEKLY_SUBMISSION_RATE
+        student_terms = math.ceil(max(0, options['reports']) / reports_per_student_term)
+        student_count = max(1, math.ceil(student_terms / len(terms)))
+        chunk_size = max(1, options['chunk_size'])
+        per_chunk = max(1, int(chunk_size / reports_per_student_term))
+        log_count = options['logs'] if options['logs'] is not None else options['reports'] // 5
+
+        tasks = [
+            (copy_report_chunk, plan, start, min(start + per_chunk, student_terms))
+            for start in range(0, student_terms, per_chunk)
+        ] + [
+            (copy_log_chunk, plan, index, min(chunk_size, log_count - start), student_count)
+            for index, start in enumerate(range(0, log_count, chunk_size))
+        ]
+
+        started = timezone.now()
+        workers = max(1, options['workers'])
+        if workers == 1:
+            counts = [func(*args) for func, *args in tasks]
+        else:
+            # Generating rows is CPU-bound, so chunks run in forked processes rather
+            # than threads. Close connections first so no child reuses the parent's socket.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(func, *args) for func, *args in tasks]
+                counts = [future.result() for future in futures]
+        report_chunks = math.ceil(student_terms / per_chunk)
+        reports, logs = sum(counts[:report_chunks]), sum(counts[report_chunks:])
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(
+            f'Seeded {reports} clinic reports for {student_count} students over {len(terms)} terms '
+            f'and {logs} admin portal logs in {elapsed:.1f}s.'
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:40
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+
+
+def backfill_year(apps, schema_editor):
+    ClinicReport = apps.get_model('clinic_reports', 'ClinicReport')
+    ClinicReport.objects.filter(year__isnull=True).update(year=ExtractYear('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_reports', '0009_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicreport',
+            name='year',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_year, migrations.RunPython.noop),
+    ]
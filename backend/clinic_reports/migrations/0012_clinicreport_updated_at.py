@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:27
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows have not been edited since they were submitted, as far as we know.
+    ClinicReport = apps.get_model('clinic_reports', 'ClinicReport')
+    ClinicReport.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_reports', '0011_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicReportTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='clinicreport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='clinicreport',
+            index=models.Index(fields=['updated_at', 'id'], name='clinic_report_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clinicreporttombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='clinic_report_tombstone_idx'),
+        ),
+    ]
@@ -1,7 +1,17 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 
+def term_for(created):
+    """Return the ``(semester, year)`` term for a report created at ``created``.
+
+    Jan-May is Spring and Jun-Dec is Fall; there is no Summer semester.
+    """
+    semester = 'Spring' if 1 <= created.month <= 5 else 'Fall'
+    return semester, created.year
+
+
 class Sport(models.Model):
     name = models.CharField(max_length=100, unique=True)
     active = models.BooleanField(default=True)
@@ -44,6 +54,8 @@ class ClinicReport(models.Model):
     healthcare_provider = models.ForeignKey(HealthcareProvider, on_delete=models.PROTECT, null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last insert or edit, so BI exports can pull only what changed (see change_feed).
+    updated_at = models.DateTimeField(auto_now=True)
 
     # Semester and week (1-16) determination based on `created_at`.
     SEMESTER_CHOICES = [
@@ -52,29 +64,40 @@ class ClinicReport(models.Model):
     ]
 
     semester = models.CharField(max_length=10, choices=SEMESTER_CHOICES, default='Spring')
+    # Calendar year of created_at, stored so the term (semester + year) can be indexed.
+    year = models.PositiveSmallIntegerField(null=True, blank=True)
     week = models.PositiveSmallIntegerField(null=True, blank=True)
 
-    # Auto-determine semester from created_at when saving.
-    # Logic:
-    #  - Jan-May  -> Spring
-    #  - Jun-Dec  -> Fall
+    # "One report per student per sport per week per term". Only enforced when
+    # CLINIC_REPORTS_ONE_REPORT_PER_WEEK is on and the unique index below exists
+    # (see the remove_superseded_reports management command).
+    NATURAL_KEY_FIELDS = ('email', 'sport', 'week', 'semester', 'year')
+    NATURAL_KEY_INDEX_NAME = 'clinic_report_weekly_natural_key_uniq'
+
+    class Meta:
+        indexes = [
+            # Keyset order of the change feed.
+            models.Index(fields=['updated_at', 'id'], name='clinic_report_updated_id_idx'),
+        ]
+
+    # Auto-determine semester and year from created_at when saving (see term_for).
     # Week is manually selected by the student (1-16).
-    def save(self, *args, **kwargs):
-        """Populate the semester based on the created_at timestamp before saving."""
-        created = self.created_at or timezone.now()
-        month = created.month
+    # bulk_create() and COPY skip save(), so bulk insert paths assign the term themselves.
+    def assign_term(self):
+        """Set the semester and year from created_at (or now, for rows not yet inserted)."""
+        self.semester, self.year = term_for(self.created_at or timezone.now())
 
-        if 1 <= month <= 5:
-            semester_name = 'Spring'
-        else:
-            # No Summer semester: treat June..December as Fall
-            semester_name = 'Fall'
+    def natural_key(self):
+        """Return the (email, sport, week, semester, year) tuple identifying a weekly report."""
+        return (self.email, self.sport_id, self.week, self.semester, self.year)
 
-        self.semester = semester_name
+    def save(self, *args, **kwargs):
+        """Populate the semester based on the created_at timestamp before saving."""
+        self.assign_term()
 
         if kwargs.get('update_fields') is not None:
             update_fields = set(kwargs['update_fields'])
-            update_fields.add('semester')
+            update_fields.update({'semester', 'year'})
             kwargs['update_fields'] = list(update_fields)
 
         super().save(*args, **kwargs)
@@ -83,3 +106,65 @@ class ClinicReport(models.Model):
         """Return a concise identifier for this clinic report instance."""
         return f"{self.first_name} {self.last_name} - {self.sport} ({self.created_at.date()})"
 
+
+class IdempotencyKey(models.Model):
+    """Stored response for a client-supplied Idempotency-Key on a report submission.
+
+    A retried request carrying the same key gets this response back instead
+    of inserting the report again.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    # SHA-256 of the request path and body, so a reused key with a different payload is rejected
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='uniq_idempotency_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        """Return the key and owning user id for admin/debug display."""
+        return f"{self.key} (user {self.user_id})"
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of an ``import_clinic_reports`` run, so an interrupted import can resume.
+
+    Keyed by the SHA-256 of the source file, so re-running the command on the
+    same file continues after the last committed chunk.
+    """
+    source_hash = models.CharField(max_length=64, unique=True)
+    source_name = models.CharField(max_length=255)
+    # Data rows handled so far (loaded or rejected), counted from the top of the file
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_loaded = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """Return the source file name and progress for admin/debug display."""
+        return f"{self.source_name} ({self.rows_processed} rows)"
+
+
+class ClinicReportTombstone(models.Model):
+    """Record of a deleted ClinicReport, so the change feed can report deletions."""
+    report_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='clinic_report_tombstone_idx'),
+        ]
+
+    def __str__(self):
+        """Return the deleted report id and deletion time for admin/debug display."""
+        return f"Report {self.report_id} deleted {self.deleted_at:%Y-%m-%d %H:%M:%S}"
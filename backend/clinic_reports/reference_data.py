@@ -0,0 +1,102 @@
+"""In-process cache of the active sports and healthcare providers.
+
+Both tables are tiny and change rarely, so each worker keeps the active
+id -> name maps in memory and serves the report form and submission
+validation from them. A version stamp in the shared Django cache tells other
+workers and instances to reload after an edit (see ``bump_version``).
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import HealthcareProvider, Sport
+
+VERSION_CACHE_KEY = 'clinic_reports:reference_data_version'
+
+# How often (seconds) a worker compares its snapshot against the shared version.
+DEFAULT_VERSION_CHECK_SECONDS = 5
+# Upper bound on snapshot age, in case the stamp is lost. settings.py lowers it
+# when the cache is not shared between workers.
+DEFAULT_MAX_AGE_SECONDS = 300
+
+
+class ReferenceData:
+    """Immutable snapshot of the active sports and providers, keyed by id."""
+
+    def __init__(self, sports, providers, version):
+        self.sports = sports
+        self.providers = providers
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.checked_at = self.loaded_at
+
+    @staticmethod
+    def _choices(names_by_id):
+        return [{'id': pk, 'name': name} for pk, name in names_by_id.items()]
+
+    def sport_choices(self):
+        """Return the active sports as ``[{'id': ..., 'name': ...}]`` for templates."""
+        return self._choices(self.sports)
+
+    def provider_choices(self):
+        """Return the active providers as ``[{'id': ..., 'name': ...}]`` for templates."""
+        return self._choices(self.providers)
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _shared_version():
+    """Read the shared version stamp, creating one if the cache has none yet."""
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def _load(version):
+    """Query both reference tables and build a new snapshot tagged with version."""
+    sports = dict(Sport.objects.filter(active=True).order_by('id').values_list('id', 'name'))
+    providers = dict(HealthcareProvider.objects.filter(active=True).order_by('id').values_list('id', 'name'))
+    return ReferenceData(sports, providers, version)
+
+
+def get_reference_data():
+    """Return the current snapshot, reloading it when it is stale.
+
+    Within the version-check interval this touches neither the database nor
+    the cache; after it, only the shared version stamp is read.
+    """
+    global _snapshot
+    check_seconds = getattr(settings, 'REFERENCE_DATA_VERSION_CHECK_SECONDS', DEFAULT_VERSION_CHECK_SECONDS)
+    max_age_seconds = getattr(settings, 'REFERENCE_DATA_MAX_AGE_SECONDS', DEFAULT_MAX_AGE_SECONDS)
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - snapshot.loaded_at < max_age_seconds:
+        if now - snapshot.checked_at < check_seconds:
+            return snapshot
+        if _shared_version() == snapshot.version:
+            snapshot.checked_at = now
+            return snapshot
+
+    with _lock:
+        if _snapshot is not snapshot and _snapshot is not None:
+            # Another thread reloaded while we waited for the lock.
+            return _snapshot
+        # Read the version before the tables so a concurrent bump forces another reload.
+        _snapshot = _load(_shared_version())
+        return _snapshot
+
+
+def bump_version():
+    """Invalidate the snapshot in this worker now and in every other worker on their next check."""
+    global _snapshot
+    _snapshot = None
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
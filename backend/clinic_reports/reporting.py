@@ -0,0 +1,43 @@
+"""Report fields and rules shared by the submission views, imports and the change feed."""
+from django.conf import settings
+
+from .models import ClinicReport
+
+CARE_COUNT_FIELDS = [
+    'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam',
+    'taping_bracing', 'rehabilitation_reconditioning', 'modalities',
+    'pharmacology', 'injury_illness_prevention', 'non_sport_patient',
+]
+
+# Columns a resubmission overwrites when one-report-per-week mode is on.
+UPSERT_UPDATE_FIELDS = [
+    'first_name', 'last_name', *CARE_COUNT_FIELDS, 'interacted_hcps', 'healthcare_provider', 'updated_at',
+]
+
+
+def parse_interacted(value):
+    """Interpret the interacted_hcps form value (1/0, true/false, yes/no) as a bool."""
+    try:
+        return bool(int(value))
+    except (TypeError, ValueError):
+        return str(value).strip().lower() in {"1", "true", "True", "yes", "Yes", "y", "Y"}
+
+
+def one_report_per_week():
+    """Return True when resubmissions should replace the student's earlier weekly report."""
+    return getattr(settings, 'CLINIC_REPORTS_ONE_REPORT_PER_WEEK', False)
+
+
+def natural_key_index_valid(connection):
+    """Return whether the natural-key unique index is valid, or None if it does not exist.
+
+    A failed ``CREATE INDEX CONCURRENTLY`` leaves an INVALID index behind:
+    introspection still lists it, but ON CONFLICT cannot use it.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)',
+            [connection.ops.quote_name(ClinicReport.NATURAL_KEY_INDEX_NAME)],
+        )
+        row = cursor.fetchone()
+    return None if row is None else row[0]
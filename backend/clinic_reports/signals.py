@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ClinicReport, ClinicReportTombstone, HealthcareProvider, Sport
+from .reference_data import bump_version
+
+
+@receiver(post_save, sender=Sport)
+@receiver(post_delete, sender=Sport)
+@receiver(post_save, sender=HealthcareProvider)
+@receiver(post_delete, sender=HealthcareProvider)
+def invalidate_reference_data(sender, **kwargs):
+    """Bump the reference-data version when a sport or provider changes (including admin saves).
+
+    The version is bumped again once the write commits, so workers that
+    reloaded before the commit do not keep the old rows under the new version.
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_delete, sender=ClinicReport)
+def record_report_deletion(sender, instance, **kwargs):
+    """Leave a tombstone so change-feed consumers learn that the report is gone.
+
+    Written in the same transaction as the delete, so it exists exactly when the delete commits.
+    """
+    ClinicReportTombstone.objects.create(report_id=instance.pk)
@@ -1,12 +1,32 @@
-from django.test import TestCase, Client, override_settings
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import cache
 from django.urls import reverse
+import csv
 import json
-from clinic_reports.models import ClinicReport, Sport, HealthcareProvider
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.utils import timezone
+from clinic_reports.models import (
+    ClinicReport, ClinicReportTombstone, Sport, HealthcareProvider, IdempotencyKey, ImportCheckpoint,
+)
+from clinic_reports import change_feed, reference_data
+from clinic_reports.checks import check_natural_key_index
+from clinic_reports.reporting import CARE_COUNT_FIELDS, natural_key_index_valid
+from unittest.mock import patch
+from clinic_reports.models import term_for
+from core.tests import _fresh_setting
+from user_logging.models import AdminPortalLog
 
 User = get_user_model() # Gets whatever Django user model we are using (the built in one or a custom one)
 
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
 class ClinicReportViewTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -349,3 +369,732 @@ class ClinicReportViewTests(TestCase):
         pt_report = ClinicReport.objects.get(healthcare_provider=self.physical_therapist)
         self.assertEqual(physician_report.healthcare_provider, self.physician)
         self.assertEqual(pt_report.healthcare_provider, self.physical_therapist)
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class BulkSubmitReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        """Run once for the entire test class"""
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+        cls.soccer, _ = Sport.objects.get_or_create(name='Soccer', defaults={'active': True})
+        cls.inactive, _ = Sport.objects.get_or_create(name='Inactive', active=False)
+        cls.physician, _ = HealthcareProvider.objects.get_or_create(name='Physician (MD/DO)', defaults={'active': True})
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('submit_reports_bulk')
+        self.user = User.objects.create_user(username='bulk-tester', email='bulk@university.edu', password='pass')
+        self.user.first_name = 'Bulk'
+        self.user.last_name = 'Student'
+        self.user.save()
+
+    def make_report(self, **overrides):
+        """Build a valid single-report payload, overriding any given fields."""
+        payload = {
+            'sport': self.football.id,
+            'week': 1,
+            'immediate_emergency_care': 1,
+            'musculoskeletal_exam': 0,
+            'non_musculoskeletal_exam': 0,
+            'taping_bracing': 0,
+            'rehabilitation_reconditioning': 0,
+            'modalities': 0,
+            'pharmacology': 0,
+            'injury_illness_prevention': 0,
+            'non_sport_patient': 0,
+            'interacted_hcps': 0,
+        }
+        payload.update(overrides)
+        return payload
+
+    def post_bulk(self, payload):
+        return self.client.post(self.url, data=json.dumps(payload), content_type='application/json')
+
+    def test_bulk_submit_requires_auth(self):
+        """Return a 401 JSON response for anonymous bulk submissions."""
+        resp = self.post_bulk({'reports': [self.make_report()]})
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(ClinicReport.objects.count(), 0)
+
+    def test_bulk_submit_creates_all_reports(self):
+        """Insert every report in the batch with the user's identity and a derived semester."""
+        self.client.force_login(self.user)
+        resp = self.post_bulk({'reports': [
+            self.make_report(week=1),
+            self.make_report(week=2, sport=self.soccer.id),
+            self.make_report(week=3, interacted_hcps=1, healthcare_provider=self.physician.id),
+        ]})
+        self.assertEqual(resp.status_code, 200)
+        body = json.loads(resp.content)
+        self.assertTrue(body.get('success'))
+        self.assertEqual(len(body.get('ids')), 3)
+
+        self.assertEqual(ClinicReport.objects.count(), 3)
+        for report in ClinicReport.objects.all():
+            self.assertEqual(report.email, self.user.email)
+            self.assertEqual(report.first_name, 'Bulk')
+            expected_semester = 'Spring' if report.created_at.month <= 5 else 'Fall'
+            self.assertEqual(report.semester, expected_semester)
+        self.assertEqual(ClinicReport.objects.get(week=3).healthcare_provider, self.physician)
+
+    def test_bulk_submit_accepts_bare_list(self):
+        """A bare JSON list is accepted as the batch."""
+        self.client.force_login(self.user)
+        resp = self.post_bulk([self.make_report(), self.make_report(week=2)])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    def test_bulk_submit_reports_errors_per_item_and_saves_nothing(self):
+        """Invalid items are reported by index and the whole batch is rejected."""
+        self.client.force_login(self.user)
+        resp = self.post_bulk({'reports': [
+            self.make_report(),
+            self.make_report(sport=self.inactive.id),
+            self.make_report(week=17),
+            self.make_report(interacted_hcps=1),
+        ]})
+        self.assertEqual(resp.status_code, 400)
+        body = json.loads(resp.content)
+        self.assertFalse(body.get('success'))
+        errors = {item['index']: item['error'] for item in body.get('errors', [])}
+        self.assertEqual(set(errors), {1, 2, 3})
+        self.assertIn('Invalid sport', errors[1])
+        self.assertIn('Week must be between 1 and 16', errors[2])
+        self.assertIn('Healthcare provider is required', errors[3])
+        self.assertEqual(ClinicReport.objects.count(), 0)
+
+    def test_bulk_submit_uses_at_most_one_query_per_reference_table(self):
+        """Sports and providers are fetched at most once for the whole batch."""
+        self.client.force_login(self.user)
+        reports = [
+            self.make_report(week=week, interacted_hcps=1, healthcare_provider=self.physician.id)
+            for week in range(1, 9)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.post_bulk({'reports': reports})
+        self.assertEqual(resp.status_code, 200)
+
+        sql = [q['sql'] for q in ctx.captured_queries]
+        self.assertLessEqual(len([q for q in sql if 'FROM "clinic_reports_sport"' in q]), 1)
+        self.assertLessEqual(len([q for q in sql if 'FROM "clinic_reports_healthcareprovider"' in q]), 1)
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "clinic_reports_clinicreport"')]), 1)
+        self.assertEqual(ClinicReport.objects.count(), 8)
+
+    @override_settings(CLINIC_REPORTS_BULK_MAX_REPORTS=2)
+    def test_bulk_submit_rejects_oversized_batch(self):
+        """Reject batches larger than the configured maximum."""
+        self.client.force_login(self.user)
+        resp = self.post_bulk({'reports': [self.make_report()] * 3})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('At most 2 reports', json.loads(resp.content).get('error', ''))
+        self.assertEqual(ClinicReport.objects.count(), 0)
+
+    def test_bulk_submit_rejects_empty_batch(self):
+        """Reject payloads that do not contain any reports."""
+        self.client.force_login(self.user)
+        resp = self.post_bulk({'reports': []})
+        self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ReferenceDataCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+        cls.physician, _ = HealthcareProvider.objects.get_or_create(name='Physician (MD/DO)', defaults={'active': True})
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='cache-tester', email='cache@university.edu', password='pass')
+        self.client.force_login(self.user)
+        # Start from a cold snapshot: rows rolled back after earlier tests never bumped the version.
+        reference_data._snapshot = None
+        self.addCleanup(setattr, reference_data, '_snapshot', None)
+
+    def reference_queries(self, captured_queries):
+        """Return the captured queries that read the sport or provider tables."""
+        return [
+            q['sql'] for q in captured_queries
+            if '"clinic_reports_sport"' in q['sql'] or '"clinic_reports_healthcareprovider"' in q['sql']
+        ]
+
+    def test_max_age_is_short_without_a_shared_cache(self):
+        """A per-process cache never carries the version stamp to other workers, so they reload on age alone."""
+        self.assertEqual(_fresh_setting('REFERENCE_DATA_MAX_AGE_SECONDS'), '5')
+        self.assertEqual(
+            _fresh_setting(
+                'REFERENCE_DATA_MAX_AGE_SECONDS', DJANGO_CACHE_BACKEND='django.core.cache.backends.db.DatabaseCache',
+            ),
+            '300',
+        )
+
+    def test_cold_form_render_loads_each_table_once(self):
+        """The first render in a worker reads the sport and provider tables once each."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('form'))
+        self.assertEqual(len(self.reference_queries(ctx.captured_queries)), 2)
+
+    def test_warm_form_render_and_submit_run_no_reference_queries(self):
+        """Once loaded, the form and submit validation are served from memory."""
+        self.client.get(reverse('form'))  # Warm the cache
+
+        with CaptureQueriesContext(connection) as ctx:
+            form_resp = self.client.get(reverse('form'))
+            submit_resp = self.client.post(reverse('submit_report'), data=json.dumps({
+                'sport': self.football.id,
+                'week': 2,
+                'immediate_emergency_care': 0,
+                'musculoskeletal_exam': 0,
+                'non_musculoskeletal_exam': 0,
+                'taping_bracing': 0,
+                'rehabilitation_reconditioning': 0,
+                'modalities': 0,
+                'pharmacology': 0,
+                'injury_illness_prevention': 0,
+                'non_sport_patient': 0,
+                'interacted_hcps': 1,
+                'healthcare_provider': self.physician.id,
+            }), content_type='application/json')
+
+        self.assertContains(form_resp, 'Football')
+        self.assertEqual(submit_resp.status_code, 200)
+        self.assertEqual(self.reference_queries(ctx.captured_queries), [])
+
+    def test_saving_a_sport_invalidates_the_cache(self):
+        """Saving a sport (as SportAdmin does) bumps the version so the next render reloads."""
+        self.client.get(reverse('form'))
+        version = reference_data.get_reference_data().version
+
+        Sport.objects.create(name='Rowing', active=True)
+
+        self.assertNotEqual(reference_data.get_reference_data().version, version)
+        self.assertContains(self.client.get(reverse('form')), 'Rowing')
+
+    def test_deactivating_a_provider_removes_it_from_the_form(self):
+        """Deactivated providers disappear from the cached choices after the save."""
+        self.assertContains(self.client.get(reverse('form')), 'Physician (MD/DO)')
+        self.physician.active = False
+        self.physician.save()
+        self.assertNotContains(self.client.get(reverse('form')), 'Physician (MD/DO)')
+
+    @override_settings(REFERENCE_DATA_VERSION_CHECK_SECONDS=0)
+    def test_version_bump_from_another_worker_triggers_reload(self):
+        """A version stamp changed elsewhere (another worker) causes a reload on the next check."""
+        snapshot = reference_data.get_reference_data()
+        cache.set(reference_data.VERSION_CACHE_KEY, 'bumped-by-another-worker', timeout=None)
+
+        reloaded = reference_data.get_reference_data()
+        self.assertIsNot(reloaded, snapshot)
+        self.assertEqual(reloaded.version, 'bumped-by-another-worker')
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class IdempotentSubmitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+
+    def setUp(self):
+        self.client = Client()
+        self.submit_url = reverse('submit_report')
+        self.user = User.objects.create_user(username='retry-tester', email='retry@university.edu', password='pass')
+        self.client.force_login(self.user)
+        self.payload = {
+            'sport': self.football.id,
+            'week': 4,
+            'immediate_emergency_care': 1,
+            'musculoskeletal_exam': 0,
+            'non_musculoskeletal_exam': 0,
+            'taping_bracing': 0,
+            'rehabilitation_reconditioning': 0,
+            'modalities': 0,
+            'pharmacology': 0,
+            'injury_illness_prevention': 0,
+            'non_sport_patient': 0,
+            'interacted_hcps': 0,
+        }
+
+    def post_with_key(self, payload, key):
+        return self.client.post(
+            self.submit_url,
+            data=json.dumps(payload),
+            content_type='application/json',
+            headers={'Idempotency-Key': key},
+        )
+
+    def test_replayed_key_returns_original_response_without_insert(self):
+        """A retry with the same key returns the first response and adds no row."""
+        first = self.post_with_key(self.payload, 'key-1')
+        second = self.post_with_key(self.payload, 'key-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(first.content), json.loads(second.content))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(ClinicReport.objects.count(), 1)
+
+    def test_different_keys_create_separate_reports(self):
+        """Distinct keys are distinct submissions."""
+        self.post_with_key(self.payload, 'key-a')
+        self.post_with_key(self.payload, 'key-b')
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    def test_reused_key_with_different_payload_is_rejected(self):
+        """Reusing a key for a different body returns 422 and inserts nothing new."""
+        self.post_with_key(self.payload, 'key-1')
+        changed = dict(self.payload, week=5)
+        resp = self.post_with_key(changed, 'key-1')
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(ClinicReport.objects.count(), 1)
+
+    def test_failed_submission_is_not_stored(self):
+        """Validation errors are not replayed, so a corrected retry with the same key succeeds."""
+        bad = dict(self.payload, week=99)
+        self.assertEqual(self.post_with_key(bad, 'key-1').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        resp = self.post_with_key(self.payload, 'key-1')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(ClinicReport.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        """Another user's identical key does not replay someone else's response."""
+        self.post_with_key(self.payload, 'shared-key')
+        other = User.objects.create_user(username='other-retry', email='other-retry@university.edu', password='pass')
+        self.client.force_login(other)
+        resp = self.post_with_key(self.payload, 'shared-key')
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.has_header('Idempotent-Replayed'))
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL_SECONDS=60)
+    def test_expired_key_is_not_replayed(self):
+        """After the window, the same key is treated as a new submission."""
+        self.post_with_key(self.payload, 'key-1')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=120))
+        resp = self.post_with_key(self.payload, 'key-1')
+        self.assertFalse(resp.has_header('Idempotent-Replayed'))
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL_SECONDS=60)
+    def test_purge_command_deletes_only_expired_keys(self):
+        """purge_idempotency_keys removes expired keys in batches and keeps live ones."""
+        for i in range(5):
+            self.post_with_key(dict(self.payload, week=i + 1), f'old-{i}')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=120))
+        self.post_with_key(self.payload, 'fresh')
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', batch_size=2, stdout=out)
+
+        self.assertIn('Purged 5', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['fresh'])
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class OneReportPerWeekTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+        cls.soccer, _ = Sport.objects.get_or_create(name='Soccer', defaults={'active': True})
+
+    def setUp(self):
+        self.client = Client()
+        self.submit_url = reverse('submit_report')
+        self.user = User.objects.create_user(username='weekly-tester', email='weekly@university.edu', password='pass')
+        self.user.first_name = 'Weekly'
+        self.user.last_name = 'Student'
+        self.user.save()
+        self.client.force_login(self.user)
+        self.payload = {
+            'sport': self.football.id,
+            'week': 6,
+            'immediate_emergency_care': 1,
+            'musculoskeletal_exam': 0,
+            'non_musculoskeletal_exam': 0,
+            'taping_bracing': 0,
+            'rehabilitation_reconditioning': 0,
+            'modalities': 0,
+            'pharmacology': 0,
+            'injury_illness_prevention': 0,
+            'non_sport_patient': 0,
+            'interacted_hcps': 0,
+        }
+
+    def create_report(self, **overrides):
+        """Create a report directly, bypassing the upsert path (as legacy rows were)."""
+        fields = dict(
+            first_name='Weekly', last_name='Student', email='weekly@university.edu', sport=self.football,
+            week=6, immediate_emergency_care=0, musculoskeletal_exam=0, non_musculoskeletal_exam=0,
+            taping_bracing=0, rehabilitation_reconditioning=0, modalities=0, pharmacology=0,
+            injury_illness_prevention=0, non_sport_patient=0, interacted_hcps=False,
+        )
+        fields.update(overrides)
+        return ClinicReport.objects.create(**fields)
+
+    def test_save_derives_year(self):
+        """save() sets the term year alongside the semester."""
+        report = self.create_report()
+        self.assertEqual(report.year, report.created_at.year)
+
+    def test_remove_command_keeps_latest_report_per_natural_key(self):
+        """Duplicates are merged in batches and the newest submission survives."""
+        self.create_report(immediate_emergency_care=1)
+        self.create_report(immediate_emergency_care=2)
+        latest = self.create_report(immediate_emergency_care=3)
+        other_week = self.create_report(week=7)
+        other_sport = self.create_report(sport=self.soccer)
+
+        out = StringIO()
+        call_command('remove_superseded_reports', batch_size=1, stdout=out)
+
+        self.assertIn('2 superseded reports removed', out.getvalue())
+        self.assertEqual(
+            set(ClinicReport.objects.values_list('id', flat=True)),
+            {latest.id, other_week.id, other_sport.id},
+        )
+
+    def test_remove_command_finds_duplicates_once(self):
+        """The window query runs once, not once per batch."""
+        for care in range(4):
+            self.create_report(immediate_emergency_care=care)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('remove_superseded_reports', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(ClinicReport.objects.count(), 1)
+        self.assertEqual(sum('ROW_NUMBER' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_natural_key_check_refuses_mode_without_index(self):
+        """The database check errors until remove_superseded_reports --enforce creates the index."""
+        self.assertEqual(check_natural_key_index(None, databases=['default']), [])
+        with override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True):
+            errors = check_natural_key_index(None, databases=['default'])
+            self.assertEqual([error.id for error in errors], ['clinic_reports.E001'])
+
+            call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+            self.assertEqual(check_natural_key_index(None, databases=['default']), [])
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_invalid_index_fails_the_check_and_is_rebuilt(self):
+        """An INVALID index left by a failed concurrent build is reported, then dropped and rebuilt."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+        with connection.cursor() as cursor:
+            # What a CREATE INDEX CONCURRENTLY that hit a new duplicate leaves behind.
+            cursor.execute(
+                'UPDATE pg_index SET indisvalid = false WHERE indexrelid = to_regclass(%s)',
+                [ClinicReport.NATURAL_KEY_INDEX_NAME],
+            )
+        self.assertIs(natural_key_index_valid(connection), False)
+        errors = check_natural_key_index(None, databases=['default'])
+        self.assertEqual([error.id for error in errors], ['clinic_reports.E001'])
+        self.assertIn('is invalid', errors[0].msg)
+
+        out = StringIO()
+        call_command('remove_superseded_reports', enforce=True, stdout=out)
+
+        self.assertIn('Dropped invalid index', out.getvalue())
+        self.assertIs(natural_key_index_valid(connection), True)
+        self.assertEqual(check_natural_key_index(None, databases=['default']), [])
+
+    def test_remove_command_dry_run_deletes_nothing(self):
+        """--dry-run only reports the duplicate count."""
+        self.create_report()
+        self.create_report()
+        out = StringIO()
+        call_command('remove_superseded_reports', dry_run=True, stdout=out)
+        self.assertIn('1 duplicate reports would be removed', out.getvalue())
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_resubmission_replaces_earlier_report(self):
+        """With the index in place, a resubmission for the same week updates the existing row."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+
+        first = self.client.post(self.submit_url, data=json.dumps(self.payload), content_type='application/json')
+        resubmitted = dict(self.payload, immediate_emergency_care=4, musculoskeletal_exam=2)
+        second = self.client.post(self.submit_url, data=json.dumps(resubmitted), content_type='application/json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(first.content)['id'], json.loads(second.content)['id'])
+        report = ClinicReport.objects.get()
+        self.assertEqual(report.immediate_emergency_care, 4)
+        self.assertEqual(report.musculoskeletal_exam, 2)
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_different_week_still_creates_new_report(self):
+        """Only the same (sport, week, term) is replaced; other weeks are new rows."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+        self.client.post(self.submit_url, data=json.dumps(self.payload), content_type='application/json')
+        other_week = dict(self.payload, week=7)
+        self.client.post(self.submit_url, data=json.dumps(other_week), content_type='application/json')
+        self.assertEqual(ClinicReport.objects.count(), 2)
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_bulk_submission_upserts_and_collapses_duplicates_in_batch(self):
+        """The bulk endpoint upserts too, keeping the last item for a repeated key."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+        existing = self.create_report(immediate_emergency_care=9)
+
+        resp = self.client.post(reverse('submit_reports_bulk'), data=json.dumps({'reports': [
+            dict(self.payload, immediate_emergency_care=1),
+            dict(self.payload, immediate_emergency_care=5),
+        ]}), content_type='application/json')
+
+        self.assertEqual(resp.status_code, 200)
+        report = ClinicReport.objects.get()
+        self.assertEqual(report.id, existing.id)
+        self.assertEqual(report.immediate_emergency_care, 5)
+
+
+class ImportClinicReportsTests(TestCase):
+    HEADER = [
+        'First Name', 'Last Name', 'Email', 'Sport', 'Date', 'Week',
+        'Immediate Emergency Care', 'Musculoskeletal Exam', 'Interacted HCPs', 'Healthcare Provider',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+        cls.physician, _ = HealthcareProvider.objects.get_or_create(name='Physician (MD/DO)', defaults={'active': True})
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_csv(self, rows, name='reports.csv'):
+        """Write HEADER plus rows to a CSV file and return its path."""
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', newline='') as target:
+            writer = csv.writer(target)
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_clinic_reports', path, stdout=out, **options)
+        return out.getvalue()
+
+    def read_errors(self, path):
+        with open(f'{path}.errors.csv', newline='') as errors:
+            return list(csv.reader(errors))[1:]
+
+    def test_import_loads_valid_rows_and_reports_errors_per_row(self):
+        """Valid rows are loaded with their term derived from the source date; bad rows are listed."""
+        path = self.write_csv([
+            ['Ada', 'Lovelace', 'ada@university.edu', 'football', '2021-03-04', '5', '2', '1', 'yes', 'physician (md/do)'],
+            ['Bob', 'Smith', 'bob@university.edu', 'Curling', '2021-03-04', '5', '', '', '', ''],
+            ['Cy', 'Jones', 'cy@university.edu', 'Football', '10/12/2020', '17', '', '', '', ''],
+            ['Di', 'Ng', 'di@university.edu', 'Football', '10/12/2020', '3', '', '4', '0', ''],
+        ])
+
+        out = self.run_import(path)
+
+        self.assertIn('2 reports loaded, 2 rows rejected', out)
+        ada = ClinicReport.objects.get(email='ada@university.edu')
+        self.assertEqual((ada.semester, ada.year, ada.week), ('Spring', 2021, 5))
+        self.assertEqual(ada.created_at.date().isoformat(), '2021-03-04')
+        self.assertEqual(ada.healthcare_provider, self.physician)
+        self.assertEqual((ada.immediate_emergency_care, ada.pharmacology), (2, 0))
+        di = ClinicReport.objects.get(email='di@university.edu')
+        self.assertEqual((di.semester, di.year, di.musculoskeletal_exam), ('Fall', 2020, 4))
+        self.assertEqual(self.read_errors(path), [
+            ['3', "Unknown sport 'Curling'"],
+            ['4', 'Week must be between 1 and 16'],
+        ])
+
+    def test_import_resumes_after_last_committed_chunk(self):
+        """A rerun on the same file skips rows a previous run already committed."""
+        rows = [
+            [f'S{i}', 'Student', f's{i}@university.edu', 'Football', '2022-09-01', '1', '1', '0', '0', '']
+            for i in range(5)
+        ]
+        path = self.write_csv(rows)
+        self.run_import(path, chunk_size=2)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.rows_processed, checkpoint.rows_loaded), (5, 5))
+        self.assertIsNotNone(checkpoint.completed_at)
+
+        # Pretend the run stopped after the first chunk was committed.
+        ClinicReport.objects.exclude(email__in=['s0@university.edu', 's1@university.edu']).delete()
+        checkpoint.rows_processed, checkpoint.rows_loaded, checkpoint.completed_at = 2, 2, None
+        checkpoint.save()
+
+        out = self.run_import(path, chunk_size=2)
+
+        self.assertIn('Resuming after 2 rows', out)
+        self.assertEqual(ClinicReport.objects.count(), 5)
+        self.assertIn('already imported', self.run_import(path))
+        self.assertEqual(ClinicReport.objects.count(), 5)
+
+    def test_dry_run_loads_nothing(self):
+        """--dry-run validates the file without writing reports or a checkpoint."""
+        path = self.write_csv([['Ada', 'L', 'ada@university.edu', 'Football', '2021-03-04', '5', '', '', '', '']])
+        self.assertIn('1 reports validated', self.run_import(path, dry_run=True))
+        self.assertFalse(ClinicReport.objects.exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_reads_xlsx(self):
+        """XLSX files are streamed in read-only mode, with native date cells."""
+        from datetime import datetime
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.HEADER)
+        sheet.append(['Ada', 'Lovelace', 'ada@university.edu', 'Football', datetime(2023, 8, 30), 2, 1, 0, None, None])
+        path = os.path.join(self.tmp.name, 'reports.xlsx')
+        workbook.save(path)
+
+        self.run_import(path)
+
+        report = ClinicReport.objects.get()
+        self.assertEqual((report.semester, report.year, report.week), ('Fall', 2023, 2))
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_import_upserts_when_one_report_per_week(self):
+        """With the natural-key index, imported rows replace the same weekly report."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+        path = self.write_csv([
+            ['Ada', 'L', 'ada@university.edu', 'Football', '2021-03-04', '5', '1', '', '', ''],
+            ['Ada', 'L', 'ada@university.edu', 'Football', '2021-03-05', '5', '3', '', '', ''],
+        ])
+
+        self.run_import(path)
+
+        report = ClinicReport.objects.get()
+        self.assertEqual(report.immediate_emergency_care, 3)
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_import_keeps_report_written_while_the_chunk_loads(self):
+        """A report updated after the chunk was stamped is not reverted by the upsert."""
+        call_command('remove_superseded_reports', enforce=True, stdout=StringIO())
+        self.run_import(self.write_csv([['Ada', 'L', 'ada@university.edu', 'Football', '2021-03-04', '5', '1', '', '', '']]))
+        ClinicReport.objects.update(immediate_emergency_care=7, updated_at=timezone.now() + timedelta(hours=1))
+
+        self.run_import(
+            self.write_csv([['Ada', 'L', 'ada@university.edu', 'Football', '2021-03-05', '5', '3', '', '', '']]),
+            restart=True,
+        )
+
+        self.assertEqual(ClinicReport.objects.get().immediate_emergency_care, 7)
+
+
+class SeedClinicDataTests(TransactionTestCase):
+    # Keep the sports seeded by the data migration for the tests that follow.
+    serialized_rollback = True
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_clinic_data', workers=1, years=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_seeds_weekly_reports_and_logs(self):
+        """Reports follow the weekly cadence, with terms matching their dates and no duplicate weeks."""
+        out = self.seed(reports=500, logs=50, seed=7, chunk_size=100)
+
+        reports = list(ClinicReport.objects.all())
+        self.assertIn(f'Seeded {len(reports)} clinic reports', out)
+        self.assertGreater(len(reports), 0)
+        self.assertEqual(AdminPortalLog.objects.count(), 50)
+        self.assertEqual(len({report.natural_key() for report in reports}), len(reports))
+        for report in reports:
+            self.assertEqual((report.semester, report.year), term_for(report.created_at))
+            self.assertTrue(1 <= report.week <= 16)
+            self.assertTrue(report.email.endswith('@seed.example.edu'))
+
+    def test_same_seed_gives_same_data(self):
+        """Reseeding with the same seed reproduces the same rows."""
+        fields = ('email', 'sport_id', 'week', 'year', 'created_at', 'musculoskeletal_exam')
+        self.seed(reports=200, logs=0, seed=3)
+        first = sorted(ClinicReport.objects.values_list(*fields))
+        ClinicReport.objects.all().delete()
+
+        self.seed(reports=200, logs=0, seed=3, chunk_size=40)
+
+        self.assertEqual(sorted(ClinicReport.objects.values_list(*fields)), first)
+
+
+@override_settings(CHANGE_FEED_SAFETY_LAG_SECONDS=0)
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.football, _ = Sport.objects.get_or_create(name='Football', defaults={'active': True})
+
+    def create_report(self, email):
+        care = {field: 0 for field in CARE_COUNT_FIELDS}
+        return ClinicReport.objects.create(
+            first_name='Feed', last_name='Student', email=email, sport=self.football, week=2, **care,
+        )
+
+    def pull(self, token='', **kwargs):
+        """Return (changes, deletions, final record) for one pull after token."""
+        *records, last = change_feed.changes_since(change_feed.Watermark.decode(token), **kwargs)
+        changes = [record['report']['email'] for record in records if record['op'] == 'upsert']
+        deletions = [record['id'] for record in records if record['op'] == 'delete']
+        return changes, deletions, last
+
+    def test_second_pull_returns_only_edits_and_deletions(self):
+        """After the first pull, only edited reports and tombstones of deleted ones are sent."""
+        kept = self.create_report('kept@university.edu')
+        edited = self.create_report('edited@university.edu')
+        deleted = self.create_report('deleted@university.edu')
+
+        changes, deletions, last = self.pull()
+        self.assertEqual(changes, ['kept@university.edu', 'edited@university.edu', 'deleted@university.edu'])
+        self.assertEqual((deletions, last['has_more']), ([], False))
+
+        edited.modalities = 3
+        edited.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        changes, deletions, second = self.pull(last['watermark'])
+        self.assertEqual(changes, ['edited@university.edu'])
+        self.assertEqual(deletions, [deleted_id])
+        self.assertEqual(self.pull(second['watermark'])[:2], ([], []))
+        self.assertTrue(ClinicReport.objects.filter(id=kept.id).exists())
+
+    def test_rows_inside_the_safety_lag_wait_for_the_next_pull(self):
+        """Rows written within the lag are held back, since their transaction may not have committed."""
+        self.create_report('recent@university.edu')
+        with override_settings(CHANGE_FEED_SAFETY_LAG_SECONDS=60):
+            changes, _, last = self.pull()
+        self.assertEqual(changes, [])
+        self.assertEqual(self.pull(last['watermark'])[0], ['recent@university.edu'])
+
+    def test_limit_pages_through_rows_with_the_same_timestamp(self):
+        """Keyset order on (updated_at, id) resumes correctly even when timestamps tie."""
+        for number in range(5):
+            self.create_report(f'student{number}@university.edu')
+        ClinicReport.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        with patch.object(change_feed, 'PAGE_SIZE', 2):
+            first, _, last = self.pull(limit=3)
+            second, _, final = self.pull(last['watermark'], limit=3)
+
+        self.assertTrue(last['has_more'])
+        self.assertFalse(final['has_more'])
+        self.assertEqual(first + second, [f'student{number}@university.edu' for number in range(5)])
+
+    def test_invalid_watermark_is_rejected(self):
+        with self.assertRaises(ValueError):
+            change_feed.Watermark.decode('not-a-watermark')
+
+    def test_command_remembers_watermark_in_state_file(self):
+        """Nightly runs with --state-file only write what changed since the previous run."""
+        self.create_report('first@university.edu')
+        with tempfile.TemporaryDirectory() as tmp:
+            state = os.path.join(tmp, 'watermark')
+            output = os.path.join(tmp, 'changes.jsonl')
+            call_command('export_report_changes', output, state_file=state, stderr=StringIO())
+            self.create_report('second@university.edu')
+            call_command('export_report_changes', output, state_file=state, stderr=StringIO())
+            with open(output) as changes:
+                emails = [json.loads(line)['report']['email'] for line in changes]
+        self.assertEqual(emails, ['second@university.edu'])
+        self.assertEqual(ClinicReportTombstone.objects.count(), 0)
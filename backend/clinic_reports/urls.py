@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.form_view, name='form'),
     path('api/submit/', views.submit_report, name='submit_report'),
+    path('api/submit/bulk/', views.submit_reports_bulk, name='submit_reports_bulk'),
 ]
@@ -4,37 +4,170 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponseBadRequest
 import json
 import logging
+from core.throttle import throttle
+from .idempotency import idempotent
 from .models import ClinicReport
-from .models import Sport, HealthcareProvider
+from .reference_data import get_reference_data
+from .reporting import CARE_COUNT_FIELDS, UPSERT_UPDATE_FIELDS, one_report_per_week, parse_interacted
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_REPORT_FIELDS = ['sport', 'week', *CARE_COUNT_FIELDS, 'interacted_hcps']
+
+# Upper bound on reports accepted by one bulk submission request.
+DEFAULT_BULK_SUBMIT_MAX_REPORTS = 50
+
+
 # Security note: Student form submissions require authentication because we want to protect against DDoS attacks.
 # This way, only verified students and faculty can submit the form and create new traffic to the database.
 @login_required
 def form_view(request):
     """Render the clinic report form. Requires an authenticated user."""
-    sports = Sport.objects.filter(active=True).values('id', 'name')
-    healthcare_providers = HealthcareProvider.objects.filter(active=True).values('id', 'name')
+    # Active sports/providers come from the in-process reference cache, not the DB.
+    reference = get_reference_data()
     weeks = list(range(1, 17))  # Weeks 1-16
     context = {
-        'sports': sports,
-        'healthcare_providers': healthcare_providers,
+        'sports': reference.sport_choices(),
+        'healthcare_providers': reference.provider_choices(),
         'weeks': weeks
     }
     return render(request, 'clinic_reports/form.html', context)
 
 
+def _parse_id(value):
+    """Return value as an int primary key, or None when it is not a valid id."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reporter_identity(user):
+    """Return ``(identity, error)`` for the authenticated user submitting reports.
+
+    Name and email always come from the user account, never from the form, so
+    students cannot change identity-related fields.
+    """
+    user_email = user.email
+    user_first_name = (user.first_name or '').strip()
+    user_last_name = (user.last_name or '').strip()
+
+    # Some SSO profiles may not populate first/last names consistently.
+    # Fall back to a safe split so valid users can still submit reports.
+    if not user_first_name or not user_last_name:
+        full_name = (user.get_full_name() or '').strip()
+        if full_name:
+            parts = full_name.split()
+            if not user_first_name:
+                user_first_name = parts[0]
+            if not user_last_name:
+                user_last_name = parts[-1] if len(parts) > 1 else 'Unknown'
+        else:
+            username_or_email = (user.get_username() or user_email or 'User').strip()
+            if '@' in username_or_email:
+                username_or_email = username_or_email.split('@', 1)[0]
+            if not user_first_name:
+                user_first_name = username_or_email[:100] or 'Unknown'
+            if not user_last_name:
+                user_last_name = 'Unknown'
+
+    if not user_email:
+        return None, 'No email is associated with your account. Please contact an administrator.'
+
+    try:
+        validate_email(user_email)
+    except ValidationError:
+        return None, 'Invalid email address on your account. Please contact an administrator.'
+
+    return {'first_name': user_first_name, 'last_name': user_last_name, 'email': user_email}, None
+
+
+def _clean_report_data(data, reference):
+    """Validate one submitted report payload.
+
+    Returns a ``(fields, error)`` pair: the ClinicReport field values for a
+    valid payload, or a user-facing error message for an invalid one.
+    """
+    if not isinstance(data, dict):
+        return None, 'Each report must be a JSON object'
+
+    missing = [f for f in REQUIRED_REPORT_FIELDS if data.get(f) is None]
+    if missing:
+        return None, f'Missing required fields: {", ".join(missing)}'
+
+    # Validate healthcare_provider if interacted_hcps is True
+    interacted_bool = parse_interacted(data.get('interacted_hcps'))
+    if interacted_bool and not data.get('healthcare_provider'):
+        return None, 'Healthcare provider is required when you interacted with other healthcare professionals'
+
+    sport_id = _parse_id(data.get('sport'))
+    if sport_id not in reference.sports:
+        return None, 'Invalid sport selection'
+
+    # Get healthcare provider if specified
+    healthcare_provider_id = None
+    if interacted_bool:
+        healthcare_provider_id = _parse_id(data.get('healthcare_provider'))
+        if healthcare_provider_id not in reference.providers:
+            return None, 'Invalid healthcare provider selection'
+
+    # Validate week is in range 1-16
+    try:
+        week = int(data.get('week'))
+    except (TypeError, ValueError):
+        return None, 'Invalid week value'
+    if not (1 <= week <= 16):
+        return None, 'Week must be between 1 and 16'
+
+    fields = {
+        'sport_id': sport_id,
+        'week': week,
+        'interacted_hcps': interacted_bool,
+        'healthcare_provider_id': healthcare_provider_id,
+    }
+    for field_name in CARE_COUNT_FIELDS:
+        try:
+            fields[field_name] = int(data.get(field_name, 0))
+        except (TypeError, ValueError):
+            return None, f'Invalid value for {field_name}'
+
+    return fields, None
+
+
+def _upsert_reports(reports):
+    """Insert reports with INSERT ... ON CONFLICT DO UPDATE on the weekly natural key.
+
+    Requires the unique index created by ``remove_superseded_reports --enforce``.
+    """
+    latest = {}
+    for report in reports:
+        report.assign_term()
+        # Postgres cannot update the same row twice in one statement, so the
+        # last report per natural key in the batch wins.
+        latest[report.natural_key()] = report
+    return ClinicReport.objects.bulk_create(
+        list(latest.values()),
+        update_conflicts=True,
+        unique_fields=list(ClinicReport.NATURAL_KEY_FIELDS),
+        update_fields=UPSERT_UPDATE_FIELDS,
+    )
+
+
 @require_http_methods(["POST"])
+@throttle('submit')
+@idempotent
 def submit_report(request):
     """API endpoint to submit clinic report.
 
     This endpoint requires the user to be authenticated. For Ajax POSTs from
     the form we return a JSON 401 when unauthenticated instead of a redirect
-    so the frontend can handle it cleanly.
+    so the frontend can handle it cleanly. Retries that repeat the
+    Idempotency-Key header get the original response instead of a new row.
     """
     if not request.user.is_authenticated:
         # Throw a 401 Forbidden error if user is not logged in
@@ -42,102 +175,82 @@ def submit_report(request):
 
     try:
         data = json.loads(request.body)
-        required_fields = [
-            'sport', 'week',
-            'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam',
-            'taping_bracing', 'rehabilitation_reconditioning', 'modalities',
-            'pharmacology', 'injury_illness_prevention', 'non_sport_patient', 'interacted_hcps'
-        ]
-        missing = [f for f in required_fields if data.get(f) is None]
-        if missing:
-            return JsonResponse({'success': False, 'error': f'Missing required fields: {", ".join(missing)}'}, status=400)
-        
-        # Validate healthcare_provider if interacted_hcps is True
-        interacted = data.get('interacted_hcps')
-        try:
-            interacted_bool = bool(int(interacted))
-        except (TypeError, ValueError):
-            interacted_bool = str(interacted).strip().lower() in {"1", "true", "True", "yes", "Yes", "y", "Y"}
-        
-        if interacted_bool and not data.get('healthcare_provider'):
-            return JsonResponse({'success': False, 'error': 'Healthcare provider is required when you interacted with other healthcare professionals'}, status=400)
-
-        # Name and email validation (from authenticated user account, not the form)
-        user_email = request.user.email
-        user_first_name = (request.user.first_name or '').strip()
-        user_last_name = (request.user.last_name or '').strip()
-
-        # Some SSO profiles may not populate first/last names consistently.
-        # Fall back to a safe split so valid users can still submit reports.
-        if not user_first_name or not user_last_name:
-            full_name = (request.user.get_full_name() or '').strip()
-            if full_name:
-                parts = full_name.split()
-                if not user_first_name:
-                    user_first_name = parts[0]
-                if not user_last_name:
-                    user_last_name = parts[-1] if len(parts) > 1 else 'Unknown'
-            else:
-                username_or_email = (request.user.get_username() or user_email or 'User').strip()
-                if '@' in username_or_email:
-                    username_or_email = username_or_email.split('@', 1)[0]
-                if not user_first_name:
-                    user_first_name = username_or_email[:100] or 'Unknown'
-                if not user_last_name:
-                    user_last_name = 'Unknown'
 
-        if not user_email:
-            return JsonResponse({'success': False, 'error': 'No email is associated with your account. Please contact an administrator.'}, status=400)
+        identity, error = _reporter_identity(request.user)
+        if error:
+            return JsonResponse({'success': False, 'error': error}, status=400)
 
-        try:
-            validate_email(user_email)
-        except ValidationError:
-            return JsonResponse({'success': False, 'error': 'Invalid email address on your account. Please contact an administrator.'}, status=400)
+        fields, error = _clean_report_data(data, get_reference_data())
+        if error:
+            return JsonResponse({'success': False, 'error': error}, status=400)
 
-        sport_id = data.get('sport')
-        try:
-            sport = Sport.objects.get(id=sport_id, active=True)
-        except Sport.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Invalid sport selection'}, status=400)
-        
-        # Get healthcare provider if specified
-        healthcare_provider = None
-        if interacted_bool:
-            provider_id = data.get('healthcare_provider')
-            try:
-                healthcare_provider = HealthcareProvider.objects.get(id=provider_id, active=True)
-            except HealthcareProvider.DoesNotExist:
-                return JsonResponse({'success': False, 'error': 'Invalid healthcare provider selection'}, status=400)
-
-        # Validate week is in range 1-16
-        try:
-            week = int(data.get('week'))
-            if not (1 <= week <= 16):
-                return JsonResponse({'success': False, 'error': 'Week must be between 1 and 16'}, status=400)
-        except (TypeError, ValueError):
-            return JsonResponse({'success': False, 'error': 'Invalid week value'}, status=400)
-
-        report = ClinicReport.objects.create(
-            # Force name and email to the authenticated user's values so
-            # students cannot change identity-related fields on the form.
-            first_name=user_first_name,
-            last_name=user_last_name,
-            email=user_email,
-            sport=sport,
-            week=week,
-            immediate_emergency_care=int(data.get('immediate_emergency_care', 0)),
-            musculoskeletal_exam=int(data.get('musculoskeletal_exam', 0)),
-            non_musculoskeletal_exam=int(data.get('non_musculoskeletal_exam', 0)),
-            taping_bracing=int(data.get('taping_bracing', 0)),
-            rehabilitation_reconditioning=int(data.get('rehabilitation_reconditioning', 0)),
-            modalities=int(data.get('modalities', 0)),
-            pharmacology=int(data.get('pharmacology', 0)),
-            injury_illness_prevention=int(data.get('injury_illness_prevention', 0)),
-            non_sport_patient=int(data.get('non_sport_patient', 0)),
-            interacted_hcps=interacted_bool,
-            healthcare_provider=healthcare_provider
-        )
+        if one_report_per_week():
+            report, = _upsert_reports([ClinicReport(**identity, **fields)])
+        else:
+            report = ClinicReport.objects.create(**identity, **fields)
         return JsonResponse({'success': True, 'id': report.id})
     except Exception as e:
         logger.error(f"Clinic report submission error: {e}")
         return JsonResponse({'success': False, 'error': 'Failed to submit clinic report'}, status=400)
+
+
+@require_http_methods(["POST"])
+@throttle('submit')
+@idempotent
+def submit_reports_bulk(request):
+    """API endpoint to submit several clinic reports in one request.
+
+    Accepts ``{"reports": [...]}`` (or a bare JSON list) where each item has
+    the same shape as a ``submit_report`` payload. The batch is all-or-nothing:
+    if any item is invalid nothing is saved and the errors are returned per
+    item index; otherwise every report is inserted with one bulk INSERT.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+
+    items = data.get('reports') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'success': False, 'error': 'Expected a non-empty list of reports'}, status=400)
+
+    max_reports = getattr(settings, 'CLINIC_REPORTS_BULK_MAX_REPORTS', DEFAULT_BULK_SUBMIT_MAX_REPORTS)
+    if len(items) > max_reports:
+        return JsonResponse(
+            {'success': False, 'error': f'At most {max_reports} reports can be submitted at once'},
+            status=400,
+        )
+
+    try:
+        identity, error = _reporter_identity(request.user)
+        if error:
+            return JsonResponse({'success': False, 'error': error}, status=400)
+
+        reference = get_reference_data()
+
+        reports = []
+        errors = []
+        for index, item in enumerate(items):
+            fields, error = _clean_report_data(item, reference)
+            if error:
+                errors.append({'index': index, 'error': error})
+                continue
+            report = ClinicReport(**identity, **fields)
+            report.assign_term()
+            reports.append(report)
+
+        if errors:
+            return JsonResponse({'success': False, 'errors': errors}, status=400)
+
+        with transaction.atomic():
+            if one_report_per_week():
+                created = _upsert_reports(reports)
+            else:
+                created = ClinicReport.objects.bulk_create(reports)
+        return JsonResponse({'success': True, 'ids': [report.id for report in created]})
+    except Exception as e:
+        logger.error(f"Bulk clinic report submission error: {e}")
+        return JsonResponse({'success': False, 'error': 'Failed to submit clinic reports'}, status=400)
@@ -0,0 +1,140 @@
+"""PostgreSQL backend with persistent connections that respect token expiry.
+
+Behaves like ``django.db.backends.postgresql`` but:
+
+- when the password is a short-lived credential (an object with ``expiry``,
+  a Unix timestamp, such as ``config.settings.AzureDbToken``), a persistent
+  connection is closed at the end of the request once its token is within
+  ``DB_TOKEN_RECYCLE_MARGIN_SECONDS`` of expiring, so the next request
+  reconnects with a fresh token;
+- per-process connection stats are kept for the metrics endpoint
+  (see :func:`connection_stats`).
+
+Persistence itself is Django's own ``CONN_MAX_AGE`` / ``CONN_HEALTH_CHECKS``.
+"""
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+# Close a connection this many seconds before the token it was opened with expires.
+DEFAULT_DB_TOKEN_RECYCLE_MARGIN_SECONDS = 300
+
+_stats_lock = threading.Lock()
+_counters = {
+    'connects': 0,
+    'connect_wait_ms_total': 0.0,
+    'connect_wait_ms_max': 0.0,
+    'token_recycles': 0,
+    'health_check_failures': 0,
+}
+# One wrapper per thread per alias; weak so finished threads drop out.
+_wrappers = weakref.WeakSet()
+
+
+def _increment(name, amount=1):
+    """Add amount to a process-wide counter."""
+    with _stats_lock:
+        _counters[name] += amount
+
+
+def token_recycle_margin():
+    """Return how many seconds before token expiry a connection is recycled."""
+    return getattr(settings, 'DB_TOKEN_RECYCLE_MARGIN_SECONDS', DEFAULT_DB_TOKEN_RECYCLE_MARGIN_SECONDS)
+
+
+def connection_stats():
+    """Return per-process database connection stats.
+
+    ``open`` counts live connections held by this process's threads and
+    ``idle`` those not inside a transaction. ``waits`` counts requests that
+    had to open a new connection (reused persistent connections do not wait),
+    with the time spent connecting in ``connect_wait_ms_*``.
+    """
+    open_connections = idle = 0
+    for wrapper in list(_wrappers):
+        raw = wrapper.connection
+        if raw is None or raw.closed:
+            continue
+        open_connections += 1
+        if raw.get_transaction_status() == TRANSACTION_STATUS_IDLE:
+            idle += 1
+
+    with _stats_lock:
+        counters = dict(_counters)
+
+    return {
+        'open': open_connections,
+        'idle': idle,
+        'waits': counters['connects'],
+        'connect_wait_ms_total': round(counters['connect_wait_ms_total'], 3),
+        'connect_wait_ms_max': round(counters['connect_wait_ms_max'], 3),
+        'token_recycles': counters['token_recycles'],
+        'health_check_failures': counters['health_check_failures'],
+    }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Unix timestamp at which the current connection's credential expires.
+        self.credential_expires_at = None
+        # True when close_at was set by the token expiry rather than CONN_MAX_AGE.
+        self.close_at_token_expiry = False
+        _wrappers.add(self)
+
+    def get_connection_params(self):
+        """Resolve a token password once, remembering when that token expires."""
+        conn_params = super().get_connection_params()
+        password = self.settings_dict['PASSWORD']
+        self.credential_expires_at = getattr(password, 'expiry', None)
+        if self.credential_expires_at is not None:
+            conn_params['password'] = str(password)
+            # str() may have refreshed the token; read the expiry it was issued with.
+            self.credential_expires_at = password.expiry
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        """Open a connection and record how long the caller waited for it."""
+        started = time.monotonic()
+        connection = super().get_new_connection(conn_params)
+        waited_ms = (time.monotonic() - started) * 1000
+        with _stats_lock:
+            _counters['connects'] += 1
+            _counters['connect_wait_ms_total'] += waited_ms
+            _counters['connect_wait_ms_max'] = max(_counters['connect_wait_ms_max'], waited_ms)
+        return connection
+
+    def connect(self):
+        """Connect, then bring close_at forward so the connection ends before its token."""
+        super().connect()
+        self.close_at_token_expiry = False
+        if self.credential_expires_at is None:
+            return
+        remaining = self.credential_expires_at - time.time() - token_recycle_margin()
+        token_close_at = time.monotonic() + remaining
+        if self.close_at is None or token_close_at < self.close_at:
+            self.close_at = token_close_at
+            self.close_at_token_expiry = True
+
+    def close_if_unusable_or_obsolete(self):
+        """Count token-driven recycles before Django closes an obsolete connection."""
+        if (
+            self.connection is not None
+            and self.close_at_token_expiry
+            and self.get_autocommit() == self.settings_dict['AUTOCOMMIT']
+            and time.monotonic() >= self.close_at
+        ):
+            _increment('token_recycles')
+        super().close_if_unusable_or_obsolete()
+
+    def is_usable(self):
+        """Run Django's health check, counting connections found broken."""
+        usable = super().is_usable()
+        if not usable:
+            _increment('health_check_failures')
+        return usable
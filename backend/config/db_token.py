@@ -0,0 +1,170 @@
+"""Entra ID access token used as the PostgreSQL password in Azure.
+
+:class:`AzureDbToken` is placed in ``DATABASES['default']['PASSWORD']``;
+psycopg2 calls ``str()`` on it whenever a connection is opened. After the
+first fetch, a daemon thread refreshes the token ahead of expiry, so opening
+a connection normally just returns the cached token instead of waiting on
+Azure.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+AZURE_POSTGRES_SCOPE = "https://ossrdbms-aad.database.windows.net/.default"
+
+
+class AzureDbToken:
+    """Cached Azure PostgreSQL access token, refreshed in the background.
+
+    - The background thread refreshes ``refresh_margin`` seconds (minus up to
+      ``jitter`` seconds, so workers do not all refresh at once) before expiry.
+    - The last good token is served while a refresh is in flight or
+      failing; failed refreshes are retried with exponential backoff.
+    - A request only blocks on Azure when there is no token yet or the
+      cached one has less than ``min_remaining`` seconds left.
+
+    ``credential`` is anything with ``get_token(scope)`` returning an object
+    with ``token`` and ``expires_on`` (default: DefaultAzureCredential).
+    """
+
+    def __init__(
+        self,
+        credential=None,
+        scope=AZURE_POSTGRES_SCOPE,
+        refresh_margin=600,
+        min_remaining=300,
+        jitter=60,
+        backoff_initial=1,
+        backoff_max=60,
+    ):
+        """Configure the credential and refresh schedule; no token is fetched yet."""
+        self.token = None
+        self.expiry = 0
+        if credential is None:
+            # azure.identity is slow to import and only needed in Azure, so load it here.
+            from azure.identity import DefaultAzureCredential
+
+            credential = DefaultAzureCredential()
+        self.cred = credential
+        self.scope = scope
+        self.refresh_margin = refresh_margin
+        self.min_remaining = min_remaining
+        self.jitter = jitter
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._refresh_at = 0
+        # Serialises calls to the credential (background and blocking refreshes).
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._stats = {
+            'refreshes': 0,
+            'failures': 0,
+            'blocking_refreshes': 0,
+            'latency_ms_total': 0.0,
+            'latency_ms_last': None,
+            'latency_ms_max': 0.0,
+        }
+
+    def __str__(self):
+        """Return the cached token, fetching it inline only when none is usable."""
+        if not self._usable():
+            with self._refresh_lock:
+                # Another thread may have refreshed while we waited for the lock.
+                if not self._usable():
+                    self._fetch(blocking=True)
+        self._ensure_refresher()
+        return self.token
+
+    def _usable(self):
+        """Return True when the cached token has at least min_remaining seconds left."""
+        return self.token is not None and self.expiry - time.time() >= self.min_remaining
+
+    def _fetch(self, blocking=False):
+        """Get a new token from the credential and record how long it took."""
+        started = time.monotonic()
+        try:
+            token_obj = self.cred.get_token(self.scope)
+        except Exception:
+            with self._stats_lock:
+                self._stats['failures'] += 1
+            raise
+        latency_ms = (time.monotonic() - started) * 1000
+
+        self.token = token_obj.token
+        self.expiry = token_obj.expires_on
+        self._refresh_at = self.expiry - self.refresh_margin - random.uniform(0, self.jitter)
+        with self._stats_lock:
+            self._stats['refreshes'] += 1
+            if blocking:
+                self._stats['blocking_refreshes'] += 1
+            self._stats['latency_ms_total'] += latency_ms
+            self._stats['latency_ms_last'] = latency_ms
+            self._stats['latency_ms_max'] = max(self._stats['latency_ms_max'], latency_ms)
+
+    def refresh(self):
+        """Fetch a new token now, without blocking readers of the current one."""
+        with self._refresh_lock:
+            self._fetch()
+
+    def _backoff_delay(self, failures):
+        """Return the wait before retry number ``failures``: exponential, capped, jittered."""
+        delay = min(self.backoff_max, self.backoff_initial * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _ensure_refresher(self):
+        """Start the background refresh thread if it is not running in this process."""
+        pid = os.getpid()
+        if self._thread_pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            # Threads do not survive a fork (e.g. gunicorn --preload), so check the pid too.
+            if self._thread_pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='azure-db-token-refresh', daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self):
+        """Refresh loop: sleep until the next refresh time, retrying failures with backoff."""
+        failures = 0
+        while True:
+            if failures:
+                delay = self._backoff_delay(failures)
+            else:
+                delay = self._refresh_at - time.time()
+            if self._stop.wait(max(0, delay)):
+                return
+            try:
+                self.refresh()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Background Entra ID token refresh failed (attempt {failures}): {e}")
+
+    def stop(self):
+        """Stop the background refresh thread (used by tests and shutdown hooks)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def refresh_stats(self):
+        """Return refresh counters and latencies for the metrics endpoint."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        latency_ms_total = stats.pop('latency_ms_total')
+        return {
+            **stats,
+            'latency_ms_avg': round(latency_ms_total / stats['refreshes'], 3) if stats['refreshes'] else None,
+            'expires_in_seconds': round(self.expiry - time.time()) if self.token else None,
+            'background_refresher_alive': self._thread is not None and self._thread.is_alive(),
+        }
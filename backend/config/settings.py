@@ -15,24 +15,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
-from azure.identity import DefaultAzureCredential
-import time
-
-class AzureDbToken:
-    def __init__(self):
-        """Configure an Azure credential client and in-memory token cache."""
-        self.token = None
-        self.expiry = 0
-        self.cred = DefaultAzureCredential()
-
-    def __str__(self):
-        """Return a cached Azure PostgreSQL access token, refreshing when near expiry."""
-        # If token is missing or expiring in less than 5 mins, refresh it
-        if not self.token or self.expiry < (time.time() + 300):
-            token_obj = self.cred.get_token("https://ossrdbms-aad.database.windows.net/.default")
-            self.token = token_obj.token
-            self.expiry = token_obj.expires_on
-        return self.token
+from config.db_token import AzureDbToken
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -104,11 +87,14 @@ if not IS_IN_AZURE:
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedUserAuthenticationMiddleware',
+    'core.middleware.RequestProfilerMiddleware',
+    'core.middleware.StickyPrimaryMiddleware',
     'user_logging.middleware.UserActivityLoggingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -156,20 +142,40 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# config.db_backends.postgresql is Django's PostgreSQL backend plus token-aware
+# recycling of persistent connections and connection stats (see /metrics/).
+# DB_CONN_MAX_AGE > 0 keeps a connection open across requests (saves a TLS +
+# auth handshake per request); 0 is the old connect-per-request behaviour and
+# "none" keeps connections open indefinitely (still recycled before the token expires).
+_db_conn_max_age = os.getenv("DB_CONN_MAX_AGE", "0").strip().lower()
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "config.db_backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": None if _db_conn_max_age == "none" else int(_db_conn_max_age),
+        # Ping reused connections once per request so a dropped one is replaced, not surfaced as an error.
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() in ("1", "true", "yes"),
     }
 }
 
+# Persistent connections opened with an Entra ID token are closed this many
+# seconds before that token expires, and the next request reconnects with a new one.
+DB_TOKEN_RECYCLE_MARGIN_SECONDS = int(os.getenv("DB_TOKEN_RECYCLE_MARGIN_SECONDS", "300"))
+
 if IS_IN_AZURE:
     DATABASES['default']['OPTIONS'] = {'sslmode': 'require'}
     try:
-        DATABASES['default']['PASSWORD'] = AzureDbToken()
+        # Refreshed by a background thread DB_TOKEN_REFRESH_MARGIN_SECONDS before
+        # expiry; a connection only waits on Azure if the cached token has less
+        # than the recycle margin left.
+        DATABASES['default']['PASSWORD'] = AzureDbToken(
+            refresh_margin=int(os.getenv("DB_TOKEN_REFRESH_MARGIN_SECONDS", "600")),
+            min_remaining=DB_TOKEN_RECYCLE_MARGIN_SECONDS,
+        )
     except Exception as e:
         import logging
         logging.getLogger(__name__).critical(f"Failed to acquire Entra ID token in Azure environment. Error: {e}")
@@ -177,6 +183,144 @@ if IS_IN_AZURE:
 else:
     DATABASES['default']['PASSWORD'] = os.getenv("POSTGRES_PASSWORD")
 
+# Optional read replica. When POSTGRES_REPLICA_HOST is set, the faculty
+# dashboard, student dashboard data, exports and admin changelists read from it
+# (core.replica); writes and everything else stay on the primary. Reads fall
+# back to the primary while the replica is more than REPLICA_MAX_LAG_SECONDS
+# behind (checked every REPLICA_LAG_CHECK_SECONDS), and for REPLICA_STICKY_SECONDS
+# after a user's own write. Tests use the default database for the replica.
+_replica_host = os.getenv("POSTGRES_REPLICA_HOST")
+if _replica_host:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        "HOST": _replica_host,
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES['default']['PORT']),
+        "NAME": os.getenv("POSTGRES_REPLICA_DB", DATABASES['default']['NAME']),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = int(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_LAG_CHECK_SECONDS = int(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))
+
+# Longest a single query may run (Postgres statement_timeout, in ms; 0 = no
+# limit) on the faculty/student dashboards, the Excel/summary exports and admin
+# list pages; the streamed CSV export has none. A dashboard widget that times
+# out is shown empty with a "narrow the filters" notice; exports answer 503.
+# Timeouts are counted at /metrics/.
+DASHBOARD_STATEMENT_TIMEOUT_MS = int(os.getenv("DASHBOARD_STATEMENT_TIMEOUT_MS", "5000"))
+EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv("EXPORT_STATEMENT_TIMEOUT_MS", "120000"))
+ADMIN_STATEMENT_TIMEOUT_MS = int(os.getenv("ADMIN_STATEMENT_TIMEOUT_MS", "10000"))
+
+# Rate limits for report submission, exports and dashboards (core.throttle),
+# per signed-in user and per client IP, as "<count>/<second|minute|hour|day>";
+# an empty value turns that limit off. Counters live in the default cache below,
+# so they only hold across workers when that cache is shared. Over the limit a
+# view answers 429 with a Retry-After header.
+VIEW_THROTTLE_ENABLED = os.environ.get('VIEW_THROTTLE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+# Reverse proxies in front of the app that append to X-Forwarded-For (Azure App
+# Service has one). The per-IP limit uses the address the outermost of them saw;
+# with 0 it uses REMOTE_ADDR and ignores the client-supplied header.
+THROTTLE_TRUSTED_PROXY_COUNT = int(os.environ.get('THROTTLE_TRUSTED_PROXY_COUNT', '1' if IS_IN_AZURE else '0'))
+VIEW_THROTTLE_RATES = {
+    'submit': {
+        'user': os.environ.get('THROTTLE_SUBMIT_USER', '30/minute'),
+        'ip': os.environ.get('THROTTLE_SUBMIT_IP', '300/minute'),
+    },
+    'export': {
+        'user': os.environ.get('THROTTLE_EXPORT_USER', '10/minute'),
+        'ip': os.environ.get('THROTTLE_EXPORT_IP', '60/minute'),
+    },
+    'dashboard': {
+        'user': os.environ.get('THROTTLE_DASHBOARD_USER', '60/minute'),
+        'ip': os.environ.get('THROTTLE_DASHBOARD_IP', '600/minute'),
+    },
+}
+
+# Cache shared by app workers. Defaults to per-process local memory; in
+# deployment point DJANGO_CACHE_BACKEND/DJANGO_CACHE_LOCATION at a backend every
+# worker and instance can see (e.g. django.core.cache.backends.db.DatabaseCache
+# with a table created by `manage.py createcachetable`), so cache-based
+# invalidation such as the clinic report reference-data version reaches them all.
+# With the local-memory default, a sport or provider edit reaches only the worker
+# that made it; other workers reload on REFERENCE_DATA_MAX_AGE_SECONDS instead. The
+# version is bumped by the Sport/HealthcareProvider save and delete signals, which
+# QuerySet.update(), bulk_create() and bulk_update() skip: call
+# reference_data.bump_version() after those.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+# Backends that live inside one worker process: a stamp written to them never
+# reaches the other workers, so features that invalidate through the cache
+# default to off (or to short lifetimes) with them.
+_PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+_SHARED_CACHE = CACHES['default']['BACKEND'] not in _PROCESS_LOCAL_CACHES
+
+# Active sports/providers are cached per worker (clinic_reports.reference_data).
+# Workers compare their copy with the shared version stamp at most this often.
+REFERENCE_DATA_VERSION_CHECK_SECONDS = int(os.environ.get('REFERENCE_DATA_VERSION_CHECK_SECONDS', '5'))
+# Upper bound on a worker's copy regardless of the stamp. Without a shared cache
+# the stamp never reaches other workers, so this bound is all that refreshes them.
+REFERENCE_DATA_MAX_AGE_SECONDS = int(os.environ.get('REFERENCE_DATA_MAX_AGE_SECONDS', '300' if _SHARED_CACHE else '5'))
+
+# Report submissions carrying an Idempotency-Key header replay their first
+# successful response for this long. Purge older keys with
+# `manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', str(24 * 60 * 60)))
+
+# One report per student per sport per week per term: resubmissions replace the
+# earlier report (INSERT ... ON CONFLICT DO UPDATE). Run
+# `manage.py remove_superseded_reports --enforce` to delete superseded duplicates and
+# create the unique index BEFORE turning this on; until then the clinic_reports.E001
+# database check stops migrate_if_needed (and so the container's boot).
+CLINIC_REPORTS_ONE_REPORT_PER_WEEK = os.environ.get(
+    'CLINIC_REPORTS_ONE_REPORT_PER_WEEK',
+    'False'
+).lower() in ('1', 'true', 'yes')
+
+# The report change feed (clinic_reports.change_feed) holds back rows written in
+# the last CHANGE_FEED_SAFETY_LAG_SECONDS, so a transaction still in flight when a
+# consumer pulls cannot commit behind its watermark. Keep it above the longest
+# transaction that writes clinic reports.
+CHANGE_FEED_SAFETY_LAG_SECONDS = int(os.environ.get('CHANGE_FEED_SAFETY_LAG_SECONDS', '60'))
+
+# Threads per worker process used to run independent dashboard queries side by
+# side (core.concurrency). Each thread holds its own DB connection, so a process
+# can use up to this many extra connections. 0 or 1 runs the queries serially,
+# and so does DB_CONN_MAX_AGE=0: without persistent connections each query
+# would pay for a new connection.
+DASHBOARD_QUERY_WORKERS = int(os.environ.get('DASHBOARD_QUERY_WORKERS', '4'))
+
+# Identical faculty dashboard requests that overlap share one computation, in
+# this process and (through a Postgres advisory lock and the shared cache) across
+# processes. See core.singleflight.
+DASHBOARD_SINGLE_FLIGHT = os.environ.get('DASHBOARD_SINGLE_FLIGHT', 'True').lower() in ('1', 'true', 'yes')
+# Seconds an overlapping request waits for the one already computing before it
+# computes itself. Defaults to the dashboard statement budget: a waiter, which
+# holds a worker, is never kept longer than its own queries may run.
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.environ.get(
+    'SINGLE_FLIGHT_WAIT_SECONDS', DASHBOARD_STATEMENT_TIMEOUT_MS / 1000 or 5,
+))
+
+# Response compression (core.middleware.CompressionMiddleware): Brotli when the
+# brotli package is installed, otherwise gzip, for allow-listed content types
+# over COMPRESSION_MIN_SIZE bytes. Streaming responses and attachments are never
+# compressed. Pages that embed a CSRF token are skipped to avoid BREACH; set
+# COMPRESSION_SKIP_CSRF_RESPONSES=False to compress them anyway (Django masks the
+# token per response and gzip output gets random padding).
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_SKIP_CSRF_RESPONSES = os.environ.get(
+    'COMPRESSION_SKIP_CSRF_RESPONSES',
+    'True'
+).lower() in ('1', 'true', 'yes')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -338,6 +482,32 @@ SESSION_COOKIE_AGE = int(os.environ.get(
     '28800' if IS_IN_AZURE else '1209600'
 ))
 
+# Sessions are read through the cache and written through to the database
+# (cached_db) once DJANGO_CACHE_BACKEND names a shared cache; a per-process
+# cache would let a worker holding a cached copy keep a logged-out session
+# alive. Without one they stay database-only.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if _SHARED_CACHE
+    else 'django.contrib.sessions.backends.db',
+)
+# The signed-in user is rebuilt from a snapshot in the session for this many
+# seconds instead of being queried on every request (core.user_snapshot);
+# saving or deleting the user drops it sooner. 0 queries it every request.
+# Off by default without a shared cache: the session (and so the snapshot) is
+# read by every worker, but the stamp that drops it after e.g. is_staff is
+# revoked would only reach the worker that saved the user.
+USER_SNAPSHOT_SECONDS = int(os.environ.get('USER_SNAPSHOT_SECONDS', '60' if _SHARED_CACHE else '0'))
+
+# Staff can profile their own requests from the Request profiles admin page
+# (core.profiling): profiling stays on in their browser for
+# REQUEST_PROFILE_COOKIE_SECONDS, stacks are sampled every
+# REQUEST_PROFILE_SAMPLE_INTERVAL_MS, and `manage.py purge_request_profiles`
+# deletes profiles older than REQUEST_PROFILE_RETENTION_DAYS.
+REQUEST_PROFILE_COOKIE_SECONDS = int(os.environ.get('REQUEST_PROFILE_COOKIE_SECONDS', str(30 * 60)))
+REQUEST_PROFILE_SAMPLE_INTERVAL_MS = int(os.environ.get('REQUEST_PROFILE_SAMPLE_INTERVAL_MS', '5'))
+REQUEST_PROFILE_RETENTION_DAYS = int(os.environ.get('REQUEST_PROFILE_RETENTION_DAYS', '14'))
+
 # Extra security headers (recommended for FERPA-sensitive apps)
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
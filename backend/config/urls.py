@@ -20,6 +20,7 @@ from django.urls import path, include
 from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.utils.http import urlencode, url_has_allowed_host_and_scheme
+from core.views import health_ready_view
 import os
 
 # Configurable admin URL - set ADMIN_URL in env to keep it secret from public repo
@@ -63,6 +64,8 @@ def login_entry(request):
 
 urlpatterns = [
     path('health/', lambda request: JsonResponse({"status": "ok"}), name='health'),
+    # Point the load balancer's health probe here so only warmed-up workers get traffic.
+    path('health/ready/', health_ready_view, name='health_ready'),
     path('', include('core.urls')),
     path('login/', login_entry, name='login_entry'),
     path(f'{ADMIN_URL}login/', _admin_login, name='admin_login'),
@@ -1,3 +1,123 @@
-from django.contrib import admin
+import json
 
-# Register your models here.
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
+
+from . import profiling
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/core/requestprofile/change_list.html'
+    list_display = (
+        'created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_duration_ms', 'user',
+        'downloads',
+    )
+    list_filter = ('method', 'status_code', 'created_at')
+    search_fields = ('path', 'query_string', 'user__username')
+    ordering = ('-created_at',)
+    list_select_related = ('user',)
+    exclude = ('collapsed_stacks', 'queries')
+    readonly_fields = (
+        'created_at', 'user', 'method', 'path', 'query_string', 'status_code', 'duration_ms', 'sql_count',
+        'sql_duration_ms', 'sample_count', 'downloads',
+    )
+
+    def has_add_permission(self, request):
+        """Profiles are only recorded by the profiler middleware."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Profiles are read-only records of past requests."""
+        return False
+
+    def get_urls(self):
+        """Add the start/stop profiling and download views under this model's admin URLs."""
+        view = self.admin_site.admin_view
+        return [
+            path('start/', view(require_POST(self.start_profiling)), name='core_requestprofile_start'),
+            path('stop/', view(require_POST(self.stop_profiling)), name='core_requestprofile_stop'),
+            path(
+                '<int:profile_id>/download/<str:kind>/',
+                view(self.download),
+                name='core_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description='Download')
+    def downloads(self, obj):
+        """Link to the collapsed stacks and the full profile as JSON."""
+        return format_html(
+            '<a href="{}">stacks</a> | <a href="{}">json</a>',
+            reverse('admin:core_requestprofile_download', args=[obj.pk, 'stacks']),
+            reverse('admin:core_requestprofile_download', args=[obj.pk, 'json']),
+        )
+
+    def _changelist_redirect(self):
+        return HttpResponseRedirect(reverse('admin:core_requestprofile_changelist'))
+
+    def start_profiling(self, request):
+        """Set the signed cookie that profiles this staff member's requests for a while."""
+        seconds = getattr(settings, 'REQUEST_PROFILE_COOKIE_SECONDS', profiling.DEFAULT_COOKIE_SECONDS)
+        response = self._changelist_redirect()
+        response.set_cookie(
+            profiling.PROFILE_COOKIE_NAME,
+            profiling.profiling_token(request.user),
+            max_age=seconds,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite='Lax',
+        )
+        self.message_user(
+            request,
+            f'Your requests are profiled for the next {seconds // 60} minutes. '
+            'Reproduce the slow page, then find it in the list below.',
+            messages.SUCCESS,
+        )
+        return response
+
+    def stop_profiling(self, request):
+        """Remove the profiling cookie."""
+        response = self._changelist_redirect()
+        response.delete_cookie(profiling.PROFILE_COOKIE_NAME, samesite='Lax')
+        self.message_user(request, 'Profiling stopped.', messages.SUCCESS)
+        return response
+
+    def download(self, request, profile_id, kind):
+        """Return a profile's collapsed stacks (for flame-graph tools) or the whole profile as JSON."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        if kind == 'stacks':
+            response = HttpResponse(profile.collapsed_stacks, content_type='text/plain; charset=utf-8')
+            filename = f'request-profile-{profile.pk}.folded'
+        elif kind == 'json':
+            data = {
+                'id': profile.pk,
+                'created_at': profile.created_at,
+                'user': profile.user.get_username() if profile.user else None,
+                'method': profile.method,
+                'path': profile.path,
+                'query_string': profile.query_string,
+                'status_code': profile.status_code,
+                'duration_ms': profile.duration_ms,
+                'sql_count': profile.sql_count,
+                'sql_duration_ms': profile.sql_duration_ms,
+                'sample_count': profile.sample_count,
+                'collapsed_stacks': profile.collapsed_stacks,
+                'queries': profile.queries,
+            }
+            response = HttpResponse(json.dumps(data, cls=DjangoJSONEncoder, indent=2), content_type='application/json')
+            filename = f'request-profile-{profile.pk}.json'
+        else:
+            return HttpResponse(status=404)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        """Register signal handlers and the metrics sources reported by the staff metrics endpoint."""
+        from django.conf import settings
+
+        import core.signals  # noqa: F401
+
+        from config.db_backends.postgresql.base import connection_stats
+
+        from . import metrics
+        from .query_budget import statement_timeout_stats
+        from .singleflight import single_flight_stats
+        from .throttle import throttle_stats
+
+        metrics.register_source('database_connections', connection_stats)
+        metrics.register_source('single_flight', single_flight_stats)
+        metrics.register_source('statement_timeouts', statement_timeout_stats)
+        metrics.register_source('throttled_requests', throttle_stats)
+
+        db_password = settings.DATABASES['default'].get('PASSWORD')
+        if hasattr(db_password, 'refresh_stats'):
+            metrics.register_source('database_token', db_password.refresh_stats)
@@ -0,0 +1,70 @@
+"""Compact columnar chart payloads and a fast JSON encoder.
+
+Chart data used to be sent as one object per slice/series, repeating keys
+like ``label``, ``value``, ``borderColor`` and ``tension`` in every element.
+The columnar form sends parallel arrays plus a table of distinct series
+styles; the dashboard templates expand it back into Chart.js objects.
+"""
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead.
+    orjson = None
+
+# Characters escaped when JSON is embedded in a <script> element (as Django's json_script does).
+_JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+def dumps(data):
+    """Serialise data to a compact JSON string, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(',', ':'))
+
+
+def pie_columns(pie_chart_data):
+    """Convert ``[{'label', 'value'}, ...]`` slices into ``{'labels': [...], 'values': [...]}``."""
+    return {
+        'labels': [item['label'] for item in pie_chart_data],
+        'values': [item['value'] for item in pie_chart_data],
+    }
+
+
+def trend_columns(trend_datasets):
+    """Convert Chart.js line datasets into parallel arrays plus a style table.
+
+    Returns ``{'labels': [...], 'data': [[...], ...], 'style': [i, ...], 'styles': [{...}, ...]}``
+    where ``styles[style[n]]`` holds every other key of dataset ``n``.
+    """
+    columns = {'labels': [], 'data': [], 'style': [], 'styles': []}
+    style_index = {}
+    for dataset in trend_datasets:
+        style = {key: value for key, value in dataset.items() if key not in ('label', 'data')}
+        style_key = dumps(style)
+        if style_key not in style_index:
+            style_index[style_key] = len(columns['styles'])
+            columns['styles'].append(style)
+        columns['labels'].append(dataset['label'])
+        columns['data'].append(dataset['data'])
+        columns['style'].append(style_index[style_key])
+    return columns
+
+
+def json_script_content(data):
+    """Return data as JSON that is safe to place inside a <script> element."""
+    return dumps(data).translate(_JSON_SCRIPT_ESCAPES)
+
+
+class ChartJsonResponse(HttpResponse):
+    """JSON response serialised with the fast encoder."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
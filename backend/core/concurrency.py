@@ -0,0 +1,88 @@
+"""Run independent, read-only ORM work side by side on a bounded thread pool.
+
+Dashboard pages issue several unrelated aggregates; against a remote
+database their latencies add up when run one after another. ``run_parallel``
+runs them on pool threads (each thread uses its own Django connection) so
+the page waits roughly as long as the slowest query. Tasks run in a copy of
+the caller's context, so read routing (core.replica) carries over.
+
+Pool threads keep their connections between tasks, which needs persistent
+connections (DB_CONN_MAX_AGE > 0); without them every task would open a new
+connection and the page would be slower than running the queries serially.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+DEFAULT_DASHBOARD_QUERY_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _max_workers():
+    """Return the configured pool size; 0 or 1 disables parallel execution."""
+    return getattr(settings, 'DASHBOARD_QUERY_WORKERS', DEFAULT_DASHBOARD_QUERY_WORKERS)
+
+
+def _get_executor():
+    """Return the process-wide query pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers(), thread_name_prefix='dashboard-query')
+    return _executor
+
+
+def _in_transaction():
+    """Return True if the calling thread is inside an atomic block on any database.
+
+    Work on other threads would use other connections and could not see
+    uncommitted rows (including the ones a TestCase creates), so such calls
+    run serially instead.
+    """
+    return any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+
+
+def _persistent_connections():
+    """Return True if every database keeps connections open between requests (CONN_MAX_AGE != 0)."""
+    return all(connections.settings[alias].get('CONN_MAX_AGE', 0) != 0 for alias in connections)
+
+
+def _run_task(func):
+    """Run func on a pool thread, treating it like a request for connection lifetime."""
+    # Same bookkeeping Django does at request start/end: keep this thread's
+    # persistent connection for the next task unless it is broken or too old.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def run_parallel(tasks):
+    """Run a ``{name: callable}`` mapping and return ``{name: result}``.
+
+    Callables must be independent and only read from the database. The
+    first exception raised by any of them is re-raised after all finish.
+    Falls back to running them in order in the calling thread when the pool
+    is disabled, there is only one task, connections are not persistent, or
+    the caller is in a transaction.
+    """
+    if len(tasks) <= 1 or _max_workers() <= 1 or not _persistent_connections() or _in_transaction():
+        return {name: func() for name, func in tasks.items()}
+
+    executor = _get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run_task, func) for name, func in tasks.items()
+    }
+    # Wait for every future before raising so no task outlives the request.
+    errors = [future.exception() for future in futures.values()]
+    for error in errors:
+        if error is not None:
+            raise error
+    return {name: future.result() for name, future in futures.items()}
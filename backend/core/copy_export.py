@@ -0,0 +1,110 @@
+"""Dump querysets as CSV with Postgres ``COPY (SELECT ...) TO STDOUT``.
+
+The server formats the CSV and psycopg2 passes the bytes straight through,
+so large exports never build Python model instances or rows. Used by the
+dashboard CSV download and the ``export_reports_csv`` command.
+"""
+import queue
+import threading
+
+from django.db import connections
+
+# Chunks buffered between the COPY thread and the response before COPY waits.
+STREAM_QUEUE_CHUNKS = 64
+
+_DONE = object()
+
+
+class _ExportCancelled(Exception):
+    """Raised inside COPY when the reader of a streamed export went away."""
+
+
+def copy_sql(cursor, queryset):
+    """Return the COPY statement for queryset, with its parameters inlined.
+
+    COPY cannot take bind parameters, so psycopg2's ``mogrify`` quotes them
+    into the SELECT exactly as it would for a normal query.
+    """
+    select, params = queryset.query.sql_with_params()
+    select = cursor.mogrify(select, params).decode()
+    return f'COPY ({select}) TO STDOUT WITH (FORMAT csv)'
+
+
+def copy_to_file(queryset, target, header=None, using='default'):
+    """Write queryset as CSV into the binary file-like ``target`` and return the row count.
+
+    ``header`` is an optional sequence of column titles written first.
+    """
+    if header:
+        target.write((','.join(header) + '\r\n').encode())
+    with connections[using].cursor() as cursor:
+        cursor.copy_expert(copy_sql(cursor, queryset), target)
+        return cursor.rowcount
+
+
+class _QueueWriter:
+    """File-like target for copy_expert that hands each chunk to a queue."""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def put(self, item):
+        """Queue item, waiting for room; raise _ExportCancelled if the reader is gone."""
+        while True:
+            if self.cancelled.is_set():
+                raise _ExportCancelled()
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        self.put(bytes(data))
+        return len(data)
+
+
+def stream_copy(queryset, header=None, using='default'):
+    """Yield the CSV for queryset chunk by chunk, for a StreamingHttpResponse.
+
+    COPY runs on a helper thread with its own connection and blocks when
+    the client reads slowly, so memory stays bounded. Closing the generator
+    (e.g. the client disconnects) aborts the COPY. The helper thread cannot
+    see uncommitted rows of the calling thread's transaction.
+
+    No statement timeout applies: the COPY waits on the client, so a limit
+    would measure the download speed rather than the query.
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, cancelled)
+
+    def produce():
+        try:
+            try:
+                copy_to_file(queryset, writer, header=header, using=using)
+            except _ExportCancelled:
+                raise
+            except Exception as error:
+                writer.put(error)
+            else:
+                writer.put(_DONE)
+        except _ExportCancelled:
+            pass
+        finally:
+            connections[using].close()
+
+    producer = threading.Thread(target=produce, name='copy-export', daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+        producer.join()
@@ -0,0 +1,139 @@
+"""Report filtering and raw-export columns shared by the dashboard views and the export commands."""
+import re
+
+from django.db.models import F
+
+from clinic_reports.models import ClinicReport
+from clinic_reports.reporting import CARE_COUNT_FIELDS
+
+
+def apply_dashboard_filters(clinic_reports, filters):
+    """Apply common dashboard filters to a ClinicReport queryset."""
+    if filters.get('sport'):
+        clinic_reports = clinic_reports.filter(sport__name=filters.get('sport'))
+
+    semester_val = filters.get('semester')
+    if semester_val:
+        if " '" in semester_val:
+            parts = semester_val.split(" '")
+            if len(parts) == 2 and parts[1].isdigit():
+                semester_base = parts[0]
+                year_val = 2000 + int(parts[1])
+                clinic_reports = clinic_reports.filter(semester=semester_base, created_at__year=year_val)
+            else:
+                clinic_reports = clinic_reports.filter(semester=semester_val)
+        else:
+            clinic_reports = clinic_reports.filter(semester=semester_val)
+
+    if filters.get('week'):
+        clinic_reports = clinic_reports.filter(week=filters.get('week'))
+
+    if filters.get('year') is not None:
+        try:
+            year_value = int(filters.get('year'))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid year. Expected numeric year (e.g., 2026).')
+        clinic_reports = clinic_reports.filter(created_at__year=year_value)
+
+    return clinic_reports
+
+
+def extract_email_from_student_value(student_value):
+    """Parse a student dropdown value and return the underlying email, if any."""
+    if not student_value or student_value == 'All Students':
+        return None
+    email_match = re.search(r'\(([^)]+)\)$', student_value)
+    return email_match.group(1) if email_match else student_value
+
+
+def first_non_empty(values):
+    """Return the first value in the iterable that is not None or an empty string."""
+    for value in values:
+        if value not in (None, ''):
+            return value
+    return None
+
+
+# Column titles of the raw report exports (Excel and CSV), in order.
+RAW_EXPORT_HEADERS = [
+    'id', 'created_at_utc', 'first_name', 'last_name', 'email', 'sport', 'semester', 'week',
+    *CARE_COUNT_FIELDS,
+    'interacted_hcps', 'healthcare_provider', 'total_experiences',
+]
+
+
+def export_reports_queryset(params):
+    """Return the reports a dashboard export covers, in id order.
+
+    Each filter takes the first non-empty value across the dashboard's
+    forms, so the export matches whichever chart the user filtered.
+    """
+    selected_sport = first_non_empty([
+        params.get('sport'),
+        params.get('trend_sport') if params.get('trend_sport') != 'all' else None,
+    ])
+    selected_semester = first_non_empty([
+        params.get('semester'),
+        params.get('semester2'),
+        params.get('metric_semester'),
+        params.get('trend_semester'),
+    ])
+    selected_week = first_non_empty([
+        params.get('week'),
+        params.get('week2'),
+    ])
+    selected_year = params.get('year')
+    selected_student = first_non_empty([
+        params.get('student'),
+        params.get('student_filter2'),
+        params.get('metric_student'),
+        params.get('trend_student'),
+    ])
+
+    filters = {
+        'sport': selected_sport,
+        'semester': selected_semester,
+        'week': selected_week,
+        'year': selected_year,
+    }
+
+    clinic_reports = apply_dashboard_filters(ClinicReport.objects.all(), filters)
+
+    email_to_filter = extract_email_from_student_value(selected_student)
+    if email_to_filter:
+        clinic_reports = clinic_reports.filter(email=email_to_filter)
+
+    return clinic_reports.order_by('id')
+
+
+def total_experiences():
+    """Return the SQL expression adding up a report's care counters."""
+    total = F(CARE_COUNT_FIELDS[0])
+    for field in CARE_COUNT_FIELDS[1:]:
+        total += F(field)
+    return total
+
+
+def raw_export_values(clinic_reports):
+    """Select the RAW_EXPORT_HEADERS columns, in order and computed in SQL, for COPY exports."""
+    return clinic_reports.annotate(
+        created_at_utc=F('created_at'),
+        sport_name=F('sport__name'),
+        healthcare_provider_name=F('healthcare_provider__name'),
+        total_experiences=total_experiences(),
+    ).values_list(
+        'id', 'created_at_utc', 'first_name', 'last_name', 'email', 'sport_name', 'semester', 'week',
+        *CARE_COUNT_FIELDS,
+        'interacted_hcps', 'healthcare_provider_name', 'total_experiences',
+    )
+
+
+def raw_sheet_rows(clinic_reports):
+    """Yield RAW_EXPORT_HEADERS and the raw report rows, formatted like the raw Excel export."""
+    yield RAW_EXPORT_HEADERS
+    created_at = RAW_EXPORT_HEADERS.index('created_at_utc')
+    for row in raw_export_values(clinic_reports).iterator(chunk_size=2000):
+        row = ['' if value is None else value for value in row]
+        # Excel cannot store timezone-aware datetimes.
+        row[created_at] = row[created_at].isoformat()
+        yield row
@@ -0,0 +1,69 @@
+"""Measure what a fresh worker imports at startup, using ``python -X importtime``.
+
+Used by the ``import_time_report`` management command and the startup
+import budget test.
+"""
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+# What a gunicorn worker does before serving its first request: import the
+# WSGI app (settings, app registry, admin autodiscovery, middleware) and load
+# the URLconf (all view modules).
+WORKER_STARTUP_STATEMENT = (
+    'import config.wsgi; '
+    'from django.urls import get_resolver; '
+    'get_resolver().url_patterns'
+)
+
+ImportTiming = namedtuple('ImportTiming', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` stderr into ImportTiming rows, in the order Python printed them."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Header row ("self [us] | cumulative | imported package") or noise.
+            continue
+        name = fields[2].rstrip()
+        # Nesting is shown as two extra spaces per level after a single separator space.
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        timings.append(ImportTiming(name.strip(), int(fields[0]), int(fields[1]), depth))
+    return timings
+
+
+def measure(statement=WORKER_STARTUP_STATEMENT):
+    """Run statement in a fresh interpreter with -X importtime and return its parsed timings."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def total_ms(timings):
+    """Return the total import time in milliseconds (sum of top-level cumulative times)."""
+    return sum(t.cumulative_us for t in timings if t.depth == 0) / 1000
+
+
+def format_table(timings, limit=25, sort='cumulative'):
+    """Return the slowest imports as a fixed-width text table."""
+    key = (lambda t: t.cumulative_us) if sort == 'cumulative' else (lambda t: t.self_us)
+    rows = sorted(timings, key=key, reverse=True)[:limit]
+    lines = [f"{'cumulative ms':>13}  {'self ms':>8}  module"]
+    for t in rows:
+        lines.append(f"{t.cumulative_us / 1000:>13.1f}  {t.self_us / 1000:>8.1f}  {'  ' * t.depth}{t.module}")
+    return '\n'.join(lines)
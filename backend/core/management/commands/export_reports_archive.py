@@ -0,0 +1,255 @@
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Case, F, Max, Min, When
+
+from clinic_reports.models import ClinicReport
+from core import copy_export
+from core.exports import RAW_EXPORT_HEADERS, raw_export_values, raw_sheet_rows
+
+MANIFEST_NAME = 'manifest.json'
+# Rows per worksheet, including the header row.
+EXCEL_MAX_ROWS = 1048576
+
+
+def _academic_year():
+    """SQL expression for the starting year of a report's academic year (Fall Y + Spring Y+1)."""
+    return Case(When(semester='Fall', then=F('year')), default=F('year') - 1)
+
+
+def _academic_year_label(start):
+    """Return e.g. ``2024-25`` for start 2024, or ``unknown`` for reports without a year."""
+    return 'unknown' if start is None else f'{start}-{(start + 1) % 100:02d}'
+
+
+def plan_partitions(export_format, partition_size):
+    """Split the table into JSON-serialisable partitions, in output order.
+
+    CSV partitions are id ranges of partition_size ids; XLSX partitions are
+    academic years, since each becomes its own worksheet.
+    """
+    if export_format == 'csv':
+        bounds = ClinicReport.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            return []
+        return [
+            {'name': f'part-{index:05d}.csv', 'ids': [low, min(low + partition_size, bounds['high'] + 1)]}
+            for index, low in enumerate(range(bounds['low'], bounds['high'] + 1, partition_size))
+        ]
+    years = (
+        ClinicReport.objects.annotate(academic_year=_academic_year())
+        .values_list('academic_year', flat=True)
+        .distinct()
+    )
+    return [
+        {'name': f'clinic_reports_{_academic_year_label(start)}.xlsx', 'academic_year': start}
+        for start in sorted(years, key=lambda start: (start is None, start))
+    ]
+
+
+def _write_csv_part(partition, path):
+    low, high = partition['ids']
+    reports = raw_export_values(ClinicReport.objects.filter(id__gte=low, id__lt=high).order_by('id'))
+    with open(path, 'wb') as target:
+        return copy_export.copy_to_file(reports, target)
+
+
+def _write_xlsx_part(partition, path):
+    from openpyxl import Workbook  # imported lazily, see core.importtime
+
+    start = partition['academic_year']
+    reports = ClinicReport.objects.annotate(academic_year=_academic_year())
+    if start is None:
+        reports = reports.filter(academic_year__isnull=True)
+    else:
+        reports = reports.filter(academic_year=start)
+    rows = raw_sheet_rows(reports.order_by('id'))
+    header = next(rows)
+    label = _academic_year_label(start)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(label)
+    sheet.append(header)
+    count = sheet_rows = 0
+    for row in rows:
+        if sheet_rows == EXCEL_MAX_ROWS - 1:
+            # A year that does not fit in one worksheet continues on the next.
+            sheet = workbook.create_sheet(f'{label} ({len(workbook.worksheets) + 1})')
+            sheet.append(header)
+            sheet_rows = 0
+        sheet.append(row)
+        sheet_rows += 1
+        count += 1
+    workbook.save(path)
+    return count
+
+
+WRITERS = {'csv': _write_csv_part, 'xlsx': _write_xlsx_part}
+
+
+def export_partition(export_format, partition, parts_dir):
+    """Write one partition file and return ``(name, rows)``.
+
+    The file is written under a temporary name and renamed when complete, so
+    an interrupted run never leaves a partial part behind.
+    """
+    path = os.path.join(parts_dir, partition['name'])
+    try:
+        rows = WRITERS[export_format](partition, f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+        return partition['name'], rows
+    finally:
+        # Pool workers are not request-managed, so close their connections here.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive every raw clinic report to CSV or XLSX. The table is split into '
+        'partitions that are exported in parallel processes and then merged (CSV) '
+        'or zipped (XLSX, one workbook per academic year); --resume continues an '
+        'interrupted run from its completed partitions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            help='File to write (default: exports/dashboard_raw_<timestamp>.csv or .zip).',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(WRITERS),
+            help='csv for one merged CSV, xlsx for a zip of per-academic-year workbooks '
+                 '(default: from the output extension, otherwise csv).',
+        )
+        parser.add_argument(
+            '--partition-size',
+            type=int,
+            default=100000,
+            help='Report ids per CSV partition (default: 100000).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Processes exporting partitions in parallel; 1 runs in-process (default: CPU count, at most 4).',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Keep the partitions finished by an interrupted run of the same export.',
+        )
+
+    def handle(self, *args, **options):
+        """Plan partitions, export the missing ones on a process pool, then merge them."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('export_reports_archive uses COPY and needs PostgreSQL.')
+        output = options['output']
+        export_format = options['format']
+        if export_format is None:
+            export_format = 'xlsx' if output and output.lower().endswith(('.xlsx', '.zip')) else 'csv'
+        if not output:
+            export_dir = os.path.join(settings.BASE_DIR, 'exports')
+            os.makedirs(export_dir, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            extension = 'csv' if export_format == 'csv' else 'zip'
+            output = os.path.join(export_dir, f'dashboard_raw_{timestamp}.{extension}')
+
+        parts_dir = f'{output}.parts'
+        manifest_path = os.path.join(parts_dir, MANIFEST_NAME)
+        manifest = None
+        if options['resume'] and os.path.exists(manifest_path):
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest['format'] != export_format:
+                raise CommandError(f'{parts_dir} holds a {manifest["format"]} export; pass --format {manifest["format"]}.')
+            self.stdout.write(f'Resuming: {len(manifest["done"])} of {len(manifest["partitions"])} partitions done.')
+        else:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            os.makedirs(parts_dir)
+            manifest = {
+                'format': export_format,
+                'partitions': plan_partitions(export_format, max(1, options['partition_size'])),
+                'done': {},
+            }
+            self._save_manifest(manifest, manifest_path)
+
+        done = manifest['done']
+        pending = [
+            partition for partition in manifest['partitions']
+            if not (partition['name'] in done and os.path.exists(os.path.join(parts_dir, partition['name'])))
+        ]
+        total = len(manifest['partitions'])
+        started = time.monotonic()
+        exported = 0
+
+        def finish(name, rows):
+            nonlocal exported
+            exported += rows
+            done[name] = rows
+            # Saved after every partition, so --resume skips it even if a later one fails.
+            self._save_manifest(manifest, manifest_path)
+            elapsed = time.monotonic() - started
+            rate = exported / elapsed if elapsed else 0
+            self.stdout.write(f'[{len(done)}/{total}] {name}: {rows} rows ({rate:,.0f} rows/s)')
+
+        workers = max(1, options['workers'])
+        if workers == 1:
+            for partition in pending:
+                finish(*export_partition(export_format, partition, parts_dir))
+        else:
+            # Close connections first so no forked worker reuses the parent's socket.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [
+                    executor.submit(export_partition, export_format, partition, parts_dir) for partition in pending
+                ]
+                failed = None
+                for future in as_completed(futures):
+                    try:
+                        finish(*future.result())
+                    except Exception as error:
+                        # Let the other partitions finish so --resume has less left to do.
+                        failed = failed or error
+                if failed:
+                    raise failed
+
+        self._merge(export_format, manifest['partitions'], parts_dir, output)
+        shutil.rmtree(parts_dir)
+        elapsed = time.monotonic() - started
+        rate = exported / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Exported {sum(done.values())} rows to {output} '
+            f'({exported} this run in {elapsed:.1f}s, {rate:,.0f} rows/s).'
+        )
+
+    def _save_manifest(self, manifest, path):
+        with open(f'{path}.tmp', 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(f'{path}.tmp', path)
+
+    def _merge(self, export_format, partitions, parts_dir, output):
+        """Concatenate the CSV parts under one header, or zip the workbooks."""
+        if export_format == 'csv':
+            with open(f'{output}.tmp', 'wb') as target:
+                target.write((','.join(RAW_EXPORT_HEADERS) + '\r\n').encode())
+                for partition in partitions:
+                    with open(os.path.join(parts_dir, partition['name']), 'rb') as part:
+                        shutil.copyfileobj(part, target, 1 << 20)
+        else:
+            # Workbooks are already deflated, so they are stored rather than compressed again.
+            with zipfile.ZipFile(f'{output}.tmp', 'w', zipfile.ZIP_STORED) as archive:
+                for partition in partitions:
+                    archive.write(os.path.join(parts_dir, partition['name']), partition['name'])
+        os.replace(f'{output}.tmp', output)
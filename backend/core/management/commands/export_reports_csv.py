@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import copy_export
+from core.exports import RAW_EXPORT_HEADERS, export_reports_queryset, raw_export_values
+
+
+class Command(BaseCommand):
+    help = (
+        'Dump raw clinic reports as CSV using Postgres COPY, with the same filters '
+        'and columns as the dashboard export.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='File to write, or - for standard output.')
+        parser.add_argument('--sport', help='Sport name.')
+        parser.add_argument('--semester', help='Semester, e.g. "Fall" or "Fall \'25".')
+        parser.add_argument('--week', help='Week number (1-16).')
+        parser.add_argument('--year', help='Calendar year the reports were submitted in.')
+        parser.add_argument('--student', help='Student email.')
+
+    def handle(self, *args, **options):
+        """Stream the COPY output straight into the target file."""
+        params = {name: options[name] for name in ('sport', 'semester', 'week', 'year', 'student')}
+        try:
+            clinic_reports = raw_export_values(export_reports_queryset(params))
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        if options['output'] == '-':
+            copy_export.copy_to_file(clinic_reports, sys.stdout.buffer, header=RAW_EXPORT_HEADERS)
+            return
+        with open(options['output'], 'wb') as target:
+            copy_export.copy_to_file(clinic_reports, target, header=RAW_EXPORT_HEADERS)
+        self.stdout.write(f'Wrote {options["output"]}.')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core import importtime
+
+
+class Command(BaseCommand):
+    help = (
+        'Start a fresh interpreter with -X importtime, doing what a worker does before its '
+        'first request, and print the slowest imports.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=25,
+            help='Number of modules to list (default: 25).',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'self'],
+            default='cumulative',
+            help='Order by cumulative time (module plus its imports) or self time.',
+        )
+        parser.add_argument(
+            '--statement',
+            default=importtime.WORKER_STARTUP_STATEMENT,
+            help='Python statement to time (default: import config.wsgi and load the URLconf).',
+        )
+
+    def handle(self, *args, **options):
+        """Measure the statement's imports and print a table of the slowest ones."""
+        timings = importtime.measure(options['statement'])
+        self.stdout.write(importtime.format_table(timings, limit=options['limit'], sort=options['sort']))
+        self.stdout.write(f'\nTotal import time: {importtime.total_ms(timings):.1f} ms across {len(timings)} modules.')
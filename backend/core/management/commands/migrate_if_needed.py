@@ -0,0 +1,81 @@
+import hashlib
+import importlib.util
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management import call_command
+from django.core.checks import Tags
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection
+
+from core.models import MigrationState
+
+# Session-level Postgres advisory lock key shared by every instance's boot.
+MIGRATE_LOCK_KEY = 7_231_405_118
+
+
+def migrations_hash():
+    """Return a SHA-256 over every installed app's migration files (names and contents)."""
+    digest = hashlib.sha256()
+    for app_config in sorted(apps.get_app_configs(), key=lambda config: config.label):
+        spec = importlib.util.find_spec(f'{app_config.name}.migrations')
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for location in spec.submodule_search_locations:
+            for path in sorted(Path(location).glob('*.py')):
+                digest.update(f'{app_config.label}/{path.name}\n'.encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def stored_migrations_hash():
+    """Return the hash recorded by the last successful run, or None (e.g. on a fresh database)."""
+    try:
+        return MigrationState.objects.filter(pk=1).values_list('migrations_hash', flat=True).first()
+    except DatabaseError:
+        # The MigrationState table itself has not been migrated yet.
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run migrate only when the migration files changed since the last run. Safe to run from '
+        'several containers at once: an advisory lock lets one of them migrate.'
+    )
+    # The full system checks cost more than the hash comparison itself; only the
+    # database checks (e.g. clinic_reports.E001) run, after any migration.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run migrate even if the stored hash matches (e.g. after a manual rollback).',
+        )
+
+    def handle(self, *args, **options):
+        """Migrate if needed, then run the database system checks so a bad configuration stops the boot."""
+        self._migrate_if_needed(force=options['force'], verbosity=options['verbosity'])
+        self.check(tags=[Tags.database], databases=[DEFAULT_DB_ALIAS])
+
+    def _migrate_if_needed(self, force, verbosity):
+        """Compare hashes, then migrate under the advisory lock if they differ."""
+        current = migrations_hash()
+        if not force and stored_migrations_hash() == current:
+            self.stdout.write('Migrations unchanged; skipping migrate.')
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [MIGRATE_LOCK_KEY])
+        try:
+            # Another instance may have migrated while this one waited for the lock.
+            if not force and stored_migrations_hash() == current:
+                self.stdout.write('Migrations were applied by another instance; skipping migrate.')
+                return
+
+            call_command('migrate', interactive=False, verbosity=verbosity)
+            MigrationState.objects.update_or_create(pk=1, defaults={'migrations_hash': current})
+            self.stdout.write(f'Migrations applied; recorded hash {current[:12]}.')
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATE_LOCK_KEY])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RequestProfile
+from core.profiling import profile_retention
+from core.purge import delete_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete request profiles older than REQUEST_PROFILE_RETENTION_DAYS in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows deleted per statement (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        """Delete profiles older than the retention period, one short DELETE per batch."""
+        total = delete_expired(RequestProfile, timezone.now() - profile_retention(), options['batch_size'])
+        self.stdout.write(f'Purged {total} expired request profiles.')
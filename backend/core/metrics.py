@@ -0,0 +1,27 @@
+"""Process-level operational metrics exposed to staff at /metrics/.
+
+Each source is a zero-argument callable returning a JSON-serialisable dict;
+register new ones with :func:`register_source`.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+_sources = {}
+
+
+def register_source(name, func):
+    """Register func as the provider of the ``name`` section of the metrics snapshot."""
+    _sources[name] = func
+
+
+def snapshot():
+    """Return every registered source's current metrics, keyed by source name."""
+    data = {}
+    for name, func in _sources.items():
+        try:
+            data[name] = func()
+        except Exception as e:
+            logger.error(f"Metrics source {name} failed: {e}")
+            data[name] = {'error': 'unavailable'}
+    return data
@@ -0,0 +1,216 @@
+import re
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from core import profiling, replica, user_snapshot
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only.
+    brotli = None
+
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+DEFAULT_COMPRESSIBLE_CONTENT_TYPES = [
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/json',
+    'application/javascript',
+    'image/svg+xml',
+]
+# Brotli quality 4-5 compresses better than gzip at similar CPU cost for on-the-fly responses.
+BROTLI_QUALITY = 5
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def _accepted_encodings(header):
+    """Return the set of encodings the client accepts with a non-zero q-value."""
+    accepted = set()
+    for part in header.split(','):
+        match = _accept_encoding_re.match(part)
+        if not match:
+            continue
+        encoding, quality = match.group(1).lower(), match.group(2)
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding)
+    return accepted
+
+
+def _embeds_csrf_token(request, response):
+    """Return True if the view called get_token() (e.g. {% csrf_token %}), so the page may hold the token.
+
+    get_token() flags the request, and CsrfViewMiddleware answers the flag by
+    setting the CSRF cookie and clearing it again. This middleware runs above
+    CsrfViewMiddleware, so the cookie is what is left to see; the flag covers
+    the case where it runs below.
+    """
+    return bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE')) or settings.CSRF_COOKIE_NAME in response.cookies
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress HTML and JSON responses with Brotli (if installed) or gzip.
+
+    Only buffered (non-streaming) responses over COMPRESSION_MIN_SIZE bytes
+    whose content type is allow-listed are compressed. Streaming responses
+    and attachments (exports) are passed through untouched. To avoid BREACH,
+    responses that embed a CSRF token are left uncompressed unless
+    COMPRESSION_SKIP_CSRF_RESPONSES is turned off.
+    """
+
+    # Random gzip header padding, as in Django's GZipMiddleware (BREACH mitigation).
+    max_random_bytes = 100
+
+    def _is_compressible(self, request, response):
+        """Return True when this response should be considered for compression."""
+        if not getattr(settings, 'COMPRESSION_ENABLED', True):
+            return False
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if response.get('Content-Disposition', '').lower().startswith('attachment'):
+            return False
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        allowed = getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_COMPRESSIBLE_CONTENT_TYPES)
+        if content_type not in allowed:
+            return False
+        return len(response.content) >= getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_COMPRESSION_MIN_SIZE)
+
+    def process_response(self, request, response):
+        """Compress the response body for clients that accept br or gzip."""
+        if not self._is_compressible(request, response):
+            return response
+
+        # Vary even when not compressing this one, so caches keep both variants apart.
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if getattr(settings, 'COMPRESSION_SKIP_CSRF_RESPONSES', True) and _embeds_csrf_token(request, response):
+            return response
+
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # A strong ETag must change with the encoding; a weak one can still match conditional requests.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class StickyPrimaryMiddleware:
+    """Keep a user's reads on the primary for a while after they write.
+
+    Any ORM write during the request (other than sessions and activity logs,
+    see core.replica) sets a short-lived cookie; while it is present,
+    replica-routed views read from the primary, so a student who just
+    submitted a report sees it regardless of replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica.track_writes() as writes:
+            response = self.get_response(request)
+        return self._stick(response, writes)
+
+    async def __acall__(self, request):
+        with replica.track_writes() as writes:
+            response = await self.get_response(request)
+        return self._stick(response, writes)
+
+    def _stick(self, response, writes):
+        """Set the sticky-primary cookie on response if the request wrote anything."""
+        if writes['wrote'] and replica.replica_configured():
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', replica.DEFAULT_STICKY_SECONDS)
+            response.set_cookie(
+                replica.STICKY_COOKIE_NAME,
+                str(int(time.time() + seconds)),
+                max_age=seconds,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class CachedUserAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware that serves request.user from a session snapshot.
+
+    Saves the per-request ``auth_user`` query; see core.user_snapshot.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: user_snapshot.get_request_user(request))
+        request.auser = partial(user_snapshot.aget_request_user, request)
+
+
+class RequestProfilerMiddleware:
+    """Profile the requests of staff who turned profiling on; see core.profiling.
+
+    The saved profile's id is sent back in an X-Request-Profile-Id header.
+    Other requests only pay for a header and cookie lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling.profiling_requested(request):
+            return self.get_response(request)
+        with profiling.ProfiledRequest(request) as profiled:
+            response = self.get_response(request)
+        return self._tag(response, profiled.save(response))
+
+    async def __acall__(self, request):
+        # Loading request.user queries the database, so only do it when a token was sent.
+        if not (profiling.profile_token(request) and await sync_to_async(profiling.profiling_requested)(request)):
+            return await self.get_response(request)
+        with profiling.ProfiledRequest(request) as profiled:
+            response = await self.get_response(request)
+        return self._tag(response, await sync_to_async(profiled.save)(response))
+
+    def _tag(self, response, profile_id):
+        if profile_id is not None:
+            response.headers['X-Request-Profile-Id'] = str(profile_id)
+        return response
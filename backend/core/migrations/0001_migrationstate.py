@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MigrationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('migrations_hash', models.CharField(max_length=64)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
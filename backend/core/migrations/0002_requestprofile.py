@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_migrationstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=512)),
+                ('query_string', models.TextField(blank=True)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField()),
+                ('sql_duration_ms', models.FloatField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('collapsed_stacks', models.TextField(blank=True)),
+                ('queries', models.JSONField(default=list)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='core_reques_created_11e53f_idx')],
+            },
+        ),
+    ]
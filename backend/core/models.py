@@ -1,3 +1,46 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class MigrationState(models.Model):
+    """Hash of the migration files last applied by ``manage.py migrate_if_needed``.
+
+    Holds a single row; container boot compares it with the migration files
+    on disk and skips ``migrate`` when they match.
+    """
+    migrations_hash = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """Return the stored hash and when it was recorded."""
+        return f"{self.migrations_hash[:12]} ({self.applied_at})"
+
+
+class RequestProfile(models.Model):
+    """Profile of one staff request taken by ``RequestProfilerMiddleware`` (see core.profiling).
+
+    ``collapsed_stacks`` holds the sampled stacks in the collapsed format
+    flame-graph tools read; ``queries`` lists each SQL statement (without
+    parameters) with its duration.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=512)
+    query_string = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    collapsed_stacks = models.TextField(blank=True)
+    queries = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        """Return the request line and its duration for admin display."""
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,223 @@
+"""Opt-in profiling of individual staff requests.
+
+A staff member turns profiling on from the Request profiles admin page,
+which sets a signed cookie for REQUEST_PROFILE_COOKIE_SECONDS; scripts can
+send the same signed value in an ``X-Request-Profile`` header instead.
+``RequestProfilerMiddleware`` (core.middleware) then profiles each of that
+user's requests and stores a ``RequestProfile`` with:
+
+* the Python stacks sampled every REQUEST_PROFILE_SAMPLE_INTERVAL_MS from
+  the request's thread, in the collapsed ("folded") format read by
+  flamegraph.pl, speedscope and similar tools,
+* every SQL statement and its duration (without parameters, which may hold
+  student data),
+* the query string's parameter names; their values (dashboard filters name
+  students) are kept, sanitised as in the activity log, only while
+  USER_LOGGING_INCLUDE_QUERY_STRING is on, and
+* the request's total and SQL time.
+
+Sampling stays accurate for slow requests, which are the ones worth
+profiling, and costs little while the request runs. Only the request's
+thread is sampled: work handed to other threads (the dashboard query pool)
+shows up as waiting. Under ASGI that thread is the event loop, shared with
+other requests, and queries in ``sync_to_async`` threads are not recorded.
+Streaming responses are profiled until the response starts, not while
+their content is generated.
+
+Profiles older than REQUEST_PROFILE_RETENTION_DAYS are removed by
+``manage.py purge_request_profiles``.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+from user_logging.middleware import sanitize_query_string
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COOKIE_NAME = 'request_profile'
+PROFILE_HEADER = 'HTTP_X_REQUEST_PROFILE'
+_SALT = 'core.profiling'
+
+DEFAULT_COOKIE_SECONDS = 30 * 60
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+DEFAULT_RETENTION_DAYS = 14
+# Statements kept per profile; the count and total time still include the rest.
+MAX_RECORDED_QUERIES = 2000
+MAX_STACK_DEPTH = 200
+
+_BASE_DIR = str(settings.BASE_DIR) + '/'
+
+
+def profiling_token(user):
+    """Return the signed cookie/header value that turns profiling on for user."""
+    return signing.TimestampSigner(salt=_SALT).sign(str(user.pk))
+
+
+def _valid_token(token, user):
+    max_age = getattr(settings, 'REQUEST_PROFILE_COOKIE_SECONDS', DEFAULT_COOKIE_SECONDS)
+    try:
+        return signing.TimestampSigner(salt=_SALT).unsign(token, max_age=max_age) == str(user.pk)
+    except signing.BadSignature:
+        return False
+
+
+def profile_token(request):
+    """Return the profiling token sent with request (header first, then cookie), if any."""
+    return request.META.get(PROFILE_HEADER) or request.COOKIES.get(PROFILE_COOKIE_NAME)
+
+
+def profiling_requested(request):
+    """Return True if request comes from a staff user who turned profiling on."""
+    token = profile_token(request)
+    # Checked before request.user, so other requests do not load the user for this.
+    if not token:
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff and _valid_token(token, user))
+
+
+def profile_retention():
+    """Return how long profiles are kept."""
+    return timedelta(days=getattr(settings, 'REQUEST_PROFILE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+
+
+def stored_query_string(request):
+    """Return request's query string as a profile keeps it: names only, unless query logging is on."""
+    raw_query = request.META.get('QUERY_STRING', '')
+    if getattr(settings, 'USER_LOGGING_INCLUDE_QUERY_STRING', False):
+        return sanitize_query_string(raw_query)
+    return '&'.join(f'{key}=' for key, _ in parse_qsl(raw_query, keep_blank_values=True))[:1000]
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_BASE_DIR):
+        filename = filename[len(_BASE_DIR):]
+    elif 'site-packages/' in filename:
+        filename = filename.rsplit('site-packages/', 1)[1]
+    else:
+        filename = Path(filename).name
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples as collapsed stacks, one ``frame;frame;... count`` line each."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that records each statement's SQL and duration."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.duration_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.duration_ms += duration_ms
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'ms': round(duration_ms, 3),
+                    'many': many,
+                })
+
+
+class ProfiledRequest:
+    """Profile one request: ``with ProfiledRequest(request) as profiled: ...`` then ``profiled.save(response)``."""
+
+    def __init__(self, request):
+        self.request = request
+        interval_ms = getattr(settings, 'REQUEST_PROFILE_SAMPLE_INTERVAL_MS', DEFAULT_SAMPLE_INTERVAL_MS)
+        self.profiler = SamplingProfiler(threading.get_ident(), max(1, interval_ms) / 1000)
+        self.recorder = QueryRecorder()
+        self._wrappers = ExitStack()
+
+    def __enter__(self):
+        for alias in connections:
+            self._wrappers.enter_context(connections[alias].execute_wrapper(self.recorder))
+        self.started = time.perf_counter()
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.profiler.stop()
+        self._wrappers.close()
+
+    def save(self, response):
+        """Store the profile and return its id, or None if it could not be saved."""
+        request = self.request
+        try:
+            profile = RequestProfile.objects.create(
+                user=request.user,
+                method=request.method,
+                path=request.path[:512],
+                query_string=stored_query_string(request),
+                status_code=response.status_code,
+                duration_ms=self.duration_ms,
+                sql_count=self.recorder.count,
+                sql_duration_ms=self.recorder.duration_ms,
+                sample_count=sum(self.profiler.stacks.values()),
+                collapsed_stacks=self.profiler.collapsed(),
+                queries=self.recorder.queries,
+            )
+        except Exception as e:
+            # A profile is a debugging aid; never fail the request over it.
+            logger.warning(f"Could not save the profile of {request.path}: {e}")
+            return None
+        return profile.pk
+
@@ -0,0 +1,17 @@
+"""Batched deletion of expired rows, shared by the purge management commands."""
+
+
+def delete_expired(model, cutoff, batch_size):
+    """Delete model rows created before cutoff, oldest first, batch_size per DELETE; return the count.
+
+    Deleting by primary key keeps each statement and its locks small, so
+    purges can run while the app is serving requests.
+    """
+    expired = model.objects.filter(created_at__lt=cutoff).order_by('created_at')
+    total = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:max(1, batch_size)])
+        if not ids:
+            return total
+        deleted, _ = model.objects.filter(pk__in=ids).delete()
+        total += deleted
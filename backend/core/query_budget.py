@@ -0,0 +1,114 @@
+"""Per-view Postgres statement timeouts, so one slow query cannot pin a worker.
+
+``statement_budget`` runs a block in a transaction with
+``SET LOCAL statement_timeout``; if a statement in it is cancelled for
+running too long, the block raises ``QueryBudgetExceeded`` instead of a
+database error, and the view returns a degraded response (an empty widget,
+a "try narrowing the filters" message) rather than a 500. Every timeout is
+counted by budget name and reported at /metrics/.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import OperationalError, connections, router, transaction
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+
+from clinic_reports.models import ClinicReport
+
+DEFAULT_DASHBOARD_STATEMENT_TIMEOUT_MS = 5000
+DEFAULT_EXPORT_STATEMENT_TIMEOUT_MS = 120000
+DEFAULT_ADMIN_STATEMENT_TIMEOUT_MS = 10000
+
+NARROW_FILTERS_MESSAGE = 'This took too long to load. Try narrowing the filters.'
+
+# SQLSTATE of a statement cancelled by statement_timeout (query_canceled).
+_QUERY_CANCELED = '57014'
+
+_timeouts = Counter()
+_timeouts_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(Exception):
+    """A statement inside statement_budget ran longer than its timeout."""
+
+    def __init__(self, name):
+        super().__init__(f'{name} exceeded its statement timeout')
+        self.name = name
+
+
+def statement_timeout_stats():
+    """Return the number of statement timeouts per budget name in this process."""
+    with _timeouts_lock:
+        return dict(_timeouts)
+
+
+def _is_statement_timeout(error):
+    return getattr(error.__cause__, 'pgcode', None) == _QUERY_CANCELED
+
+
+@contextmanager
+def statement_budget(name, timeout_ms, using=None):
+    """Run the block in a transaction whose statements may take at most timeout_ms each.
+
+    ``using`` defaults to the alias reads are currently routed to (see
+    core.replica). A timeout_ms of 0 disables the limit. Raises
+    QueryBudgetExceeded, after counting it under name, when a statement
+    times out; other errors pass through.
+    """
+    if using is None:
+        using = router.db_for_read(ClinicReport)
+    connection = connections[using]
+    if not timeout_ms or connection.vendor != 'postgresql':
+        yield
+        return
+
+    nested = connection.in_atomic_block
+    try:
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                if nested:
+                    cursor.execute('SELECT current_setting(%s)', ['statement_timeout'])
+                    previous = cursor.fetchone()[0]
+                cursor.execute('SET LOCAL statement_timeout = %s', [int(timeout_ms)])
+            yield
+            if nested:
+                # SET LOCAL lasts until the outer transaction ends, so put the caller's value back.
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT set_config(%s, %s, true)', ['statement_timeout', previous])
+    except OperationalError as error:
+        if not _is_statement_timeout(error):
+            raise
+        with _timeouts_lock:
+            _timeouts[name] += 1
+        raise QueryBudgetExceeded(name) from error
+
+
+class StatementTimeoutChangeListMixin:
+    """ModelAdmin mixin: changelist queries get ADMIN_STATEMENT_TIMEOUT_MS.
+
+    When the list times out the user is sent back with a warning, to the
+    unfiltered list if they had filters or searches applied, or to the
+    admin index otherwise.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        timeout_ms = getattr(settings, 'ADMIN_STATEMENT_TIMEOUT_MS', DEFAULT_ADMIN_STATEMENT_TIMEOUT_MS)
+        name = f'admin.{self.opts.app_label}.{self.opts.model_name}'
+        try:
+            with statement_budget(name, timeout_ms):
+                response = super().changelist_view(request, extra_context)
+                # TemplateResponse is rendered lazily; run its queries inside the budget.
+                if hasattr(response, 'render'):
+                    response.render()
+                return response
+        except QueryBudgetExceeded:
+            self.message_user(request, NARROW_FILTERS_MESSAGE, messages.WARNING)
+            if request.GET:
+                url = reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_changelist')
+            else:
+                url = reverse('admin:index')
+            return HttpResponseRedirect(url)
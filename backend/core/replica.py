@@ -0,0 +1,211 @@
+"""Send read-only analytics queries to a Postgres read replica.
+
+When a ``replica`` database alias is configured (POSTGRES_REPLICA_HOST),
+views wrapped in ``replica_reads`` and admin changelists using
+``ReplicaChangeListMixin`` read from it, so heavy dashboard aggregates and
+exports do not compete with report submissions on the primary. Everything
+else, and every write, stays on ``default``.
+
+Reads fall back to the primary when:
+
+* the replica lags more than REPLICA_MAX_LAG_SECONDS behind (checked at most
+  every REPLICA_LAG_CHECK_SECONDS per process) or cannot be reached, or
+* the user wrote something in the last REPLICA_STICKY_SECONDS, so a student
+  sees their new report straight away. ``StickyPrimaryMiddleware``
+  (core.middleware) sets the cookie recording that.
+
+The chosen alias lives in a context variable, so it follows the request
+into ``sync_to_async`` and the dashboard query pool (core.concurrency),
+but not into unrelated threads.
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+STICKY_COOKIE_NAME = 'primary_until'
+
+DEFAULT_MAX_LAG_SECONDS = 10
+DEFAULT_LAG_CHECK_SECONDS = 5
+DEFAULT_STICKY_SECONDS = 15
+
+# Writes to these apps (sessions, activity logs, login throttling) happen on
+# most requests and never change what the dashboards show, so they do not
+# pin the user to the primary.
+STICKY_IGNORED_APPS = frozenset({'sessions', 'user_logging', 'axes'})
+
+# Alias ORM reads in the current request/task go to, or None for the default.
+_read_alias = ContextVar('replica_read_alias', default=None)
+# Set by StickyPrimaryMiddleware to a dict whose 'wrote' flag the router raises.
+_write_marker = ContextVar('replica_write_marker', default=None)
+
+_lag_lock = threading.Lock()
+_lag_state = {'checked_at': None, 'usable': False}
+
+_LAG_SQL = (
+    'SELECT CASE WHEN NOT pg_is_in_recovery() '
+    'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def replica_configured():
+    """Return True if a replica alias is defined in DATABASES."""
+    return REPLICA_ALIAS in connections.settings
+
+
+def _replica_lag():
+    """Return the replica's replay lag in seconds (0 when fully caught up or not a standby)."""
+    connection = connections[REPLICA_ALIAS]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(_LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def replica_usable():
+    """Return True if the replica is configured, reachable and within the lag limit.
+
+    The answer is cached per process for REPLICA_LAG_CHECK_SECONDS, so at
+    most one lag query runs per interval whatever the request rate.
+    """
+    if not replica_configured():
+        return False
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_SECONDS', DEFAULT_LAG_CHECK_SECONDS)
+    now = time.monotonic()
+    with _lag_lock:
+        checked_at = _lag_state['checked_at']
+        if checked_at is not None and now - checked_at < interval:
+            return _lag_state['usable']
+        # Claim this interval so concurrent requests use the cached answer meanwhile.
+        _lag_state['checked_at'] = now
+
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', DEFAULT_MAX_LAG_SECONDS)
+    try:
+        lag = _replica_lag()
+        usable = lag <= max_lag
+        if not usable:
+            logger.warning(f"Replica is {lag:.1f}s behind; reading from the primary.")
+    except Exception as e:
+        logger.warning(f"Replica lag check failed; reading from the primary: {e}")
+        usable = False
+    _lag_state['usable'] = usable
+    return usable
+
+
+def reset_lag_check():
+    """Forget the cached lag check, so the next read re-checks the replica."""
+    with _lag_lock:
+        _lag_state.update(checked_at=None, usable=False)
+
+
+def pinned_to_primary(request):
+    """Return True if request carries a recent-write cookie from StickyPrimaryMiddleware."""
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _choose_alias(request):
+    """Return REPLICA_ALIAS if this request's reads may go to the replica, else None."""
+    if request is not None and pinned_to_primary(request):
+        return None
+    return REPLICA_ALIAS if replica_usable() else None
+
+
+@contextmanager
+def use_replica(request=None):
+    """Route ORM reads inside the block to the replica, when allowed for request."""
+    token = _read_alias.set(_choose_alias(request))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_reads(view):
+    """View decorator: the view's ORM reads go to the replica when allowed.
+
+    Works on sync and async views. Responses must be rendered inside the
+    view (as ``render()`` does), or their queries run after routing ends.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # The lag check may query the replica, which cannot happen on the event loop.
+            token = _read_alias.set(await sync_to_async(_choose_alias)(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+        return wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replica(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def track_writes():
+    """Yield a dict whose 'wrote' flag turns True if the block writes user data."""
+    marker = {'wrote': False}
+    token = _write_marker.set(marker)
+    try:
+        yield marker
+    finally:
+        _write_marker.reset(token)
+
+
+class ReplicaRouter:
+    """Database router for the replica alias; see the module docstring."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        marker = _write_marker.get()
+        if marker is not None and model._meta.app_label not in STICKY_IGNORED_APPS:
+            marker['wrote'] = True
+        # Explicit, so saving an object that was read from the replica still writes to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema by replication.
+        return False if db == REPLICA_ALIAS else None
+
+
+class ReplicaChangeListMixin:
+    """ModelAdmin mixin: GET changelist pages (list, counts, filters) read from the replica.
+
+    Bulk actions are POSTs and keep reading from the primary.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with use_replica(request):
+            response = super().changelist_view(request, extra_context)
+            # TemplateResponse is rendered lazily; run its queries while routing is active.
+            if hasattr(response, 'render'):
+                response.render()
+            return response
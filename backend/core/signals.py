@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .user_snapshot import bump_user_version
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user_snapshots(sender, instance, **kwargs):
+    """Drop the session snapshots of a user who was saved (e.g. is_staff/is_active changed) or deleted.
+
+    The version is bumped again once the write commits, so requests that
+    snapshot the user before the commit do not keep the old values.
+    """
+    user_id = instance.pk
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id))
@@ -0,0 +1,151 @@
+"""Single-flight: concurrent identical computations share one execution.
+
+Within a process, callers with the same key wait for the first caller (the
+leader) and get its result. Across processes, the leader holds a Postgres
+advisory lock while computing and publishes its result to the shared cache;
+a process that finds the lock taken waits for it and reuses that result if
+it finished after the waiter arrived, instead of running the same queries.
+
+Results are only shared between overlapping requests, never served later
+(see ``SINGLE_FLIGHT_RESULT_TTL_SECONDS``), so this is coalescing, not caching.
+Sharing across processes needs a shared cache backend (DJANGO_CACHE_BACKEND);
+with the default local-memory cache other processes wait for the lock and
+then compute themselves.
+
+Waiting holds a worker, so followers give up after ``SINGLE_FLIGHT_WAIT_SECONDS``
+(by default the dashboard statement budget) and compute the result themselves.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+DEFAULT_SINGLE_FLIGHT_WAIT_SECONDS = 5
+DEFAULT_SINGLE_FLIGHT_RESULT_TTL_SECONDS = 10
+# How often a waiting process retries the advisory lock.
+LOCK_POLL_SECONDS = 0.05
+
+_lock = threading.Lock()
+_in_flight = {}
+_stats = {
+    'executions': 0,
+    'shared_in_process': 0,
+    'shared_across_processes': 0,
+    'wait_timeouts': 0,
+}
+
+
+class _Call:
+    """One in-flight computation that followers in this process wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _increment(name):
+    """Add one to a process-wide counter."""
+    with _lock:
+        _stats[name] += 1
+
+
+def single_flight_stats():
+    """Return process-wide single-flight counters for the metrics endpoint."""
+    with _lock:
+        return dict(_stats)
+
+
+def _wait_seconds():
+    """Return how long a follower waits for the leader before computing itself."""
+    return getattr(settings, 'SINGLE_FLIGHT_WAIT_SECONDS', DEFAULT_SINGLE_FLIGHT_WAIT_SECONDS)
+
+
+def _advisory_lock_id(key):
+    """Map key onto the signed 64-bit id space of pg advisory locks."""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big', signed=True)
+
+
+def _try_advisory_lock(lock_id):
+    """Try to take the session-level advisory lock without blocking."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+        return cursor.fetchone()[0]
+
+
+def _advisory_unlock(lock_id):
+    """Release a session-level advisory lock taken by _try_advisory_lock."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+def _run_across_processes(key, compute):
+    """Compute under the key's advisory lock, or reuse the result of a process that held it."""
+    arrived_at = time.time()
+    lock_id = _advisory_lock_id(key)
+    cache_key = f'single_flight:{key}'
+
+    acquired = _try_advisory_lock(lock_id)
+    deadline = time.monotonic() + _wait_seconds()
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        acquired = _try_advisory_lock(lock_id)
+    if not acquired:
+        # The other process is taking too long; do not keep this request waiting on it.
+        _increment('wait_timeouts')
+
+    try:
+        if acquired:
+            shared = cache.get(cache_key)
+            # Only a result that finished after this request arrived counts as
+            # the same computation; anything older may be out of date.
+            if shared is not None and shared[0] >= arrived_at:
+                _increment('shared_across_processes')
+                return shared[1]
+
+        result = compute()
+        _increment('executions')
+        cache.set(
+            cache_key,
+            (time.time(), result),
+            getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL_SECONDS', DEFAULT_SINGLE_FLIGHT_RESULT_TTL_SECONDS),
+        )
+        return result
+    finally:
+        if acquired:
+            _advisory_unlock(lock_id)
+
+
+def single_flight(key, compute):
+    """Return compute(), sharing one execution with concurrent callers using the same key.
+
+    The result is shared between callers, so treat it as read-only.
+    """
+    with _lock:
+        call = _in_flight.get(key)
+        is_leader = call is None
+        if is_leader:
+            call = _in_flight[key] = _Call()
+
+    if not is_leader:
+        if call.done.wait(_wait_seconds()):
+            _increment('shared_in_process')
+            if call.error is not None:
+                raise call.error
+            return call.result
+        _increment('wait_timeouts')
+        return compute()
+
+    try:
+        call.result = _run_across_processes(key, compute)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+        call.done.set()
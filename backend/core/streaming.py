@@ -0,0 +1,48 @@
+"""Streaming response bodies that stay bounded under both WSGI and ASGI.
+
+The CSV export and the change feed produce their bodies from sync
+generators. Under ASGI (SERVER_INTERFACE=asgi), Django consumes a sync
+iterator given to StreamingHttpResponse with ``sync_to_async(list)``, so
+the whole body would sit in memory before the first byte is sent.
+``for_server`` hands ASGI requests an async iterator instead, which steps
+the generator one chunk at a time.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+class AsyncIteratorAdapter:
+    """Async iterator over a sync iterator, advancing it one item per ``sync_to_async`` call.
+
+    Each step runs thread-sensitively, so under ASGI every step (and any
+    database connection the generator opens) stays on the request's sync
+    thread, where Django closes connections when the request finishes.
+    ``close()`` closes the wrapped generator; StreamingHttpResponse calls it
+    when the response is closed.
+    """
+
+    def __init__(self, iterator):
+        self._iterator = iter(iterator)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await sync_to_async(next)(self._iterator, _DONE)
+        if item is _DONE:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+def for_server(request, iterator):
+    """Return iterator as StreamingHttpResponse content for request's server: async under ASGI."""
+    if isinstance(request, ASGIRequest):
+        return AsyncIteratorAdapter(iterator)
+    return iterator
@@ -1,15 +1,52 @@
 import os
 import json
+import gc
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
 from django.utils import timezone
-from django.test import TestCase, override_settings, Client
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, override_settings, Client, RequestFactory, AsyncRequestFactory
 from django.forms import ValidationError
 from types import SimpleNamespace
 from django.urls import reverse
+from django.db import connection, connections, transaction
+from django.db.models.expressions import RawSQL
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from core import importtime, profiling, query_budget, replica, streaming, throttle, warmup
+from core import concurrency, singleflight
+from core.concurrency import run_parallel
+from core.singleflight import single_flight
+from core.exports import RAW_EXPORT_HEADERS, raw_export_values
+from core.views import DASHBOARD_CARE_FIELDS, _dashboard_flight_key
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from core.management.commands import export_reports_archive
+from core.management.commands.migrate_if_needed import migrations_hash
+from core.models import MigrationState, RequestProfile
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from io import BytesIO, StringIO
 from core.adapters import CustomSocialAccountAdapter
-from clinic_reports.models import ClinicReport, Sport
+from clinic_reports.models import ClinicReport, HealthcareProvider, Sport
+from config.db_token import AzureDbToken
+from config.db_backends.postgresql.base import DatabaseWrapper as TokenAwareDatabaseWrapper, connection_stats
+from user_logging.middleware import UserActivityLoggingMiddleware, drain_pending_writes
+from user_logging.models import AdminPortalLog
 from unittest.mock import patch
-from unittest import skip
+from unittest import skip, skipUnless
+import gzip
+import csv
+import tempfile
+import zipfile
+from core import chart_payload, copy_export
+from core import middleware as compression_middleware
+from core.middleware import CompressionMiddleware, StickyPrimaryMiddleware
 
 User = get_user_model()
 
@@ -250,6 +287,7 @@ class FetchDataTests(TestCase):
         self.assertEqual(data.get('average_patients_per_week'), 0.0)
 
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
 class FetchStudentDataTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -370,6 +408,18 @@ class FetchStudentDataTests(TestCase):
         self.assertEqual(labels.get('Rehabilitation'), 1)
         self.assertNotIn('Non-Musculoskeletal', labels)
 
+    def test_fetch_student_data_columnar_format(self):
+        """Return the pie chart as parallel label/value arrays when asked for the columnar format."""
+        response = self.post_fetch_student(self.student_user, {'format': 'columnar'})
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('pie_chart_data', data)
+        columns = data['pie_chart_columns']
+        self.assertEqual(len(columns['labels']), len(columns['values']))
+        self.assertEqual(dict(zip(columns['labels'], columns['values'])).get('Rehabilitation'), 1)
+        self.assertEqual(data.get('total_patients'), 4)
+
     def test_fetch_student_data_rejects_invalid_year(self):
         """Return a 400 JSON error when the year filter is not numeric."""
         response = self.post_fetch_student(self.student_user, {'year': 'Spring'})
@@ -379,6 +429,1216 @@ class FetchStudentDataTests(TestCase):
         self.assertFalse(data.get('success'))
         self.assertIn('Invalid filter parameters', data.get('error', ''))
 
+    async def test_fetch_student_data_over_async_client(self):
+        """Serve the async endpoint through the ASGI handler with the same results."""
+        await self.async_client.aforce_login(self.student_user)
+        response = await self.async_client.post(
+            self.fetch_student_url,
+            data=json.dumps({}),
+            content_type='application/json'
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data.get('total_patients'), 4)
+
+
+class AsyncActivityLoggingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            username='async-logger',
+            email='async-logger@university.edu',
+            password='testpass123'
+        )
+
+    def make_request(self, path, user):
+        """Build a request whose auser() resolves to user, like AuthenticationMiddleware does."""
+        request = self.factory.get(path)
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    async def test_async_middleware_writes_log_in_background(self):
+        """Return the response first, then record the activity row from a background task."""
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        middleware = UserActivityLoggingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = await middleware(self.make_request('/dashboard/student/', self.user))
+        await drain_pending_writes()
+
+        self.assertEqual(response.status_code, 200)
+        log = await AdminPortalLog.objects.aget(path='/dashboard/student/')
+        self.assertEqual(log.username, 'async-logger')
+        self.assertEqual(log.extra_data['status_code'], 200)
+
+    async def test_async_middleware_skips_excluded_paths(self):
+        """Do not load the user or write a row for excluded prefixes."""
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        middleware = UserActivityLoggingMiddleware(get_response)
+        await middleware(self.make_request('/health/', self.user))
+        await drain_pending_writes()
+
+        self.assertFalse(await AdminPortalLog.objects.aexists())
+
+
+class FakeDbToken:
+    """Stand-in for AzureDbToken: the real test password, issued with a chosen lifetime."""
+
+    def __init__(self, password, lifetime):
+        self.password = password
+        self.lifetime = lifetime
+        self.expiry = 0
+        self.issued = 0
+
+    def __str__(self):
+        """Issue a new token on every use so reconnects can be counted."""
+        self.issued += 1
+        self.expiry = time.time() + self.lifetime
+        return self.password
+
+
+@override_settings(DB_TOKEN_RECYCLE_MARGIN_SECONDS=300)
+class TokenAwareConnectionTests(TestCase):
+    def make_wrapper(self, password, conn_max_age=600):
+        """Build a standalone connection to the test database with the given password."""
+        settings_dict = {**connection.settings_dict, 'PASSWORD': password, 'CONN_MAX_AGE': conn_max_age}
+        wrapper = TokenAwareDatabaseWrapper(settings_dict)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_close_at_is_capped_by_token_expiry(self):
+        """Schedule a persistent connection to close before its token expires."""
+        wrapper = self.make_wrapper(FakeDbToken(connection.settings_dict['PASSWORD'], lifetime=400))
+        wrapper.ensure_connection()
+
+        self.assertTrue(wrapper.close_at_token_expiry)
+        # 400s token lifetime - 300s margin = about 100s, well under CONN_MAX_AGE.
+        self.assertAlmostEqual(wrapper.close_at - time.monotonic(), 100, delta=10)
+
+    def test_connection_is_recycled_with_fresh_token(self):
+        """Close a connection whose token is inside the margin and reconnect with a new token."""
+        token = FakeDbToken(connection.settings_dict['PASSWORD'], lifetime=200)
+        wrapper = self.make_wrapper(token)
+        wrapper.ensure_connection()
+        recycles_before = connection_stats()['token_recycles']
+
+        # What Django runs at the start and end of every request.
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(connection_stats()['token_recycles'], recycles_before + 1)
+
+        wrapper.ensure_connection()
+        self.assertEqual(token.issued, 2)
+
+    def test_plain_password_keeps_conn_max_age(self):
+        """Leave CONN_MAX_AGE in charge when the password is a plain string."""
+        wrapper = self.make_wrapper(connection.settings_dict['PASSWORD'])
+        waits_before = connection_stats()['waits']
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertFalse(wrapper.close_at_token_expiry)
+        self.assertIsNotNone(wrapper.connection)
+        self.assertEqual(connection_stats()['waits'], waits_before + 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        """Expose connection stats to staff and refuse everyone else."""
+        student = User.objects.create_user(username='metrics-student', email='ms@university.edu', password='x')
+        staff = User.objects.create_user(username='metrics-staff', email='mf@university.edu', password='x', is_staff=True)
+        client = Client()
+
+        client.force_login(student)
+        self.assertEqual(client.get(reverse('metrics')).status_code, 403)
+
+        client.force_login(staff)
+        response = client.get(reverse('metrics'))
+        stats = json.loads(response.content)['metrics']['database_connections']
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(stats['open'], 1)
+        self.assertIn('idle', stats)
+
+
+class FakeCredential:
+    """Local stand-in for DefaultAzureCredential issuing numbered tokens.
+
+    ``lifetimes`` gives each token's lifetime in seconds (the last one
+    repeats), ``fail_calls`` are call numbers that raise, and calls after
+    ``block_after`` wait for ``release`` so a refresh can be held in flight.
+    """
+
+    def __init__(self, lifetimes=(3600,), fail_calls=(), block_after=None):
+        self.lifetimes = list(lifetimes)
+        self.fail_calls = set(fail_calls)
+        self.block_after = block_after
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def get_token(self, scope):
+        """Return the next token, or raise/block as configured."""
+        self.calls += 1
+        call = self.calls
+        if self.block_after is not None and call > self.block_after:
+            self.entered.set()
+            self.release.wait(5)
+        if call in self.fail_calls:
+            raise RuntimeError('token service unavailable')
+        lifetime = self.lifetimes[min(call, len(self.lifetimes)) - 1]
+        return SimpleNamespace(token=f'token-{call}', expires_on=time.time() + lifetime)
+
+
+class AzureDbTokenTests(SimpleTestCase):
+    def make_token(self, credential, **kwargs):
+        """Build a token provider around the fake credential, stopping its thread afterwards."""
+        kwargs = {'refresh_margin': 600, 'min_remaining': 300, 'jitter': 0, **kwargs}
+        token = AzureDbToken(credential=credential, **kwargs)
+        self.addCleanup(token.stop)
+        return token
+
+    def wait_for(self, predicate, timeout=5):
+        """Poll until predicate() is true, failing the test after timeout seconds."""
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail('Timed out waiting for the background refresh')
+            time.sleep(0.01)
+
+    def test_first_use_fetches_once_then_serves_cache(self):
+        """Block only the first caller; later connections reuse the cached token."""
+        credential = FakeCredential()
+        token = self.make_token(credential)
+
+        self.assertEqual(str(token), 'token-1')
+        self.assertEqual(str(token), 'token-1')
+        self.assertEqual(credential.calls, 1)
+        self.assertEqual(token.refresh_stats()['blocking_refreshes'], 1)
+
+    def test_serves_last_good_token_while_refresh_in_flight(self):
+        """Keep answering with the current token while the background refresh is blocked."""
+        # 500s is inside the 600s refresh margin but above min_remaining, so the
+        # background thread refreshes straight away while the token stays usable.
+        credential = FakeCredential(lifetimes=(500, 3600), block_after=1)
+        token = self.make_token(credential)
+
+        self.assertEqual(str(token), 'token-1')
+        self.assertTrue(credential.entered.wait(5))
+        self.assertEqual(str(token), 'token-1')
+
+        credential.release.set()
+        self.wait_for(lambda: token.token == 'token-2')
+        stats = token.refresh_stats()
+        self.assertEqual(stats['refreshes'], 2)
+        self.assertEqual(stats['blocking_refreshes'], 1)
+        self.assertIsNotNone(stats['latency_ms_last'])
+
+    def test_failed_refreshes_retry_with_backoff(self):
+        """Retry failed background refreshes until one succeeds, counting the failures."""
+        credential = FakeCredential(lifetimes=(500, 3600), fail_calls={2, 3})
+        token = self.make_token(credential, backoff_initial=0.01, backoff_max=0.05)
+
+        self.assertEqual(str(token), 'token-1')
+        self.wait_for(lambda: token.token == 'token-4')
+        self.assertEqual(token.refresh_stats()['failures'], 2)
+
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        """Double the retry delay per failure, within jitter, and never exceed backoff_max."""
+        token = self.make_token(FakeCredential(), backoff_initial=1, backoff_max=8)
+
+        self.assertTrue(0.5 <= token._backoff_delay(1) <= 1)
+        self.assertTrue(2 <= token._backoff_delay(3) <= 4)
+        self.assertTrue(4 <= token._backoff_delay(10) <= 8)
+
+    def test_expired_token_is_fetched_inline(self):
+        """Block and fetch when the cached token is too close to expiry to hand out."""
+        credential = FakeCredential()
+        token = self.make_token(credential)
+        # A cached token with 100s left is below min_remaining and must not be handed out.
+        token.token = 'stale-token'
+        token.expiry = time.time() + 100
+
+        self.assertEqual(str(token), 'token-1')
+        self.assertEqual(token.refresh_stats()['blocking_refreshes'], 1)
+
+
+class StartupImportTimeTests(SimpleTestCase):
+    # Worker startup measured ~420 ms after the lazy-import changes; the budget
+    # leaves room for slower CI machines but catches a new heavy import.
+    STARTUP_IMPORT_BUDGET_MS = 1000
+    # Only needed by exports / in Azure, so they must stay behind lazy imports.
+    LAZY_MODULES = ['openpyxl', 'azure.identity']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = importtime.measure()
+
+    def test_parse_importtime_reads_depth_and_times(self):
+        """Turn -X importtime lines into module timings with their nesting depth."""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   json.decoder\n'
+            'import time:       300 |        420 | json\n'
+        )
+        self.assertEqual(importtime.parse_importtime(output), [
+            importtime.ImportTiming('json.decoder', 120, 120, 1),
+            importtime.ImportTiming('json', 300, 420, 0),
+        ])
+
+    def test_worker_startup_stays_within_budget(self):
+        """Fail when importing config.wsgi and the URLconf exceeds the import-time budget."""
+        total = importtime.total_ms(self.timings)
+        self.assertLess(
+            total,
+            self.STARTUP_IMPORT_BUDGET_MS,
+            f'Worker startup imports took {total:.0f} ms:\n{importtime.format_table(self.timings, limit=15)}',
+        )
+
+    def test_heavy_optional_modules_are_not_imported_at_startup(self):
+        """Keep openpyxl and azure.identity out of worker startup."""
+        imported = {t.module for t in self.timings}
+        for module in self.LAZY_MODULES:
+            self.assertNotIn(module, imported)
+
+
+class WorkerWarmupTests(TestCase):
+    def setUp(self):
+        # Each test starts from a cold worker.
+        state = patch.dict(warmup._state, {'finished': False, 'duration_ms': None, 'steps': {}, 'errors': {}})
+        state.start()
+        self.addCleanup(state.stop)
+
+    def test_project_templates_exclude_third_party_apps(self):
+        """Warm this project's templates, not every admin/allauth template."""
+        names = warmup.project_template_names()
+
+        self.assertIn('core/faculty_dashboard.html', names)
+        self.assertIn('clinic_reports/form.html', names)
+        self.assertFalse(any(name.startswith(('admin/', 'account/')) for name in names))
+
+    def test_run_warmup_runs_every_step(self):
+        """Report ready with a timing for each step after a clean warmup."""
+        self.assertTrue(warmup.run_warmup())
+
+        status = warmup.warmup_status()
+        self.assertEqual(set(status['steps']), {name for name, _ in warmup.warmup_steps()})
+        self.assertEqual(status['errors'], {})
+
+    def test_connection_step_needs_persistent_connections(self):
+        """Only prefetch the token when the first request would close a warmed connection."""
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            self.assertTrue(warmup.run_warmup())
+            self.assertNotIn('database', warmup.warmup_status()['steps'])
+        self.assertIn('database_token', warmup.warmup_status()['steps'])
+
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}):
+            self.assertTrue(warmup.run_warmup())
+        self.assertIn('database', warmup.warmup_status()['steps'])
+
+    def test_ready_endpoint_reports_failed_warmup_then_recovers(self):
+        """Return 503 while a warmup step fails, and 200 once a later probe succeeds."""
+        def unreachable_database():
+            raise RuntimeError('database unreachable')
+
+        with patch.object(warmup, 'WARMUP_STEPS', [('database_token', unreachable_database)]):
+            response = self.client.get(reverse('health_ready'))
+        data = json.loads(response.content)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(data['status'], 'warming')
+        self.assertIn('database_token', data['errors'])
+
+        response = self.client.get(reverse('health_ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['status'], 'ready')
+
+
+class MigrateIfNeededTests(TestCase):
+    command_module = 'core.management.commands.migrate_if_needed'
+
+    def run_command(self, *args):
+        """Run migrate_if_needed with migrate itself mocked out; return (output, mocked call_command)."""
+        out = StringIO()
+        with patch(f'{self.command_module}.call_command') as migrate:
+            call_command('migrate_if_needed', *args, stdout=out)
+        return out.getvalue(), migrate
+
+    def test_migrates_and_records_hash_when_none_stored(self):
+        """Run migrate on a database with no recorded hash, then store the current one."""
+        output, migrate = self.run_command()
+
+        migrate.assert_called_once()
+        self.assertEqual(MigrationState.objects.get().migrations_hash, migrations_hash())
+        self.assertIn('Migrations applied', output)
+
+    def test_skips_migrate_when_hash_matches(self):
+        """Exit without migrating when the stored hash matches the files on disk."""
+        MigrationState.objects.create(pk=1, migrations_hash=migrations_hash())
+
+        output, migrate = self.run_command()
+
+        migrate.assert_not_called()
+        self.assertIn('skipping migrate', output)
+
+    def test_migrates_when_files_changed(self):
+        """Migrate when the stored hash is from an older set of migration files."""
+        MigrationState.objects.create(pk=1, migrations_hash='0' * 64)
+
+        _, migrate = self.run_command()
+
+        migrate.assert_called_once()
+        self.assertEqual(MigrationState.objects.get().migrations_hash, migrations_hash())
+
+    def test_force_migrates_even_when_hash_matches(self):
+        """Always migrate with --force."""
+        MigrationState.objects.create(pk=1, migrations_hash=migrations_hash())
+
+        _, migrate = self.run_command('--force')
+
+        migrate.assert_called_once()
+
+    @override_settings(CLINIC_REPORTS_ONE_REPORT_PER_WEEK=True)
+    def test_refuses_to_boot_when_database_checks_fail(self):
+        """Stop with the database check errors, e.g. one-report-per-week mode without its unique index."""
+        MigrationState.objects.create(pk=1, migrations_hash=migrations_hash())
+
+        with self.assertRaisesMessage(SystemCheckError, 'clinic_reports.E001'):
+            self.run_command()
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ParallelQueryTests(TransactionTestCase):
+    # The pool threads use their own connections, so the rows they read must be
+    # committed; restore the seeded sports/providers after each test.
+    serialized_rollback = True
+
+    def setUp(self):
+        # The pool only runs with persistent connections.
+        for alias in connections:
+            patcher = patch.dict(connections.settings[alias], {'CONN_MAX_AGE': 60})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.shut_down_pool)
+
+    def shut_down_pool(self):
+        """End the pool threads, and with them the connections they keep between tasks."""
+        executor, concurrency._executor = concurrency._executor, None
+        if executor is not None:
+            executor.shutdown()
+        gc.collect()
+
+    def test_tasks_run_on_pool_threads_and_reuse_connections(self):
+        """Run tasks on pool threads, each keeping one idle connection for its next task."""
+        connects_before = connection_stats()['waits']
+
+        def count_reports():
+            return threading.current_thread().name, ClinicReport.objects.count()
+
+        for _ in range(5):
+            results = run_parallel({f'task{index}': count_reports for index in range(4)})
+            for thread_name, count in results.values():
+                self.assertTrue(thread_name.startswith('dashboard-query'))
+                self.assertEqual(count, 0)
+
+        # 20 tasks, but at most one new connection per pool thread.
+        self.assertLessEqual(connection_stats()['waits'] - connects_before, concurrency._max_workers())
+        stats = connection_stats()
+        self.assertEqual(stats['open'], stats['idle'])
+
+    def test_runs_serially_without_persistent_connections(self):
+        """With CONN_MAX_AGE=0 each pool task would open a new connection, so stay on this thread."""
+        with patch.dict(connections.settings['default'], {'CONN_MAX_AGE': 0}):
+            results = run_parallel({
+                'a': lambda: threading.current_thread().name,
+                'b': lambda: threading.current_thread().name,
+            })
+        self.assertEqual(set(results.values()), {threading.current_thread().name})
+
+    def test_runs_serially_inside_a_transaction(self):
+        """Keep tasks on the calling thread so they can see uncommitted rows."""
+        with transaction.atomic():
+            results = run_parallel({
+                'a': lambda: threading.current_thread().name,
+                'b': lambda: threading.current_thread().name,
+            })
+        self.assertEqual(set(results.values()), {threading.current_thread().name})
+
+    def test_task_errors_are_raised_to_the_caller(self):
+        """Re-raise a failing task's exception after every task has finished."""
+        def broken():
+            raise ValueError('bad widget')
+
+        with self.assertRaises(ValueError):
+            run_parallel({'ok': lambda: 1, 'broken': broken})
+
+    def test_faculty_dashboard_matches_serial_rendering(self):
+        """Render the same dashboard context whether widgets run in parallel or serially."""
+        sport, _ = Sport.objects.get_or_create(name='Football')
+        for week in (1, 2, 2):
+            ClinicReport.objects.create(
+                first_name='Par', last_name='Allel', email='parallel@university.edu', sport=sport, week=week,
+                immediate_emergency_care=1, musculoskeletal_exam=2, non_musculoskeletal_exam=0,
+                taping_bracing=0, rehabilitation_reconditioning=0, modalities=0, pharmacology=0,
+                injury_illness_prevention=0, non_sport_patient=0,
+            )
+        staff = User.objects.create_user(username='parallel-staff', email='ps@university.edu', password='x', is_staff=True)
+        self.client.force_login(staff)
+        keys = ['pie_chart_data', 'pie_chart_data2', 'metric_total_experiences', 'metric_total_reports',
+                'metric_active_students', 'trend_datasets', 'students', 'weeks_list']
+
+        with override_settings(DASHBOARD_QUERY_WORKERS=1):
+            serial = self.client.get(reverse('faculty_dashboard')).context
+        parallel = self.client.get(reverse('faculty_dashboard')).context
+
+        for key in keys:
+            self.assertEqual(parallel[key], serial[key], key)
+        self.assertEqual(parallel['metric_total_experiences'], 9)
+
+
+class SingleFlightTests(TransactionTestCase):
+    # Later TestCases expect the migrated content types and permissions this flush removes.
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+
+    def run_in_thread(self, func):
+        """Start func on a thread that closes its own DB connection when done."""
+        def target():
+            try:
+                func()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def test_concurrent_callers_in_process_share_one_execution(self):
+        """Run the computation once and hand its result to a caller that arrived meanwhile."""
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 42}
+
+        leader = self.run_in_thread(lambda: results.append(single_flight('same-filters', compute)))
+        while not calls:
+            time.sleep(0.01)
+        follower = self.run_in_thread(lambda: results.append(single_flight('same-filters', compute)))
+        time.sleep(0.05)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}, {'value': 42}])
+
+    def test_waits_for_other_process_and_reuses_its_result(self):
+        """Reuse the result published by another process that held the advisory lock."""
+        key = 'cross-process'
+        lock_id = singleflight._advisory_lock_id(key)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def other_process():
+            # Stands in for another worker: its own connection holds the lock,
+            # then publishes a result before releasing it.
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id])
+                holding.set()
+                release.wait(5)
+                cache.set(f'single_flight:{key}', (time.time(), 'from other process'), 10)
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+        self.run_in_thread(other_process)
+        self.assertTrue(holding.wait(5))
+        threading.Timer(0.1, release.set).start()
+
+        result = single_flight(key, lambda: self.fail('should not recompute'))
+
+        self.assertEqual(result, 'from other process')
+
+    @override_settings(SINGLE_FLIGHT_WAIT_SECONDS=0.2)
+    def test_computes_itself_when_other_process_overruns_the_wait(self):
+        """Stop polling the advisory lock after the wait budget and run the computation here."""
+        key = 'slow-other-process'
+        lock_id = singleflight._advisory_lock_id(key)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def other_process():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id])
+                holding.set()
+                release.wait(5)
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+        self.run_in_thread(other_process)
+        self.addCleanup(release.set)
+        self.assertTrue(holding.wait(5))
+        timeouts = singleflight.single_flight_stats()['wait_timeouts']
+
+        started = time.monotonic()
+        result = single_flight(key, lambda: 'computed here')
+
+        self.assertEqual(result, 'computed here')
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(singleflight.single_flight_stats()['wait_timeouts'], timeouts + 1)
+
+    def test_wait_defaults_to_the_dashboard_statement_budget(self):
+        """Fall back to 5 s when the dashboard statement timeout is off."""
+        self.assertEqual(_fresh_setting('SINGLE_FLIGHT_WAIT_SECONDS', DASHBOARD_STATEMENT_TIMEOUT_MS='8000'), '8.0')
+        self.assertEqual(_fresh_setting('SINGLE_FLIGHT_WAIT_SECONDS', DASHBOARD_STATEMENT_TIMEOUT_MS='0'), '5.0')
+
+    def test_result_finished_before_arrival_is_not_reused(self):
+        """Recompute instead of serving a result that predates this request."""
+        key = 'stale'
+        cache.set(f'single_flight:{key}', (time.time() - 60, 'old result'), 10)
+
+        self.assertEqual(single_flight(key, lambda: 'fresh result'), 'fresh result')
+
+    def test_dashboard_key_ignores_order_csrf_and_empty_filters(self):
+        """Give equivalent dashboard requests the same single-flight key."""
+        first = QueryDict('sport=Soccer&week=3&csrfmiddlewaretoken=abc&student=')
+        second = QueryDict('week=3&sport=Soccer&csrfmiddlewaretoken=xyz')
+        other = QueryDict('week=4&sport=Soccer')
+
+        self.assertEqual(_dashboard_flight_key(first), _dashboard_flight_key(second))
+        self.assertNotEqual(_dashboard_flight_key(first), _dashboard_flight_key(other))
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        replica.reset_lag_check()
+        self.addCleanup(replica.reset_lag_check)
+        self.factory = RequestFactory()
+
+    def replica_available(self, usable=True):
+        return patch.object(replica, 'replica_usable', return_value=usable)
+
+    def test_reads_go_to_the_replica_only_inside_routed_code(self):
+        """use_replica routes ORM reads; writes always go to the primary."""
+        with self.replica_available():
+            with replica.use_replica(self.factory.get('/')):
+                self.assertEqual(ClinicReport.objects.all().db, 'replica')
+            self.assertEqual(ClinicReport.objects.all().db, 'default')
+
+        report = ClinicReport(first_name='Rep', last_name='Lica', email='r@university.edu')
+        report._state.db = 'replica'
+        self.assertEqual(replica.ReplicaRouter().db_for_write(ClinicReport, instance=report), 'default')
+        self.assertFalse(replica.ReplicaRouter().allow_migrate('replica', 'clinic_reports'))
+
+    def test_lagging_or_unreachable_replica_falls_back_to_the_primary(self):
+        """The lag check runs at most once per interval and disables a stale replica."""
+        with patch.object(replica, 'replica_configured', return_value=True), \
+                override_settings(REPLICA_MAX_LAG_SECONDS=10, REPLICA_LAG_CHECK_SECONDS=60):
+            with patch.object(replica, '_replica_lag', return_value=30) as lag, self.assertLogs('core.replica'):
+                self.assertFalse(replica.replica_usable())
+                self.assertFalse(replica.replica_usable())
+            self.assertEqual(lag.call_count, 1)
+
+            replica.reset_lag_check()
+            with patch.object(replica, '_replica_lag', return_value=2):
+                self.assertTrue(replica.replica_usable())
+
+            replica.reset_lag_check()
+            with patch.object(replica, '_replica_lag', side_effect=OSError('no route to host')), \
+                    self.assertLogs('core.replica'):
+                self.assertFalse(replica.replica_usable())
+                with replica.use_replica():
+                    self.assertEqual(ClinicReport.objects.all().db, 'default')
+
+    def test_recent_writers_are_pinned_to_the_primary(self):
+        """A write sets the sticky cookie, and requests carrying it read from the primary."""
+        def write_report(request):
+            Sport.objects.get_or_create(name='Sticky Sport')
+            return HttpResponse()
+
+        def log_activity(request):
+            AdminPortalLog.objects.create(event_type=AdminPortalLog.EVENT_ACTIVITY, path='/')
+            return HttpResponse()
+
+        with patch.object(replica, 'replica_configured', return_value=True):
+            response = StickyPrimaryMiddleware(write_report)(self.factory.post('/'))
+            self.assertIn(replica.STICKY_COOKIE_NAME, response.cookies)
+            response = StickyPrimaryMiddleware(log_activity)(self.factory.get('/'))
+            self.assertNotIn(replica.STICKY_COOKIE_NAME, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[replica.STICKY_COOKIE_NAME] = str(time.time() + 30)
+        with self.replica_available(), replica.use_replica(request):
+            self.assertEqual(ClinicReport.objects.all().db, 'default')
+
+    def test_routing_follows_async_views_and_query_pool_threads(self):
+        """The routed alias reaches async views and run_parallel's pool threads."""
+        @replica.replica_reads
+        async def view(request):
+            return await sync_to_async(run_parallel)({
+                'a': lambda: ClinicReport.objects.all().db,
+                'b': lambda: ClinicReport.objects.all().db,
+            })
+
+        with (
+            self.replica_available(),
+            patch('core.concurrency._in_transaction', return_value=False),
+            patch('core.concurrency._persistent_connections', return_value=True),
+        ):
+            results = async_to_sync(view)(self.factory.get('/'))
+        self.assertEqual(results, {'a': 'replica', 'b': 'replica'})
+
+
+@skipUnless(replica.replica_configured(), 'no replica database configured (POSTGRES_REPLICA_HOST)')
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ReplicaDatabaseTests(TransactionTestCase):
+    # In tests the replica alias mirrors the default database through its own
+    # connection, so rows must be committed to be visible to it.
+    databases = '__all__'
+    serialized_rollback = True
+
+    def setUp(self):
+        replica.reset_lag_check()
+        self.addCleanup(replica.reset_lag_check)
+
+    # Serial widgets, so the queries are captured on this thread's replica connection.
+    @override_settings(DASHBOARD_QUERY_WORKERS=1)
+    def test_dashboard_and_admin_changelist_read_from_the_replica(self):
+        sport, _ = Sport.objects.get_or_create(name='Football')
+        ClinicReport.objects.create(
+            first_name='Rep', last_name='Lica', email='replica@university.edu', sport=sport, week=1,
+            **{field: 1 for field in DASHBOARD_CARE_FIELDS},
+        )
+        staff = User.objects.create_superuser(username='replica-staff', email='rs@university.edu', password='x')
+        self.client.force_login(staff)
+
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(reverse('faculty_dashboard'))
+        self.assertEqual(response.context['metric_total_reports'], 1)
+        self.assertTrue(any('clinic_reports_clinicreport' in query['sql'] for query in queries))
+
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.client.get(reverse('admin:clinic_reports_clinicreport_changelist'))
+        self.assertTrue(any('clinic_reports_clinicreport' in query['sql'] for query in queries))
+
+
+def _sleep_one_second(*args):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_sleep(1)')
+
+
+@override_settings(
+    DASHBOARD_STATEMENT_TIMEOUT_MS=50, EXPORT_STATEMENT_TIMEOUT_MS=50, ADMIN_STATEMENT_TIMEOUT_MS=50,
+    DASHBOARD_SINGLE_FLIGHT=False,
+)
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class StatementTimeoutTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username='budget-staff', email='bs@university.edu', password='x')
+        sport, _ = Sport.objects.get_or_create(name='Football')
+        ClinicReport.objects.create(
+            first_name='Slow', last_name='Query', email='slow@university.edu', sport=sport, week=1,
+            **{field: 1 for field in DASHBOARD_CARE_FIELDS},
+        )
+
+    def timeouts(self, name):
+        return query_budget.statement_timeout_stats().get(name, 0)
+
+    def test_budget_cancels_slow_statements_and_restores_the_timeout(self):
+        """A slow statement raises QueryBudgetExceeded; the connection stays usable afterwards."""
+        before = self.timeouts('test.sleep')
+        with self.assertRaises(query_budget.QueryBudgetExceeded):
+            with query_budget.statement_budget('test.sleep', 50):
+                _sleep_one_second()
+        self.assertEqual(self.timeouts('test.sleep'), before + 1)
+
+        with query_budget.statement_budget('test.fast', 50):
+            self.assertEqual(ClinicReport.objects.count(), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], '0')
+
+    def test_faculty_dashboard_degrades_only_the_slow_widget(self):
+        self.client.force_login(self.staff)
+        before = self.timeouts('dashboard.trend_chart')
+        with patch.dict('core.views.DASHBOARD_WIDGETS', {'trend_chart': _sleep_one_second}):
+            response = self.client.get(reverse('faculty_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['timed_out_widgets'], ['trend chart'])
+        self.assertEqual(response.context['trend_datasets'], [])
+        self.assertEqual(response.context['metric_total_reports'], 1)
+        self.assertContains(response, 'Try narrowing the filters.')
+        self.assertEqual(self.timeouts('dashboard.trend_chart'), before + 1)
+
+    def test_student_data_reports_partial_results(self):
+        student = User.objects.create_user(username='slow-student', email='slow@university.edu', password='x')
+        self.client.force_login(student)
+        with patch('core.views._average_patients_per_week', side_effect=_sleep_one_second):
+            response = self.client.post(
+                reverse('fetch_student_data'), data=json.dumps({}), content_type='application/json',
+            )
+
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertTrue(data['partial'])
+        self.assertEqual(data['timed_out'], ['average'])
+        self.assertEqual(data['total_patients'], 9)
+
+    def test_export_timeout_returns_a_narrow_filters_response(self):
+        self.client.force_login(self.staff)
+        slow_reports = ClinicReport.objects.annotate(nap=RawSQL('pg_sleep(1)', [])).order_by('id')
+        with patch('core.exports.export_reports_queryset', return_value=slow_reports):
+            response = self.client.post(reverse('export_dashboard_excel'), {})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['timed_out'], True)
+
+    def test_admin_changelist_timeout_redirects_with_a_warning(self):
+        self.client.force_login(self.staff)
+        slow_reports = ClinicReport.objects.annotate(nap=RawSQL('pg_sleep(1)', []))
+        with patch('clinic_reports.admin.ClinicReportAdmin.get_queryset', return_value=slow_reports):
+            response = self.client.get(reverse('admin:clinic_reports_clinicreport_changelist'))
+
+        self.assertRedirects(response, reverse('admin:index'), fetch_redirect_response=False)
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=True)
+class ThrottleTests(TestCase):
+    """Rate limits on plain views, counted in a file cache as a shared cache would be."""
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        caches_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir.name,
+        }})
+        caches_override.enable()
+        self.addCleanup(caches_override.disable)
+        self.user = User.objects.create_user(username='eager', email='eager@university.edu', password='x')
+        self.sport, _ = Sport.objects.get_or_create(name='Football')
+
+    def test_parse_rate(self):
+        self.assertEqual(throttle.parse_rate('30/minute'), (30, 60))
+        self.assertEqual(throttle.parse_rate('5/s'), (5, 1))
+        self.assertEqual(throttle.parse_rate('100/hour'), (100, 3600))
+        self.assertIsNone(throttle.parse_rate(''))
+        with self.assertRaises(ValueError):
+            throttle.parse_rate('30 per minute')
+
+    @override_settings(VIEW_THROTTLE_RATES={'test': {'user': '3/minute'}})
+    def test_sliding_window_weights_the_previous_window(self):
+        start = 600 * 60  # the start of a window
+        for offset in range(3):
+            self.assertEqual(throttle.check_throttle('test', self.user, None, now=start + offset), 0)
+        # The window is full until it ends and its weight fades to fit one more: 57s + 60s * (1 - 3/4).
+        self.assertEqual(throttle.check_throttle('test', self.user, None, now=start + 3), 72)
+
+        # Halfway through the next window the 3 earlier requests still weigh 1.5.
+        halfway = start + 90
+        self.assertEqual(throttle.check_throttle('test', self.user, None, now=halfway), 0)
+        # 1.5 + 2 > 3: wait until the earlier window weighs 1, a sixth of a window.
+        self.assertEqual(throttle.check_throttle('test', self.user, None, now=halfway), 10)
+        self.assertEqual(throttle.check_throttle('test', self.user, None, now=halfway + 10), 0)
+
+    @override_settings(VIEW_THROTTLE_RATES={'submit': {'user': '2/minute'}})
+    def test_submit_over_the_user_limit_gets_429_with_retry_after(self):
+        self.client.force_login(self.user)
+        payload = json.dumps({
+            'sport': self.sport.id, 'week': 1, 'interacted_hcps': 0, **{field: 0 for field in DASHBOARD_CARE_FIELDS},
+        })
+        before = throttle.throttle_stats().get('submit.user', 0)
+        for _ in range(2):
+            response = self.client.post(reverse('submit_report'), payload, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse('submit_report'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(ClinicReport.objects.count(), 2)
+        self.assertEqual(throttle.throttle_stats()['submit.user'], before + 1)
+
+        # Other users have their own budget.
+        other = User.objects.create_user(username='patient', email='patient@university.edu', password='x')
+        self.client.force_login(other)
+        response = self.client.post(reverse('submit_report'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(VIEW_THROTTLE_RATES={'dashboard': {'ip': '1/minute'}})
+    def test_ip_limit_applies_across_users_and_async_views(self):
+        self.client.force_login(self.user)
+        url = reverse('fetch_student_data')
+        response = self.client.post(url, '{}', content_type='application/json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+        other = User.objects.create_user(username='roommate', email='roommate@university.edu', password='x')
+        self.client.force_login(other)
+        response = self.client.post(url, '{}', content_type='application/json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(url, '{}', content_type='application/json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(VIEW_THROTTLE_RATES={'test': {'user': '2/minute', 'ip': '1/minute'}})
+    def test_requests_the_ip_limit_rejects_leave_the_user_budget_alone(self):
+        now = 600 * 60
+        self.assertEqual(throttle.check_throttle('test', self.user, '10.0.0.1', now=now), 0)
+        for _ in range(3):
+            self.assertGreater(throttle.check_throttle('test', self.user, '10.0.0.1', now=now), 0)
+        # Only the one allowed request counted: the user can still make one more from another address.
+        self.assertEqual(throttle.check_throttle('test', self.user, '10.0.0.2', now=now), 0)
+        self.assertGreater(throttle.check_throttle('test', self.user, '10.0.0.3', now=now), 0)
+
+    def test_client_ip_ignores_client_supplied_forwarded_for(self):
+        factory = RequestFactory()
+        request = factory.get('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='203.0.113.5')
+        with override_settings(THROTTLE_TRUSTED_PROXY_COUNT=0):
+            self.assertEqual(throttle.client_ip(request), '10.0.0.9')
+
+        # Behind one proxy, only the hop it appended counts; the forged entry before it does not.
+        request = factory.get('/', REMOTE_ADDR='10.0.0.9', HTTP_X_FORWARDED_FOR='203.0.113.5, 198.51.100.7:51234')
+        with override_settings(THROTTLE_TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(throttle.client_ip(request), '198.51.100.7')
+        with override_settings(THROTTLE_TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(throttle.client_ip(request), '203.0.113.5')
+            # Fewer hops than trusted proxies: the header was not written by them.
+            self.assertEqual(throttle.client_ip(factory.get('/', REMOTE_ADDR='10.0.0.9')), '10.0.0.9')
+
+    @override_settings(VIEW_THROTTLE_RATES={'dashboard': {'ip': '1/minute'}}, THROTTLE_TRUSTED_PROXY_COUNT=0)
+    def test_rotating_forwarded_for_does_not_escape_the_ip_limit(self):
+        self.client.force_login(self.user)
+        url = reverse('fetch_student_data')
+        response = self.client.post(url, '{}', content_type='application/json', HTTP_X_FORWARDED_FOR='192.0.2.1')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(url, '{}', content_type='application/json', HTTP_X_FORWARDED_FOR='192.0.2.2')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(VIEW_THROTTLE_ENABLED=False, VIEW_THROTTLE_RATES={'export': {'user': '1/minute'}})
+    def test_throttling_can_be_turned_off(self):
+        staff = User.objects.create_superuser(username='exporter', email='exporter@university.edu', password='x')
+        self.client.force_login(staff)
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse('export_report_changes')).status_code, 200)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', USER_SNAPSHOT_SECONDS=60)
+class UserSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='regular', email='regular@university.edu', password='secret')
+        self.client.force_login(self.user)
+
+    def auth_queries(self):
+        """Run a home page request and return its session and user queries."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'django_session' in query['sql'] or 'FROM "auth_user"' in query['sql']
+        ]
+
+    def test_signed_in_requests_skip_session_and_user_queries(self):
+        self.client.get(reverse('home'))
+        self.assertEqual(self.auth_queries(), [])
+
+    @override_settings(USER_SNAPSHOT_SECONDS=0)
+    def test_without_snapshots_the_user_is_queried_every_request(self):
+        self.client.get(reverse('home'))
+        queries = self.auth_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('FROM "auth_user"', queries[0])
+
+    def test_saving_the_user_invalidates_the_snapshot(self):
+        self.client.get(reverse('home'))
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertTrue(response.wsgi_request.user.is_staff)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_snapshot_users_save_without_losing_the_password(self):
+        self.client.get(reverse('home'))
+        user = self.client.get(reverse('home')).wsgi_request.user
+        self.assertEqual((user.pk, user.email, user.is_staff), (self.user.pk, 'regular@university.edu', False))
+        user.first_name = 'Renamed'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Renamed')
+        self.assertTrue(self.user.check_password('secret'))
+
+    def test_logging_in_as_someone_else_replaces_the_snapshot(self):
+        self.client.get(reverse('home'))
+        other = User.objects.create_user(username='other', email='other@university.edu', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('home')).wsgi_request.user.pk, other.pk)
+
+    def test_evicted_version_stamp_does_not_revive_a_stale_snapshot(self):
+        self.client.get(reverse('home'))
+        self.user.is_staff = True
+        self.user.save()
+        cache.clear()
+        self.assertTrue(self.client.get(reverse('home')).wsgi_request.user.is_staff)
+
+    def test_snapshots_default_off_without_a_shared_cache(self):
+        """The stamp that drops a snapshot must reach every worker, so a per-process cache turns them off."""
+        self.assertEqual(_fresh_setting('USER_SNAPSHOT_SECONDS'), '0')
+        self.assertEqual(
+            _fresh_setting('USER_SNAPSHOT_SECONDS', DJANGO_CACHE_BACKEND='django.core.cache.backends.locmem.LocMemCache'),
+            '0',
+        )
+        self.assertEqual(
+            _fresh_setting('USER_SNAPSHOT_SECONDS', DJANGO_CACHE_BACKEND='django.core.cache.backends.db.DatabaseCache'),
+            '60',
+        )
+
+
+def _fresh_setting(name, **environ):
+    """Return str(setting) as a new process computes it, without DJANGO_CACHE_BACKEND or name in the environment."""
+    env = {key: value for key, value in os.environ.items() if key not in ('DJANGO_CACHE_BACKEND', name)}
+    env.update(environ, DJANGO_SETTINGS_MODULE='config.settings')
+    result = subprocess.run(
+        [sys.executable, '-c', f'from django.conf import settings; print(settings.{name})'],
+        env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='profiler', email='profiler@university.edu', password='x', is_staff=True,
+        )
+        self.client.force_login(self.staff)
+
+    def test_sampling_profiler_collapses_stacks(self):
+        profiler = profiling.SamplingProfiler(threading.get_ident(), 0.001)
+        profiler.start()
+        _spin(0.1)
+        profiler.stop()
+
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any('_spin (core/tests.py:' in line for line in lines))
+
+    def test_staff_profile_their_requests_after_starting(self):
+        self.assertNotIn('X-Request-Profile-Id', self.client.get(reverse('faculty_dashboard')))
+        self.assertFalse(RequestProfile.objects.exists())
+
+        response = self.client.post(reverse('admin:core_requestprofile_start'))
+        self.assertRedirects(response, reverse('admin:core_requestprofile_changelist'), fetch_redirect_response=False)
+        response = self.client.get(reverse('faculty_dashboard'), {'sport': 'Football'})
+
+        profile = RequestProfile.objects.get(pk=response['X-Request-Profile-Id'])
+        self.assertEqual((profile.user, profile.method, profile.path), (self.staff, 'GET', reverse('faculty_dashboard')))
+        # Filter values can name students, so only the parameter names are kept.
+        self.assertEqual(profile.query_string, 'sport=')
+        self.assertEqual(profile.status_code, 200)
+        self.assertGreater(profile.sql_count, 0)
+        self.assertEqual(len(profile.queries), profile.sql_count)
+        self.assertTrue(any('clinic_reports_clinicreport' in query['sql'] for query in profile.queries))
+
+        self.client.post(reverse('admin:core_requestprofile_stop'))
+        self.assertNotIn('X-Request-Profile-Id', self.client.get(reverse('faculty_dashboard')))
+
+    def test_query_values_are_kept_only_with_query_logging(self):
+        request = RequestFactory().get('/', {'student': 'Jane Doe (jane@university.edu)', 'token': 'secret'})
+        self.assertEqual(profiling.stored_query_string(request), 'student=&token=')
+        with override_settings(USER_LOGGING_INCLUDE_QUERY_STRING=True):
+            self.assertEqual(
+                profiling.stored_query_string(request), 'student=Jane Doe (jane@university.edu)&token=[REDACTED]',
+            )
+
+    def test_header_token_must_belong_to_a_staff_user(self):
+        student = User.objects.create_user(username='curious', email='curious@university.edu', password='x')
+        header = {'HTTP_X_REQUEST_PROFILE': profiling.profiling_token(self.staff)}
+        self.assertIn('X-Request-Profile-Id', self.client.get(reverse('home'), **header))
+
+        self.client.force_login(student)
+        self.assertNotIn('X-Request-Profile-Id', self.client.get(reverse('home'), **header))
+        own_token = {'HTTP_X_REQUEST_PROFILE': profiling.profiling_token(student)}
+        self.assertNotIn('X-Request-Profile-Id', self.client.get(reverse('home'), **own_token))
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_admin_downloads_collapsed_stacks_and_json(self):
+        self.staff.is_superuser = True
+        self.staff.save()
+        profile = RequestProfile.objects.create(
+            user=self.staff, method='GET', path='/dashboard/', status_code=200, duration_ms=12.5,
+            sql_count=1, sql_duration_ms=2.0, sample_count=3, collapsed_stacks='main;view 3\n',
+            queries=[{'alias': 'default', 'sql': 'SELECT 1', 'ms': 2.0, 'many': False}],
+        )
+
+        response = self.client.get(reverse('admin:core_requestprofile_download', args=[profile.pk, 'stacks']))
+        self.assertEqual(response.content, b'main;view 3\n')
+        self.assertIn(f'request-profile-{profile.pk}.folded', response['Content-Disposition'])
+
+        response = self.client.get(reverse('admin:core_requestprofile_download', args=[profile.pk, 'json']))
+        data = json.loads(response.content)
+        self.assertEqual(data['queries'][0]['sql'], 'SELECT 1')
+        self.assertEqual(data['user'], 'profiler')
+
+        response = self.client.get(reverse('admin:core_requestprofile_changelist'))
+        self.assertContains(response, 'Profile my requests')
+        self.assertContains(response, reverse('admin:core_requestprofile_download', args=[profile.pk, 'stacks']))
+
+    @override_settings(REQUEST_PROFILE_RETENTION_DAYS=14)
+    def test_purge_removes_profiles_past_retention(self):
+        fields = dict(method='GET', path='/', status_code=200, duration_ms=1, sql_count=0, sql_duration_ms=0, sample_count=0)
+        old = RequestProfile.objects.create(**fields)
+        recent = RequestProfile.objects.create(**fields)
+        RequestProfile.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=15))
+
+        out = StringIO()
+        call_command('purge_request_profiles', stdout=out)
+        self.assertIn('Purged 1 expired request profiles.', out.getvalue())
+        self.assertEqual(list(RequestProfile.objects.values_list('pk', flat=True)), [recent.pk])
+
+
+class ChartPayloadTests(SimpleTestCase):
+    def test_trend_columns_share_style_table(self):
+        """Datasets with identical styling point at one style entry."""
+        style = {'borderColor': '#111', 'fill': False, 'tension': 0.1}
+        datasets = [
+            {'label': 'Football', 'data': [1, 2], **style},
+            {'label': 'Soccer', 'data': [3, 4], **style},
+            {'label': 'Total', 'data': [4, 6], 'borderColor': '#000', 'fill': False, 'tension': 0.1},
+        ]
+
+        columns = chart_payload.trend_columns(datasets)
+
+        self.assertEqual(columns['labels'], ['Football', 'Soccer', 'Total'])
+        self.assertEqual(columns['data'], [[1, 2], [3, 4], [4, 6]])
+        self.assertEqual(columns['style'], [0, 0, 1])
+        self.assertEqual(columns['styles'][0], style)
+        # Expanding the columns gives back the original datasets.
+        expanded = [
+            {'label': label, 'data': data, **columns['styles'][index]}
+            for label, data, index in zip(columns['labels'], columns['data'], columns['style'])
+        ]
+        self.assertEqual(expanded, datasets)
+
+    def test_dumps_is_compact_with_and_without_orjson(self):
+        """Both encoders produce the same compact JSON."""
+        data = {'labels': ['a'], 'values': [1.5]}
+        with patch.object(chart_payload, 'orjson', None):
+            stdlib = chart_payload.dumps(data)
+        self.assertEqual(stdlib, '{"labels":["a"],"values":[1.5]}')
+        self.assertEqual(chart_payload.dumps(data), stdlib)
+
+    def test_json_script_content_escapes_html(self):
+        """Embedded JSON cannot close the surrounding script element."""
+        content = chart_payload.json_script_content({'labels': ['</script>&']})
+
+        self.assertNotIn('<', content)
+        self.assertNotIn('&', content)
+        self.assertEqual(json.loads(content), {'labels': ['</script>&']})
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.payload = {'students': [f'Student {i} (student{i}@university.edu)' for i in range(200)]}
+
+    def process(self, response, accept_encoding='gzip', **meta):
+        """Run response through the middleware for a request with the given Accept-Encoding."""
+        request = self.factory.get('/dashboard/fetch_student_data/', HTTP_ACCEPT_ENCODING=accept_encoding, **meta)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzips_large_json(self):
+        """Compress an allow-listed JSON response and keep the body recoverable."""
+        response = self.process(JsonResponse(self.payload))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.payload)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @skipUnless(compression_middleware.brotli, 'brotli is not installed')
+    def test_prefers_brotli_when_accepted(self):
+        """Use Brotli for clients that accept it."""
+        response = self.process(JsonResponse(self.payload), accept_encoding='gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression_middleware.brotli.decompress(response.content)), self.payload)
+
+    def test_respects_zero_quality(self):
+        """Do not use an encoding the client refused with q=0."""
+        response = self.process(JsonResponse(self.payload), accept_encoding='gzip;q=0, identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_skips_small_responses(self):
+        """Leave responses under the size threshold alone."""
+        response = self.process(JsonResponse({'success': True}))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_skips_streaming_and_attachment_responses(self):
+        """Pass exports through untouched, whether streamed or buffered attachments."""
+        streaming = self.process(StreamingHttpResponse(iter([b'a,b\n'] * 1000), content_type='text/csv'))
+        attachment = HttpResponse(b'a,b\n' * 1000, content_type='text/csv')
+        attachment['Content-Disposition'] = 'attachment; filename="export.csv"'
+        attachment = self.process(attachment)
+
+        self.assertFalse(streaming.has_header('Content-Encoding'))
+        self.assertFalse(attachment.has_header('Content-Encoding'))
+
+    def test_skips_disallowed_content_types(self):
+        """Only compress allow-listed content types."""
+        response = self.process(HttpResponse(b'\x00' * 5000, content_type='application/octet-stream'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class CsrfPageCompressionTests(TestCase):
+    """The BREACH exclusion, through the full middleware stack (CsrfViewMiddleware included)."""
+
+    def setUp(self):
+        student = User.objects.create_user(username='compressed', email='compressed@university.edu', password='x')
+        self.client.force_login(student)
+
+    def get_dashboard(self):
+        return self.client.get(reverse('student_dashboard'), HTTP_ACCEPT_ENCODING='br, gzip')
+
+    def test_pages_rendering_a_csrf_token_are_not_compressed(self):
+        response = self.get_dashboard()
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    @override_settings(COMPRESSION_SKIP_CSRF_RESPONSES=False)
+    def test_exclusion_can_be_turned_off(self):
+        response = self.get_dashboard()
+
+        self.assertIn(response['Content-Encoding'], ('br', 'gzip'))
+
 
 class HomeViewTests(TestCase):
     def setUp(self):
@@ -446,6 +1706,7 @@ class HomeViewTests(TestCase):
         self.assertTrue(response.context['user'].is_authenticated)
         self.assertTrue(response.context['user'].is_staff)
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
 class DashboardViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -487,6 +1748,14 @@ class DashboardViewTests(TestCase):
         response = self.client.get(reverse('student_dashboard'))
         self.assertEqual(response.status_code, 200)
 
+    def test_faculty_dashboard_embeds_columnar_chart_data(self):
+        """The page embeds chart data as columns for the client script to expand."""
+        self.client.force_login(self.staff_user)
+        response = self.client.get(reverse('faculty_dashboard'))
+
+        self.assertEqual(set(response.context['trend_chart_columns']), {'labels', 'data', 'style', 'styles'})
+        self.assertContains(response, '<script id="trend-chart-data" type="application/json">{"labels":')
+
     def test_student_cannot_access_faculty_dashboard(self):
         """Students get redirected to login when trying to access faculty dashboard"""
         self.client.force_login(self.student_user)
@@ -494,6 +1763,7 @@ class DashboardViewTests(TestCase):
         self.assertEqual(response.status_code, 403) # Permission denied error
 
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
 class ExportDashboardExcelViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -524,6 +1794,300 @@ class ExportDashboardExcelViewTests(TestCase):
         self.assertEqual(response.status_code, 405)
 
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ExportDashboardSummaryTests(TestCase):
+    def setUp(self):
+        self.url = reverse('export_dashboard_summary')
+        self.staff_user = User.objects.create_user(
+            username='staff-summary', email='staff-summary@university.edu', password='testpass123', is_staff=True,
+        )
+        football, _ = Sport.objects.get_or_create(name='Football')
+        soccer, _ = Sport.objects.get_or_create(name='Soccer')
+        provider = HealthcareProvider.objects.create(name='Dr. Summary')
+        care = {field: 0 for field in DASHBOARD_CARE_FIELDS}
+        for week in (3, 4):
+            ClinicReport.objects.create(
+                first_name='Ada', last_name='Lovelace', email='ada@university.edu', sport=football, week=week,
+                interacted_hcps=week == 4, healthcare_provider=provider if week == 4 else None,
+                **dict(care, taping_bracing=2, modalities=1),
+            )
+        ClinicReport.objects.create(
+            first_name='Bob', last_name='Smith', email='bob@university.edu', sport=soccer, week=3,
+            **dict(care, pharmacology=1),
+        )
+
+    def read_workbook(self, response):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(BytesIO(response.content), read_only=True)
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)] for sheet in workbook}
+
+    def test_summary_sheets_hold_grouped_totals(self):
+        """Each summary sheet has one row per group with report counts and care totals."""
+        self.client.force_login(self.staff_user)
+        response = self.client.post(self.url, {'trend_sport': 'all'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename="dashboard_summary_', response['Content-Disposition'])
+        sheets = self.read_workbook(response)
+        self.assertEqual(list(sheets), ['by_sport', 'by_student', 'by_week', 'by_provider'])
+
+        header, *rows = sheets['by_sport']
+        by_sport = {row[0]: dict(zip(header, row)) for row in rows}
+        self.assertEqual(by_sport['Football']['reports'], 2)
+        self.assertEqual(by_sport['Football']['students'], 1)
+        self.assertEqual(by_sport['Football']['taping_bracing'], 4)
+        self.assertEqual(by_sport['Football']['total_experiences'], 6)
+        self.assertEqual(by_sport['Soccer']['total_experiences'], 1)
+
+        header, *rows = sheets['by_student']
+        self.assertEqual(header[:3], ['email', 'first_name', 'last_name'])
+        self.assertEqual([(row[0], row[3]) for row in rows], [('ada@university.edu', 2), ('bob@university.edu', 1)])
+
+        header, *rows = sheets['by_week']
+        self.assertEqual([(row[2], row[header.index('reports')]) for row in rows], [(3, 2), (4, 1)])
+
+        self.assertEqual(sheets['by_provider'][1:], [['Dr. Summary', 1, 1]])
+
+    def test_summary_applies_filters_and_optional_raw_sheet(self):
+        """Dashboard filters narrow every sheet; include_raw adds the raw rows."""
+        self.client.force_login(self.staff_user)
+        response = self.client.post(self.url, {'sport': 'Soccer', 'trend_sport': 'all', 'include_raw': '1'})
+
+        sheets = self.read_workbook(response)
+        self.assertEqual([row[0] for row in sheets['by_sport'][1:]], ['Soccer'])
+        header, *rows = sheets['clinic_reports_raw']
+        self.assertEqual(header, RAW_EXPORT_HEADERS)
+        self.assertEqual([row[header.index('email')] for row in rows], ['bob@university.edu'])
+        self.assertEqual(rows[0][header.index('healthcare_provider')], None)
+
+    def test_summary_requires_staff(self):
+        student = User.objects.create_user(username='student-summary', email='s@university.edu', password='x')
+        self.client.force_login(student)
+        self.assertEqual(self.client.post(self.url, {}).status_code, 403)
+
+
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ExportDashboardCsvTests(TransactionTestCase):
+    # COPY streams from a helper thread with its own connection, so rows must be committed.
+    serialized_rollback = True
+
+    def setUp(self):
+        self.url = reverse('export_dashboard_csv')
+        self.staff_user = User.objects.create_user(
+            username='staff-csv', email='staff-csv@university.edu', password='testpass123', is_staff=True,
+        )
+        football, _ = Sport.objects.get_or_create(name='Football')
+        soccer, _ = Sport.objects.get_or_create(name='Soccer')
+        care = {field: 0 for field in DASHBOARD_CARE_FIELDS}
+        self.football_report = ClinicReport.objects.create(
+            first_name='Ada', last_name='Lovelace', email='ada@university.edu', sport=football, week=3,
+            **dict(care, taping_bracing=2, modalities=1),
+        )
+        ClinicReport.objects.create(
+            first_name='Bob', last_name='Smith', email='bob@university.edu', sport=soccer, week=3, **care,
+        )
+
+    def read_csv(self, content):
+        return list(csv.reader(StringIO(content.decode())))
+
+    def test_csv_export_streams_filtered_rows(self):
+        """The CSV has the Excel export's columns and only the rows matching the filters."""
+        self.client.force_login(self.staff_user)
+        response = self.client.post(self.url, {'sport': 'Football', 'trend_sport': 'all'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="dashboard_raw_', response['Content-Disposition'])
+        header, *rows = self.read_csv(b''.join(response.streaming_content))
+        self.assertEqual(header, RAW_EXPORT_HEADERS)
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(header, rows[0]))
+        self.assertEqual(row['id'], str(self.football_report.id))
+        self.assertEqual(row['sport'], 'Football')
+        self.assertEqual(row['healthcare_provider'], '')
+        self.assertEqual(row['total_experiences'], '3')
+
+    def test_csv_export_requires_staff(self):
+        """Non-staff users get the same 403 as the Excel export."""
+        student = User.objects.create_user(username='student-csv', email='s@university.edu', password='x')
+        self.client.force_login(student)
+        self.assertEqual(self.client.post(self.url, {}).status_code, 403)
+
+    def test_closing_the_stream_early_stops_the_copy(self):
+        """A client that disconnects mid-download does not leave the COPY thread behind."""
+        stream = copy_export.stream_copy(raw_export_values(ClinicReport.objects.all()), header=RAW_EXPORT_HEADERS)
+        self.assertTrue(next(stream).startswith(b'id,'))
+        stream.close()
+        self.assertFalse(any(thread.name == 'copy-export' for thread in threading.enumerate()))
+
+    async def test_csv_export_streams_asynchronously_under_asgi(self):
+        """Under ASGI the body is an async iterator, so Django does not buffer it into a list."""
+        await self.async_client.aforce_login(self.staff_user)
+        response = await self.async_client.post(self.url, {'sport': 'Football', 'trend_sport': 'all'})
+
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        header, *rows = self.read_csv(content)
+        self.assertEqual(header, RAW_EXPORT_HEADERS)
+        self.assertEqual([row[0] for row in rows], [str(self.football_report.id)])
+
+    def test_export_command_writes_file(self):
+        """export_reports_csv applies the same filters and writes the CSV to a file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reports.csv')
+            call_command('export_reports_csv', path, student='bob@university.edu', stdout=StringIO())
+            with open(path, 'rb') as exported:
+                header, *rows = self.read_csv(exported.read())
+        self.assertEqual([row[header.index('email')] for row in rows], ['bob@university.edu'])
+
+
+class StreamingAdapterTests(SimpleTestCase):
+    def test_async_adapter_yields_items_and_closes_the_generator(self):
+        closed = []
+
+        def chunks():
+            try:
+                yield from (b'a', b'b', b'c')
+            finally:
+                closed.append(True)
+
+        async def take_two(adapter):
+            return [await anext(adapter), await anext(adapter)]
+
+        adapter = streaming.AsyncIteratorAdapter(chunks())
+        self.assertEqual(async_to_sync(take_two)(adapter), [b'a', b'b'])
+        adapter.close()
+        self.assertEqual(closed, [True])
+
+    def test_for_server_keeps_sync_iterators_for_wsgi(self):
+        iterator = iter([b'x'])
+        self.assertIs(streaming.for_server(RequestFactory().get('/'), iterator), iterator)
+        self.assertIsInstance(
+            streaming.for_server(AsyncRequestFactory().get('/'), iterator), streaming.AsyncIteratorAdapter,
+        )
+
+
+class ExportReportsArchiveTests(TransactionTestCase):
+    # Partition workers close their connection when done, so rows must be committed.
+    serialized_rollback = True
+
+    def setUp(self):
+        football, _ = Sport.objects.get_or_create(name='Football')
+        care = {field: 1 for field in DASHBOARD_CARE_FIELDS}
+        self.reports = [
+            ClinicReport.objects.create(
+                first_name='Ada', last_name='Lovelace', email=f'ada{number}@university.edu',
+                sport=football, week=number + 1, **care,
+            )
+            for number in range(5)
+        ]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def archive(self, name, *args):
+        path = os.path.join(self.tmp.name, name)
+        call_command('export_reports_archive', path, '--workers', '1', *args, stdout=StringIO())
+        return path
+
+    def test_csv_partitions_are_merged_in_id_order(self):
+        """The merged CSV has one header and every report, across partitions."""
+        path = self.archive('reports.csv', '--partition-size', '2')
+
+        with open(path, newline='') as exported:
+            header, *rows = list(csv.reader(exported))
+        self.assertEqual(header, RAW_EXPORT_HEADERS)
+        self.assertEqual([int(row[0]) for row in rows], [report.id for report in self.reports])
+        self.assertFalse(os.path.exists(f'{path}.parts'))
+
+    def test_resume_skips_completed_partitions(self):
+        """After a failed run, --resume only exports the partitions that were not finished."""
+        real_export = export_reports_archive.export_partition
+        calls = []
+
+        def fail_on_second(export_format, partition, parts_dir):
+            calls.append(partition['name'])
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return real_export(export_format, partition, parts_dir)
+
+        with patch.object(export_reports_archive, 'export_partition', side_effect=fail_on_second):
+            with self.assertRaises(RuntimeError):
+                self.archive('reports.csv', '--partition-size', '2')
+        calls.clear()
+
+        with patch.object(export_reports_archive, 'export_partition', side_effect=real_export) as export:
+            path = self.archive('reports.csv', '--partition-size', '2', '--resume')
+        self.assertEqual([call.args[1]['name'] for call in export.call_args_list], ['part-00001.csv', 'part-00002.csv'])
+        with open(path, newline='') as exported:
+            self.assertEqual(len(list(csv.reader(exported))), 1 + len(self.reports))
+
+    def test_xlsx_archive_has_one_workbook_per_academic_year(self):
+        """Fall and the following Spring share an academic year workbook."""
+        ClinicReport.objects.filter(id=self.reports[0].id).update(semester='Fall', year=2024)
+        ClinicReport.objects.filter(id__in=[report.id for report in self.reports[1:]]).update(semester='Spring', year=2025)
+
+        path = self.archive('reports.zip')
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.namelist(), ['clinic_reports_2024-25.xlsx'])
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(BytesIO(archive.read('clinic_reports_2024-25.xlsx')), read_only=True)
+            header, *rows = workbook['2024-25'].iter_rows(values_only=True)
+        self.assertEqual(list(header), RAW_EXPORT_HEADERS)
+        self.assertEqual(len(rows), len(self.reports))
+
+
+@override_settings(CHANGE_FEED_SAFETY_LAG_SECONDS=0)
+@override_settings(VIEW_THROTTLE_ENABLED=False)
+class ExportReportChangesViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('export_report_changes')
+        self.staff_user = User.objects.create_user(
+            username='staff-feed', email='staff-feed@university.edu', password='testpass123', is_staff=True,
+        )
+        football, _ = Sport.objects.get_or_create(name='Football')
+        self.report = ClinicReport.objects.create(
+            first_name='Ada', last_name='Lovelace', email='ada@university.edu', sport=football, week=3,
+            **{field: 0 for field in DASHBOARD_CARE_FIELDS},
+        )
+
+    def get_lines(self, **params):
+        response = self.client.get(self.url, params)
+        return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_streams_changes_followed_by_next_watermark(self):
+        """Staff get JSON lines of changed reports; pulling again with the watermark returns nothing new."""
+        self.client.force_login(self.staff_user)
+        response, lines = self.get_lines()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(lines[0]['op'], 'upsert')
+        self.assertEqual(lines[0]['report']['id'], self.report.id)
+        self.assertEqual(lines[0]['report']['sport'], 'Football')
+        self.assertFalse(lines[-1]['has_more'])
+
+        _, lines = self.get_lines(since=lines[-1]['watermark'])
+        self.assertEqual(len(lines), 1)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.staff_user)
+        response = await self.async_client.get(self.url)
+
+        self.assertTrue(response.is_async)
+        lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertIn('watermark', lines[-1])
+
+    def test_rejects_bad_watermark_and_non_staff(self):
+        self.client.force_login(self.staff_user)
+        self.assertEqual(self.client.get(self.url, {'since': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': '0'}).status_code, 400)
+        student = User.objects.create_user(username='student-feed', email='sf@university.edu', password='x')
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
 class LoginUrlSettingsTests(TestCase):
     """Test that LOGIN_URL is configured correctly based on runtime environment."""
     
@@ -540,6 +2104,7 @@ class LoginUrlSettingsTests(TestCase):
         self.assertEqual(get_login_url(), '/accounts/login/')
 
 
+@override_settings(VIEW_THROTTLE_ENABLED=False)
 class FacultyDashboardMetricsTests(TestCase):
     """Tests for faculty_dashboard_view filters and aggregate math."""
 
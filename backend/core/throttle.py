@@ -0,0 +1,161 @@
+"""Rate limits for plain Django views, shared across workers through the cache.
+
+DRF's throttles only apply to DRF views; ``throttle(scope)`` covers the
+report submission, export and dashboard views. Each scope has a per-user
+and a per-IP rate in VIEW_THROTTLE_RATES (e.g. ``'30/minute'``; a missing or
+empty rate means no limit).
+
+Each limit is a sliding window estimated from two fixed-window counters:
+the requests counted in the current window plus the previous window's count
+weighted by how much of it still overlaps the sliding window. That needs
+only ``add``/``incr``/``get`` on the cache, so any backend works; with the
+database or file cache, ``incr`` is not atomic and concurrent requests may
+occasionally be undercounted. The default cache must be one all workers
+share (see CACHES in settings), or each process limits on its own.
+
+The per-IP limit keys on REMOTE_ADDR, or, behind THROTTLE_TRUSTED_PROXY_COUNT
+reverse proxies, on the X-Forwarded-For entry the outermost trusted proxy
+added. Entries left of it come from the client and are ignored, so a caller
+cannot dodge its limit or spend someone else's by forging the header.
+"""
+import functools
+import math
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+_throttled = Counter()
+_throttled_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Turn ``'30/minute'`` (or ``30/m``, ``5/sec``, ``100/hour``, ``1000/day``) into ``(30, 60)``.
+
+    Returns None for an empty rate. Raises ValueError for malformed ones.
+    """
+    if not rate:
+        return None
+    count, _, period = rate.partition('/')
+    if not period or period[0] not in DURATIONS:
+        raise ValueError(f'Invalid throttle rate {rate!r}')
+    return int(count), DURATIONS[period[0]]
+
+
+def throttle_stats():
+    """Return the number of requests throttled per scope and key kind in this process."""
+    with _throttled_lock:
+        return dict(_throttled)
+
+
+def client_ip(request):
+    """Return the client address as seen by the outermost trusted proxy (or REMOTE_ADDR)."""
+    proxies = getattr(settings, 'THROTTLE_TRUSTED_PROXY_COUNT', 0)
+    address = request.META.get('REMOTE_ADDR')
+    if proxies > 0:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        # Each trusted proxy appends the address it received the request from.
+        if len(hops) >= proxies:
+            address = hops[-proxies]
+    # Some hosting environments include the port (e.g. "1.2.3.4:56789").
+    if address and ':' in address and address.count('.') == 3:
+        address = address.split(':', 1)[0]
+    return address
+
+
+def _hit(key, limit, window, now):
+    """Count a request against key; return 0 if allowed, else the seconds to wait."""
+    current = int(now // window)
+    current_key, previous_key = f'{key}:{current}', f'{key}:{current - 1}'
+    # Counters outlive their window by one more, while they still weigh on the next.
+    cache.add(current_key, 0, timeout=2 * window)
+    count = cache.incr(current_key)
+    previous = cache.get(previous_key, 0)
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + count <= limit:
+        return 0
+
+    # Rejected requests do not count, so a client that waits as told gets in.
+    cache.decr(current_key)
+    count -= 1
+    if count < limit:
+        # The previous window's weight fades until one more request fits.
+        wait = window * ((previous * (1 - elapsed) + count + 1 - limit) / previous)
+    else:
+        # This window alone is full: wait for it to end and for its weight to fade.
+        wait = window * (1 - elapsed) + window * (1 - limit / (count + 1))
+    return max(1, math.ceil(wait))
+
+
+def check_throttle(scope, user, ip_address, now=None):
+    """Count one request in scope; return 0 if allowed, else the Retry-After seconds."""
+    if not getattr(settings, 'VIEW_THROTTLE_ENABLED', True):
+        return 0
+    rates = getattr(settings, 'VIEW_THROTTLE_RATES', {}).get(scope, {})
+    now = time.time() if now is None else now
+
+    idents = []
+    if user is not None and user.is_authenticated:
+        idents.append(('user', user.pk))
+    if ip_address:
+        idents.append(('ip', ip_address))
+
+    counted = []
+    for kind, ident in idents:
+        rate = parse_rate(rates.get(kind))
+        if rate is None:
+            continue
+        limit, window = rate
+        key = f'throttle:{scope}:{kind}:{ident}'
+        retry_after = _hit(key, limit, window, now)
+        if retry_after:
+            # A request either limit rejects counts against neither: take back
+            # the hits already made (e.g. the user's when the IP limit rejects).
+            for counted_key in counted:
+                cache.decr(counted_key)
+            with _throttled_lock:
+                _throttled[f'{scope}.{kind}'] += 1
+            return retry_after
+        counted.append(f'{key}:{int(now // window)}')
+    return 0
+
+
+def _throttled_response(retry_after):
+    response = JsonResponse(
+        {'success': False, 'error': f'Too many requests. Try again in {retry_after} seconds.'},
+        status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def throttle(scope):
+    """View decorator: answer 429 with Retry-After once a user or IP exceeds scope's rates.
+
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                retry_after = await sync_to_async(check_throttle)(scope, user, client_ip(request))
+                if retry_after:
+                    return _throttled_response(retry_after)
+                return await view(request, *args, **kwargs)
+            return wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            retry_after = check_throttle(scope, getattr(request, 'user', None), client_ip(request))
+            if retry_after:
+                return _throttled_response(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
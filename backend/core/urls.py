@@ -5,6 +5,10 @@ urlpatterns = [
     path('', views.home_view, name='home'),
     path('dashboard/admin/', views.faculty_dashboard_view, name='faculty_dashboard'),
     path('dashboard/export_excel/', views.export_dashboard_excel, name='export_dashboard_excel'),
+    path('dashboard/export_summary/', views.export_dashboard_summary, name='export_dashboard_summary'),
+    path('dashboard/export_csv/', views.export_dashboard_csv, name='export_dashboard_csv'),
+    path('dashboard/export_changes/', views.export_report_changes, name='export_report_changes'),
     path('dashboard/student/', views.student_dashboard_view, name='student_dashboard'),
     path('dashboard/fetch_student_data/', views.fetch_student_data, name='fetch_student_data'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""Serve ``request.user`` from a short-lived snapshot kept in the session.
+
+Django's AuthenticationMiddleware loads the signed-in user with an
+``auth_user`` query on every request. ``CachedUserAuthenticationMiddleware``
+(core.middleware) uses ``get_user`` below instead: the first request loads
+the user as usual and stores its fields (all but the password hash) in the
+session; for the next USER_SNAPSHOT_SECONDS the user is rebuilt from them
+without a query. With cached_db sessions a page view then needs no database
+round trip before the view runs.
+
+A snapshot is dropped, and the user reloaded, when:
+
+* it is older than USER_SNAPSHOT_SECONDS,
+* the session now belongs to another user, login backend or password, or
+* the user was saved or deleted since (``is_staff``/``is_active`` changes
+  included): a per-user version stamp in the shared cache is bumped by the
+  signal handlers in core.signals. The stamp only reaches other workers
+  through a shared cache, so USER_SNAPSHOT_SECONDS defaults to 0 without one.
+
+Rebuilt users have their password deferred, so ``save()`` writes only the
+snapshot fields and reading ``password`` loads it from the database.
+"""
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SNAPSHOT_SESSION_KEY = '_auth_user_snapshot'
+
+DEFAULT_USER_SNAPSHOT_SECONDS = 60
+
+# Fields never copied into the session.
+EXCLUDED_FIELDS = frozenset({'password'})
+
+
+def _version_key(user_id):
+    return f'core:user_version:{user_id}'
+
+
+def bump_user_version(user_id):
+    """Invalidate every session snapshot of the user."""
+    seconds = getattr(settings, 'USER_SNAPSHOT_SECONDS', DEFAULT_USER_SNAPSHOT_SECONDS)
+    # Snapshots never outlive USER_SNAPSHOT_SECONDS, so neither does the stamp.
+    cache.set(_version_key(user_id), uuid.uuid4().hex, timeout=max(1, seconds))
+
+
+def _current_version(user_id):
+    """Read the user's version stamp, creating one if the cache has none.
+
+    Snapshots always record a stamp, so one whose stamp was bumped and then
+    evicted no longer matches (None) and is dropped rather than revived.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        seconds = getattr(settings, 'USER_SNAPSHOT_SECONDS', DEFAULT_USER_SNAPSHOT_SECONDS)
+        cache.add(key, uuid.uuid4().hex, timeout=max(1, seconds))
+        version = cache.get(key)
+    return version
+
+
+def _snapshot_fields():
+    user_model = auth.get_user_model()
+    return [field for field in user_model._meta.concrete_fields if field.attname not in EXCLUDED_FIELDS]
+
+
+def _take_snapshot(user, session, seconds):
+    fields = {}
+    for field in _snapshot_fields():
+        value = field.value_from_object(user)
+        fields[field.attname] = None if value is None else field.value_to_string(user)
+    return {
+        'fields': fields,
+        'user_id': str(user.pk),
+        'backend': session.get(auth.BACKEND_SESSION_KEY),
+        'hash': session.get(auth.HASH_SESSION_KEY),
+        'version': _current_version(user.pk),
+        'expires': time.time() + seconds,
+    }
+
+
+def _restore(snapshot, session):
+    """Return the user in snapshot, or None if the snapshot no longer applies to session."""
+    backend = session.get(auth.BACKEND_SESSION_KEY)
+    if (
+        snapshot['expires'] <= time.time()
+        or snapshot['user_id'] != str(session.get(auth.SESSION_KEY))
+        or snapshot['backend'] != backend
+        or backend not in settings.AUTHENTICATION_BACKENDS
+        or snapshot['hash'] != session.get(auth.HASH_SESSION_KEY)
+        or snapshot['version'] != cache.get(_version_key(snapshot['user_id']))
+    ):
+        return None
+    fields = _snapshot_fields()
+    values = [
+        None if snapshot['fields'][field.attname] is None else field.to_python(snapshot['fields'][field.attname])
+        for field in fields
+    ]
+    return auth.get_user_model().from_db(DEFAULT_DB_ALIAS, [field.attname for field in fields], values)
+
+
+def get_user(request):
+    """Return the request's user, from the session snapshot when it is still valid."""
+    session = request.session
+    snapshot = session.get(SNAPSHOT_SESSION_KEY)
+    if snapshot is not None:
+        try:
+            user = _restore(snapshot, session)
+        except (KeyError, TypeError, ValueError):
+            # Written by an older version of this module; take a new one.
+            user = None
+        if user is not None:
+            return user
+
+    user = auth.get_user(request)
+    seconds = getattr(settings, 'USER_SNAPSHOT_SECONDS', DEFAULT_USER_SNAPSHOT_SECONDS)
+    if user.is_authenticated and seconds > 0:
+        session[SNAPSHOT_SESSION_KEY] = _take_snapshot(user, session, seconds)
+    elif snapshot is not None:
+        del session[SNAPSHOT_SESSION_KEY]
+    return user
+
+
+def get_request_user(request):
+    """Lazy ``request.user`` loader; the user is looked up once per request."""
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def aget_request_user(request):
+    """Async counterpart of get_request_user, used as ``request.auser()``."""
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
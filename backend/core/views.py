@@ -1,139 +1,138 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Sum, F, Case, When, IntegerField, Value, FloatField
-from django.db.models.functions import Coalesce, ExtractYear
+from django.db.models import Avg, Count, Max, Sum, F, Case, When, IntegerField, Value, FloatField
+from django.db.models.functions import Coalesce
 from django.core.exceptions import PermissionDenied
-from openpyxl import Workbook
+from django.conf import settings
+from asgiref.sync import sync_to_async
 from datetime import datetime
+from functools import partial
+import hashlib
 import json
 import logging
-import re
+from clinic_reports import change_feed
 from clinic_reports.models import ClinicReport, Sport
+from . import chart_payload, copy_export, exports, metrics, streaming, warmup
+from .concurrency import run_parallel
+from .query_budget import (
+    DEFAULT_DASHBOARD_STATEMENT_TIMEOUT_MS, DEFAULT_EXPORT_STATEMENT_TIMEOUT_MS, NARROW_FILTERS_MESSAGE,
+    QueryBudgetExceeded, statement_budget,
+)
+from .replica import replica_reads
+from .singleflight import single_flight
+from .throttle import throttle
 
 logger = logging.getLogger(__name__)
 
-# Security note: Viewing the faculty dashboard requires authentication
-@login_required
-def faculty_dashboard_view(request):
-    """Faculty dashboard with heat map and pie chart.
+DASHBOARD_CARE_FIELDS = [
+    'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam',
+    'taping_bracing', 'rehabilitation_reconditioning', 'modalities',
+    'pharmacology', 'injury_illness_prevention', 'non_sport_patient'
+]
+
+# (label, aggregate alias) for each pie chart slice, in display order.
+PIE_CHART_CATEGORIES = [
+    ('Immediate/Emergency', 'immediate'),
+    ('Musculoskeletal Exam', 'musculoskeletal'),
+    ('Non-Musculoskeletal', 'non_musculoskeletal'),
+    ('Taping/Bracing', 'taping'),
+    ('Rehabilitation', 'rehab'),
+    ('Modalities', 'modalities'),
+    ('Pharmacology', 'pharmacology'),
+    ('Injury Prevention', 'prevention'),
+    ('Non-Sport Patient', 'non_sport'),
+]
+
+TREND_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7BC225', '#E74C3C', '#2ecc71', '#34495e']
+
+
+def _pie_total_aggregates():
+    """Return the Sum aggregates behind the care-category pie charts, keyed by alias."""
+    return {
+        'immediate': Sum('immediate_emergency_care'),
+        'musculoskeletal': Sum('musculoskeletal_exam'),
+        'non_musculoskeletal': Sum('non_musculoskeletal_exam'),
+        'taping': Sum('taping_bracing'),
+        'rehab': Sum('rehabilitation_reconditioning'),
+        'modalities': Sum('modalities'),
+        'pharmacology': Sum('pharmacology'),
+        'prevention': Sum('injury_illness_prevention'),
+        'non_sport': Sum('non_sport_patient'),
+    }
 
-    Filters are now accepted via POST as well as GET so that
-    sensitive values (e.g. student names/emails) do not appear
-    in the URL query string when dropdowns change.
-    """
-    if not request.user.is_staff:
-        raise PermissionDenied("You don't have permission to access this page.")
 
-    # Use POST for filters when available to avoid leaking them into the URL
-    params = request.GET if request.method == 'GET' else request.POST
+def _pie_chart_data(pie_totals):
+    """Turn pie aggregate totals into ``[{'label', 'value'}]`` slices, skipping empty ones."""
+    pie_chart_data = []
+    for label, key in PIE_CHART_CATEGORIES:
+        value = pie_totals[key]
+        if value is not None and value > 0:
+            pie_chart_data.append({'label': label, 'value': value})
+    return pie_chart_data
 
-    # Get filter values
-    selected_sport = params.get('sport')
-    selected_student = params.get('student')
-    selected_semester_raw = params.get('semester')
-    selected_week = params.get('week')
 
-    # Get filters for the 2nd pie chart
-    care_category = params.get('care_category', 'immediate_emergency_care')
-    selected_semester_raw2 = params.get('semester2')
-    selected_week2 = params.get('week2')
-    selected_student2 = params.get('student_filter2')
-    
-    # Parse selected semester for pie chart 1
-    selected_semester_base = selected_semester_raw
-    selected_year = None
-    if selected_semester_raw and " '" in selected_semester_raw:
-        parts = selected_semester_raw.split(" '")
-        if len(parts) == 2 and parts[1].isdigit():
-            selected_semester_base = parts[0]
-            selected_year = 2000 + int(parts[1])
-            
-    # Parse selected semester for pie chart 2
-    selected_semester_base2 = selected_semester_raw2
-    selected_year2 = None
-    if selected_semester_raw2 and " '" in selected_semester_raw2:
-        parts = selected_semester_raw2.split(" '")
+def _parse_semester_filter(semester_raw):
+    """Split a "Fall '25" dropdown value into ("Fall", 2025); other values pass through with no year."""
+    if semester_raw and " '" in semester_raw:
+        parts = semester_raw.split(" '")
         if len(parts) == 2 and parts[1].isdigit():
-            selected_semester_base2 = parts[0]
-            selected_year2 = 2000 + int(parts[1])
-            
-    # Base queryset for pie chart (filtered by both)
+            return parts[0], 2000 + int(parts[1])
+    return semester_raw, None
+
+
+# Each widget below reads only the request parameters it needs and runs its
+# own queries, so faculty_dashboard_view can run them concurrently.
+
+def _care_pie_widget(params):
+    """Pie chart 1: care-category totals filtered by sport, student, semester and week."""
+    selected_semester_base, selected_year = _parse_semester_filter(params.get('semester'))
+
     pie_reports = ClinicReport.objects.all()
     if selected_semester_base:
         pie_reports = pie_reports.filter(semester=selected_semester_base)
     if selected_year:
         pie_reports = pie_reports.filter(created_at__year=selected_year)
-    if selected_sport:
-        pie_reports = pie_reports.filter(sport__name=selected_sport)
-    if selected_student and selected_student != 'All Students':
-        # Extract email from "First Last (email@example.com)" format
-        import re
-        email_match = re.search(r'\(([^)]+)\)$', selected_student)
-        email_to_filter = email_match.group(1) if email_match else selected_student
+    if params.get('sport'):
+        pie_reports = pie_reports.filter(sport__name=params.get('sport'))
+    email_to_filter = exports.extract_email_from_student_value(params.get('student'))
+    if email_to_filter:
         pie_reports = pie_reports.filter(email=email_to_filter)
-    if selected_week:
-        pie_reports = pie_reports.filter(week=selected_week)
-    
-    # Calculate pie chart totals
-    pie_totals = pie_reports.aggregate(
-        immediate=Sum('immediate_emergency_care') or 0,
-        musculoskeletal=Sum('musculoskeletal_exam') or 0,
-        non_musculoskeletal=Sum('non_musculoskeletal_exam') or 0,
-        taping=Sum('taping_bracing') or 0,
-        rehab=Sum('rehabilitation_reconditioning') or 0,
-        modalities=Sum('modalities') or 0,
-        pharmacology=Sum('pharmacology') or 0,
-        prevention=Sum('injury_illness_prevention') or 0,
-        non_sport=Sum('non_sport_patient') or 0,
-    )
-    
-    # Prepare pie chart data
-    pie_chart_data = []
-    for label, key in [
-        ('Immediate/Emergency', 'immediate'),
-        ('Musculoskeletal Exam', 'musculoskeletal'),
-        ('Non-Musculoskeletal', 'non_musculoskeletal'),
-        ('Taping/Bracing', 'taping'),
-        ('Rehabilitation', 'rehab'),
-        ('Modalities', 'modalities'),
-        ('Pharmacology', 'pharmacology'),
-        ('Injury Prevention', 'prevention'),
-        ('Non-Sport Patient', 'non_sport'),
-    ]:
-        value = pie_totals[key]
-        if value is not None and value > 0:
-            pie_chart_data.append({'label': label, 'value': value})
-            
-    # Base queryset for 2nd pie chart
+    if params.get('week'):
+        pie_reports = pie_reports.filter(week=params.get('week'))
+
+    pie_chart_data = _pie_chart_data(pie_reports.aggregate(**_pie_total_aggregates()))
+    return {
+        'pie_chart_data': pie_chart_data,
+        'pie_total_patients': sum(item['value'] for item in pie_chart_data),
+    }
+
+
+def _sport_pie_widget(params):
+    """Pie chart 2: one care category's totals grouped by sport."""
+    care_category = params.get('care_category', 'immediate_emergency_care')
+    selected_semester_base2, selected_year2 = _parse_semester_filter(params.get('semester2'))
+
     pie_reports2 = ClinicReport.objects.all()
     if selected_semester_base2:
         pie_reports2 = pie_reports2.filter(semester=selected_semester_base2)
     if selected_year2:
         pie_reports2 = pie_reports2.filter(created_at__year=selected_year2)
-    if selected_student2 and selected_student2 != 'All Students':
-        import re
-        email_match2 = re.search(r'\(([^)]+)\)$', selected_student2)
-        email_to_filter2 = email_match2.group(1) if email_match2 else selected_student2
+    email_to_filter2 = exports.extract_email_from_student_value(params.get('student_filter2'))
+    if email_to_filter2:
         pie_reports2 = pie_reports2.filter(email=email_to_filter2)
-    if selected_week2:
-        pie_reports2 = pie_reports2.filter(week=selected_week2)
-        
-    # Calculate pie chart 2 totals grouped by sport
+    if params.get('week2'):
+        pie_reports2 = pie_reports2.filter(week=params.get('week2'))
+
     # The selected care_category provides the field name, e.g., 'immediate_emergency_care'
-    valid_care_categories = [
-        'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam', 
-        'taping_bracing', 'rehabilitation_reconditioning', 'modalities', 
-        'pharmacology', 'injury_illness_prevention', 'non_sport_patient'
-    ]
-    if care_category not in valid_care_categories:
+    if care_category not in DASHBOARD_CARE_FIELDS:
         care_category = 'immediate_emergency_care'
-        
+
     sport_totals = pie_reports2.values('sport__name').annotate(
         total=Sum(care_category)
     ).order_by('-total')
-    
+
     pie_chart_data2 = []
     for sport_data in sport_totals:
         value = sport_data['total']
@@ -142,47 +141,45 @@ def faculty_dashboard_view(request):
                 'label': sport_data['sport__name'] or 'Unknown',
                 'value': value
             })
-    
-    # Key Metrics (Summary Statistics)
+    return {'pie_chart_data2': pie_chart_data2, 'care_category': care_category}
+
+
+def _key_metrics_widget(params):
+    """Key metrics (summary statistics) for the selected student and semester."""
     metric_student = params.get('metric_student')
     metric_semester_raw = params.get('metric_semester')
-    
+
     metric_reports = ClinicReport.objects.all()
-    
+
     if metric_semester_raw:
         if " '" in metric_semester_raw:
-            parts = metric_semester_raw.split(" '")
-            if len(parts) == 2 and parts[1].isdigit():
-                sem_base = parts[0]
-                yr_base = 2000 + int(parts[1])
+            sem_base, yr_base = _parse_semester_filter(metric_semester_raw)
+            if yr_base is not None:
                 metric_reports = metric_reports.filter(semester=sem_base, created_at__year=yr_base)
         else:
             metric_reports = metric_reports.filter(semester=metric_semester_raw)
-            
-    if metric_student and metric_student != 'All Students':
-        import re
-        email_match = re.search(r'\(([^)]+)\)$', metric_student)
-        email_to_filter = email_match.group(1) if email_match else metric_student
+
+    email_to_filter = exports.extract_email_from_student_value(metric_student)
+    if email_to_filter:
         metric_reports = metric_reports.filter(email=email_to_filter)
-        
-    all_care_fields = [
-        'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam', 
-        'taping_bracing', 'rehabilitation_reconditioning', 'modalities', 
-        'pharmacology', 'injury_illness_prevention', 'non_sport_patient'
-    ]
-    
+
+    # Totals, distinct students and report count in one query.
+    sums = metric_reports.aggregate(
+        *[Sum(f) for f in DASHBOARD_CARE_FIELDS],
+        active_students=Count('email', distinct=True),
+        total_reports=Count('id'),
+    )
     total_experiences = 0
-    sums = metric_reports.aggregate(*[Sum(f) for f in all_care_fields])
     care_type_totals = {}
-    for f in all_care_fields:
+    for f in DASHBOARD_CARE_FIELDS:
         val = sums[f'{f}__sum'] or 0
         total_experiences += val
         care_type_totals[f] = val
-        
-    active_students_count = metric_reports.values('email').distinct().count()
-    
+
+    active_students_count = sums['active_students']
+
     avg_per_student = round(total_experiences / active_students_count, 1) if active_students_count > 0 else 0
-    
+
     # Most Common Care Type
     most_common_care_type = "N/A"
     most_common_care_val = 0
@@ -201,68 +198,47 @@ def faculty_dashboard_view(request):
         if v > most_common_care_val:
             most_common_care_val = v
             most_common_care_type = care_labels.get(k, k)
-            
+
     # Most Active Sport
-    sport_stats = metric_reports.values('sport__name').annotate(
-        total_care=sum(Sum(f) for f in all_care_fields)
-    ).order_by('-total_care')
-    
-    most_active_sport = sport_stats.first()['sport__name'] if sport_stats and sport_stats.first()['total_care'] else "N/A"
-    
-    total_reports = metric_reports.count()
-    
-    # Get filter options
-    semester_year_pairs = ClinicReport.objects.annotate(
-        year=ExtractYear('created_at')
-    ).values_list('semester', 'year').distinct().exclude(semester__isnull=True)
-    
-    formatted_semesters = []
-    for sem, year in semester_year_pairs:
-        if sem and year:
-            short_year = str(year)[-2:]
-            formatted_semesters.append(f"{sem} '{short_year}")
-            
-    sports = Sport.objects.filter(clinicreport__isnull=False).distinct().values_list('name', flat=True).order_by('name')
-    
-    # Dynamic weeks based on existing reports
-    actual_weeks = ClinicReport.objects.values_list('week', flat=True).distinct().exclude(week__isnull=True).order_by('week')
-    
-    # Get all students for the dropdown
-    students_query = ClinicReport.objects.values('first_name', 'last_name', 'email').distinct().order_by('last_name', 'first_name')
-    students = [{'display': f"{s['first_name']} {s['last_name']} ({s['email']})", 'email': s['email']} for s in students_query]
-    
-    # Trend Chart Data
+    top_sport = metric_reports.values('sport__name').annotate(
+        total_care=sum(Sum(f) for f in DASHBOARD_CARE_FIELDS)
+    ).order_by('-total_care').first()
+
+    most_active_sport = top_sport['sport__name'] if top_sport and top_sport['total_care'] else "N/A"
+
+    return {
+        'metric_total_experiences': total_experiences,
+        'metric_active_students': active_students_count,
+        'metric_avg_per_student': avg_per_student,
+        'metric_most_common_care': most_common_care_type,
+        'metric_most_active_sport': most_active_sport,
+        'metric_total_reports': sums['total_reports'],
+    }
+
+
+def _trend_chart_widget(params):
+    """Trend chart: weekly totals per sport plus an overall total line."""
     selected_trend_sport = params.get('trend_sport')
     selected_trend_care = params.get('trend_care')
-    selected_trend_student = params.get('trend_student')
     selected_trend_semester = params.get('trend_semester')
-    
+
     trend_reports = ClinicReport.objects.all()
     if selected_trend_semester:
         if " '" in selected_trend_semester:
-            parts = selected_trend_semester.split(" '")
-            if len(parts) == 2 and parts[1].isdigit():
-                sem_base = parts[0]
-                yr_base = 2000 + int(parts[1])
+            sem_base, yr_base = _parse_semester_filter(selected_trend_semester)
+            if yr_base is not None:
                 trend_reports = trend_reports.filter(semester=sem_base, created_at__year=yr_base)
         else:
             trend_reports = trend_reports.filter(semester=selected_trend_semester)
-            
-    if selected_trend_student and selected_trend_student != 'All Students':
-        import re
-        email_match = re.search(r'\(([^)]+)\)$', selected_trend_student)
-        email_to_filter = email_match.group(1) if email_match else selected_trend_student
+
+    email_to_filter = exports.extract_email_from_student_value(params.get('trend_student'))
+    if email_to_filter:
         trend_reports = trend_reports.filter(email=email_to_filter)
-        
-    all_care_fields = [
-        'immediate_emergency_care', 'musculoskeletal_exam', 'non_musculoskeletal_exam', 
-        'taping_bracing', 'rehabilitation_reconditioning', 'modalities', 
-        'pharmacology', 'injury_illness_prevention', 'non_sport_patient'
-    ]
+
     if selected_trend_care and selected_trend_care != 'all':
         care_fields = [selected_trend_care]
     else:
-        care_fields = all_care_fields
+        care_fields = DASHBOARD_CARE_FIELDS
 
     if selected_trend_sport and selected_trend_sport != 'all':
         trend_sports = [selected_trend_sport]
@@ -270,49 +246,29 @@ def faculty_dashboard_view(request):
         trend_sports = list(Sport.objects.filter(clinicreport__isnull=False).distinct().values_list('name', flat=True))
 
     weeks = list(range(1, 17))
+
+    # One grouped query for every (sport, week) cell instead of one per cell.
+    weekly_totals = {
+        (row['sport__name'], row['week']): row['total']
+        for row in trend_reports.filter(sport__name__in=trend_sports, week__in=weeks).values(
+            'sport__name', 'week'
+        ).annotate(total=sum(Coalesce(Sum(f), 0) for f in care_fields))
+    }
+
     trend_datasets = []
-    
-    colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7BC225', '#E74C3C', '#2ecc71', '#34495e']
-    
     for i, sport_name in enumerate(trend_sports):
-        sport_reports = trend_reports.filter(sport__name=sport_name)
-        data = []
-        for w in weeks:
-            week_reports = sport_reports.filter(week=w)
-            if week_reports.exists():
-                week_sum = 0
-                sums = week_reports.aggregate(*[Sum(f) for f in care_fields])
-                for f in care_fields:
-                    val = sums[f'{f}__sum']
-                    if val:
-                        week_sum += val
-                data.append(week_sum)
-            else:
-                data.append(0)
-                
+        data = [weekly_totals.get((sport_name, w), 0) for w in weeks]
         if any(data):
             trend_datasets.append({
                 'label': sport_name,
                 'data': data,
-                'borderColor': colors[i % len(colors)],
+                'borderColor': TREND_COLORS[i % len(TREND_COLORS)],
                 'tension': 0.3,
                 'fill': False
             })
 
-    # Calculate Total Interactions across all matching trend_reports
-    total_data = []
-    for w in weeks:
-        week_reports = trend_reports.filter(sport__name__in=trend_sports, week=w)
-        if week_reports.exists():
-            week_sum = 0
-            sums = week_reports.aggregate(*[Sum(f) for f in care_fields])
-            for f in care_fields:
-                val = sums[f'{f}__sum']
-                if val:
-                    week_sum += val
-            total_data.append(week_sum)
-        else:
-            total_data.append(0)
+    # Total Interactions across all matching trend_reports
+    total_data = [sum(weekly_totals.get((sport_name, w), 0) for sport_name in set(trend_sports)) for w in weeks]
 
     # Only add total line if there are multiple sports or we explicitly want to show it.
     # Actually, always showing it is fine, but if it covers exactly the single sport selected,
@@ -328,57 +284,191 @@ def faculty_dashboard_view(request):
             'fill': False
         })
 
-    context = {
-        # Filters
-        'selected_sport': selected_sport,
-        'selected_student': selected_student,
-        'selected_semester': selected_semester_raw,
-        'selected_week': selected_week,
+    return {'trend_datasets': trend_datasets}
+
+
+def _filter_options_widget(params):
+    """Dropdown options: semesters, sports, weeks and students that have reports."""
+    semester_year_pairs = ClinicReport.objects.values_list(
+        'semester', 'year'
+    ).distinct().exclude(semester__isnull=True)
+
+    formatted_semesters = []
+    for sem, year in semester_year_pairs:
+        if sem and year:
+            short_year = str(year)[-2:]
+            formatted_semesters.append(f"{sem} '{short_year}")
+
+    sports = Sport.objects.filter(clinicreport__isnull=False).distinct().values_list('name', flat=True).order_by('name')
+
+    # Dynamic weeks based on existing reports
+    actual_weeks = ClinicReport.objects.values_list('week', flat=True).distinct().exclude(week__isnull=True).order_by('week')
+
+    # Get all students for the dropdown
+    students_query = ClinicReport.objects.values('first_name', 'last_name', 'email').distinct().order_by('last_name', 'first_name')
+    students = [{'display': f"{s['first_name']} {s['last_name']} ({s['email']})", 'email': s['email']} for s in students_query]
+
+    return {
         'semesters': sorted(set(formatted_semesters), reverse=True),
         'sports': sorted(set(sports)),
         'students': students,
-        
-        # Pie chart
-        'pie_chart_data': pie_chart_data,
-        'pie_total_patients': sum(item['value'] for item in pie_chart_data),
-        
-        # Pie chart 2
-        'pie_chart_data2': pie_chart_data2,
-
         'weeks_list': list(actual_weeks),
-        
-        # Key Metrics
-        'metric_total_experiences': total_experiences,
-        'metric_active_students': active_students_count,
-        'metric_avg_per_student': avg_per_student,
-        'metric_most_common_care': most_common_care_type,
-        'metric_most_active_sport': most_active_sport,
-        'metric_total_reports': total_reports,
-        'selected_metric_student': metric_student,
-        'selected_metric_semester': metric_semester_raw,
-        
-        # Trend chart
-        'trend_datasets': trend_datasets,
-        'selected_trend_sport': selected_trend_sport,
-        'selected_trend_care': selected_trend_care,
-        'selected_trend_student': selected_trend_student,
-        'selected_trend_semester': selected_trend_semester,
+    }
+
+
+# Request parameters read by the widgets; together they identify a dashboard computation.
+DASHBOARD_FILTER_PARAMS = [
+    'sport', 'student', 'semester', 'week',
+    'care_category', 'semester2', 'week2', 'student_filter2',
+    'metric_student', 'metric_semester',
+    'trend_sport', 'trend_care', 'trend_student', 'trend_semester',
+]
+
+
+def _dashboard_flight_key(params):
+    """Return a key shared by requests for the same dashboard filters.
+
+    Parameter order, the CSRF token and empty values (which every widget
+    treats like a missing filter) do not change the key.
+    """
+    filters = sorted((name, params.get(name)) for name in DASHBOARD_FILTER_PARAMS if params.get(name))
+    return 'faculty_dashboard:' + hashlib.sha256(json.dumps(filters).encode()).hexdigest()
+
+
+DASHBOARD_WIDGETS = {
+    'care_pie': _care_pie_widget,
+    'sport_pie': _sport_pie_widget,
+    'key_metrics': _key_metrics_widget,
+    'trend_chart': _trend_chart_widget,
+    'filter_options': _filter_options_widget,
+}
+
+# What each widget shows when its queries hit the statement timeout: its title
+# for the "took too long" notice and an empty context the template can render.
+DASHBOARD_WIDGET_FALLBACKS = {
+    'care_pie': ('care category chart', {'pie_chart_data': [], 'pie_total_patients': 0}),
+    'sport_pie': ('sport chart', {'pie_chart_data2': []}),
+    'key_metrics': ('key metrics', {
+        'metric_total_experiences': 0,
+        'metric_active_students': 0,
+        'metric_avg_per_student': 0,
+        'metric_most_common_care': 'N/A',
+        'metric_most_active_sport': 'N/A',
+        'metric_total_reports': 0,
+    }),
+    'trend_chart': ('trend chart', {'trend_datasets': []}),
+    'filter_options': ('filter options', {'semesters': [], 'sports': [], 'students': [], 'weeks_list': []}),
+}
+
+
+def _dashboard_timeout_ms():
+    return getattr(settings, 'DASHBOARD_STATEMENT_TIMEOUT_MS', DEFAULT_DASHBOARD_STATEMENT_TIMEOUT_MS)
+
+
+def _export_timeout_ms():
+    return getattr(settings, 'EXPORT_STATEMENT_TIMEOUT_MS', DEFAULT_EXPORT_STATEMENT_TIMEOUT_MS)
+
+
+def _within_dashboard_budget(name, func):
+    """Return func() run under the dashboard statement timeout, or None if it timed out."""
+    try:
+        with statement_budget(f'dashboard.{name}', _dashboard_timeout_ms()):
+            return func()
+    except QueryBudgetExceeded:
+        logger.warning(f"Dashboard {name} hit the statement timeout")
+        return None
+
+
+def _export_timed_out_response():
+    """Return the response for an export whose queries hit the statement timeout."""
+    return JsonResponse(
+        {'success': False, 'timed_out': True, 'error': NARROW_FILTERS_MESSAGE},
+        status=503,
+    )
+
+
+# Security note: Viewing the faculty dashboard requires authentication
+@login_required
+@throttle('dashboard')
+@replica_reads
+def faculty_dashboard_view(request):
+    """Faculty dashboard with heat map and pie chart.
+
+    Filters are now accepted via POST as well as GET so that
+    sensitive values (e.g. student names/emails) do not appear
+    in the URL query string when dropdowns change. The widgets' queries
+    are independent and run concurrently (see core.concurrency), and
+    identical concurrent requests share one run (see core.singleflight).
+    A widget whose queries exceed DASHBOARD_STATEMENT_TIMEOUT_MS is shown
+    empty with a notice instead of failing the page.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied("You don't have permission to access this page.")
+
+    # Use POST for filters when available to avoid leaking them into the URL
+    params = request.GET if request.method == 'GET' else request.POST
+
+    def compute_widgets():
+        return run_parallel({
+            name: partial(_within_dashboard_budget, name, partial(widget, params))
+            for name, widget in DASHBOARD_WIDGETS.items()
+        })
+
+    # Staff opening the same view at the same moment share one computation.
+    if getattr(settings, 'DASHBOARD_SINGLE_FLIGHT', True):
+        widgets = single_flight(_dashboard_flight_key(params), compute_widgets)
+    else:
+        widgets = compute_widgets()
+
+    context = {
+        # Filters
+        'selected_sport': params.get('sport'),
+        'selected_student': params.get('student'),
+        'selected_semester': params.get('semester'),
+        'selected_week': params.get('week'),
+
+        # Key metrics filters
+        'selected_metric_student': params.get('metric_student'),
+        'selected_metric_semester': params.get('metric_semester'),
+
+        # Trend chart filters
+        'selected_trend_sport': params.get('trend_sport'),
+        'selected_trend_care': params.get('trend_care'),
+        'selected_trend_student': params.get('trend_student'),
+        'selected_trend_semester': params.get('trend_semester'),
 
         # Additional selected values used to preserve filters across forms
-        'care_category': care_category,
-        'selected_semester2': selected_semester_raw2,
-        'selected_week2': selected_week2,
-        'selected_student2': selected_student2,
+        'selected_semester2': params.get('semester2'),
+        'selected_week2': params.get('week2'),
+        'selected_student2': params.get('student_filter2'),
     }
-    
+    timed_out = []
+    for name, widget_context in widgets.items():
+        if widget_context is None:
+            title, widget_context = DASHBOARD_WIDGET_FALLBACKS[name]
+            timed_out.append(title)
+        context.update(widget_context)
+    context.setdefault('care_category', params.get('care_category') or 'immediate_emergency_care')
+    context['timed_out_widgets'] = timed_out
+    context['narrow_filters_message'] = NARROW_FILTERS_MESSAGE
+
+    # Charts are embedded in the columnar form and expanded by the page script.
+    context.update({
+        'pie_chart_columns': chart_payload.pie_columns(context['pie_chart_data']),
+        'pie_chart_columns2': chart_payload.pie_columns(context['pie_chart_data2']),
+        'trend_chart_columns': chart_payload.trend_columns(context['trend_datasets']),
+    })
+
     return render(request, 'core/faculty_dashboard.html', context)
+
+
 @login_required
 def student_dashboard_view(request):
     """Render the student dashboard."""
     # Build semester options in the same way as the faculty dashboard
-    semester_year_pairs = ClinicReport.objects.annotate(
-        year=ExtractYear('created_at')
-    ).values_list('semester', 'year').distinct().exclude(semester__isnull=True)
+    semester_year_pairs = ClinicReport.objects.values_list(
+        'semester', 'year'
+    ).distinct().exclude(semester__isnull=True)
 
     formatted_semesters = []
     for sem, year in semester_year_pairs:
@@ -397,57 +487,9 @@ def home_view(request):
     return render(request, 'core/home.html')
 
 
-def _apply_dashboard_filters(clinic_reports, filters):
-    """Apply common dashboard filters to a ClinicReport queryset."""
-    if filters.get('sport'):
-        clinic_reports = clinic_reports.filter(sport__name=filters.get('sport'))
-
-    semester_val = filters.get('semester')
-    if semester_val:
-        if " '" in semester_val:
-            parts = semester_val.split(" '")
-            if len(parts) == 2 and parts[1].isdigit():
-                semester_base = parts[0]
-                year_val = 2000 + int(parts[1])
-                clinic_reports = clinic_reports.filter(semester=semester_base, created_at__year=year_val)
-            else:
-                clinic_reports = clinic_reports.filter(semester=semester_val)
-        else:
-            clinic_reports = clinic_reports.filter(semester=semester_val)
-
-    if filters.get('week'):
-        clinic_reports = clinic_reports.filter(week=filters.get('week'))
-
-    if filters.get('year') is not None:
-        try:
-            year_value = int(filters.get('year'))
-        except (TypeError, ValueError):
-            raise ValueError('Invalid year. Expected numeric year (e.g., 2026).')
-        clinic_reports = clinic_reports.filter(created_at__year=year_value)
-
-    return clinic_reports
-
-
-def _extract_email_from_student_value(student_value):
-    """Parse a student dropdown value and return the underlying email, if any."""
-    if not student_value or student_value == 'All Students':
-        return None
-    email_match = re.search(r'\(([^)]+)\)$', student_value)
-    return email_match.group(1) if email_match else student_value
-
-
-def _first_non_empty(values):
-    """Return the first value in the iterable that is not None or an empty string."""
-    for value in values:
-        if value not in (None, ''):
-            return value
-    return None
-
-
-def _build_dashboard_payload(clinic_reports):
-    """Build shared dashboard response payload for pie charts and summary metrics."""
-    # Calculate average patient load per report (submission/week)
-    average_patients_per_week = clinic_reports.annotate(
+def _average_patients_per_week(clinic_reports):
+    """Return the average patient load per report (submission/week)."""
+    return clinic_reports.annotate(
         weekly_total_patients=Coalesce(F('immediate_emergency_care'), 0) +
         Coalesce(F('musculoskeletal_exam'), 0) +
         Coalesce(F('non_musculoskeletal_exam'), 0) +
@@ -465,154 +507,97 @@ def _build_dashboard_payload(clinic_reports):
         )
     )['average']
 
-    # Calculate pie chart totals
-    pie_totals = clinic_reports.aggregate(
-        immediate=Sum('immediate_emergency_care') or 0,
-        musculoskeletal=Sum('musculoskeletal_exam') or 0,
-        non_musculoskeletal=Sum('non_musculoskeletal_exam') or 0,
-        taping=Sum('taping_bracing') or 0,
-        rehab=Sum('rehabilitation_reconditioning') or 0,
-        modalities=Sum('modalities') or 0,
-        pharmacology=Sum('pharmacology') or 0,
-        prevention=Sum('injury_illness_prevention') or 0,
-        non_sport=Sum('non_sport_patient') or 0,
-    )
 
-    pie_chart_data = []
-    for label, key in [
-        ('Immediate/Emergency', 'immediate'),
-        ('Musculoskeletal Exam', 'musculoskeletal'),
-        ('Non-Musculoskeletal', 'non_musculoskeletal'),
-        ('Taping/Bracing', 'taping'),
-        ('Rehabilitation', 'rehab'),
-        ('Modalities', 'modalities'),
-        ('Pharmacology', 'pharmacology'),
-        ('Injury Prevention', 'prevention'),
-        ('Non-Sport Patient', 'non_sport'),
-    ]:
-        value = pie_totals[key]
-        if value is not None and value > 0:
-            pie_chart_data.append({'label': label, 'value': value})
+async def _abuild_dashboard_payload(clinic_reports, columnar=False):
+    """Build shared dashboard response payload for pie charts and summary metrics.
 
-    return {
+    The two aggregates are independent, so they run side by side on the
+    query pool; the event loop is not blocked while they run. With
+    ``columnar`` the pie chart is sent as ``pie_chart_columns`` (parallel
+    label/value arrays) instead of ``pie_chart_data``. Aggregates that hit
+    the statement timeout are left empty and listed under ``timed_out``,
+    with ``partial`` set and a message asking to narrow the filters.
+    """
+    results = await sync_to_async(run_parallel)({
+        'average': partial(_within_dashboard_budget, 'average', partial(_average_patients_per_week, clinic_reports)),
+        'pie_totals': partial(
+            _within_dashboard_budget, 'pie_totals', partial(clinic_reports.aggregate, **_pie_total_aggregates())
+        ),
+    })
+    timed_out = sorted(name for name, result in results.items() if result is None)
+
+    pie_chart_data = _pie_chart_data(results['pie_totals']) if results['pie_totals'] is not None else []
+    payload = {
         'success': True,
-        'pie_chart_data': pie_chart_data,
         'total_patients': sum(item['value'] for item in pie_chart_data),
-        'average_patients_per_week': average_patients_per_week,
+        'average_patients_per_week': results['average'] or 0,
     }
+    if timed_out:
+        payload.update(partial=True, timed_out=timed_out, message=NARROW_FILTERS_MESSAGE)
+    if columnar:
+        payload['pie_chart_columns'] = chart_payload.pie_columns(pie_chart_data)
+    else:
+        payload['pie_chart_data'] = pie_chart_data
+    return payload
 
 
 @require_http_methods(["POST"])
 @login_required
+@throttle('export')
+@replica_reads
 def export_dashboard_excel(request):
     """Export filtered raw dashboard ClinicReport data as an Excel file."""
     if not request.user.is_staff:
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
 
     try:
-        params = request.POST
-
-        selected_sport = _first_non_empty([
-            params.get('sport'),
-            params.get('trend_sport') if params.get('trend_sport') != 'all' else None,
-        ])
-        selected_semester = _first_non_empty([
-            params.get('semester'),
-            params.get('semester2'),
-            params.get('metric_semester'),
-            params.get('trend_semester'),
-        ])
-        selected_week = _first_non_empty([
-            params.get('week'),
-            params.get('week2'),
-        ])
-        selected_year = params.get('year')
-        selected_student = _first_non_empty([
-            params.get('student'),
-            params.get('student_filter2'),
-            params.get('metric_student'),
-            params.get('trend_student'),
-        ])
-
-        filters = {
-            'sport': selected_sport,
-            'semester': selected_semester,
-            'week': selected_week,
-            'year': selected_year,
-        }
-
-        clinic_reports = ClinicReport.objects.select_related('sport', 'healthcare_provider').all()
-        clinic_reports = _apply_dashboard_filters(clinic_reports, filters)
-
-        email_to_filter = _extract_email_from_student_value(selected_student)
-        if email_to_filter:
-            clinic_reports = clinic_reports.filter(email=email_to_filter)
-
-        clinic_reports = clinic_reports.order_by('id')
+        clinic_reports = exports.export_reports_queryset(request.POST).select_related('sport', 'healthcare_provider')
+
+        # openpyxl is only needed for exports, so it is not imported at worker boot.
+        from openpyxl import Workbook
 
         workbook = Workbook()
         sheet = workbook.active
         sheet.title = 'clinic_reports_raw'
 
-        headers = [
-            'id',
-            'created_at_utc',
-            'first_name',
-            'last_name',
-            'email',
-            'sport',
-            'semester',
-            'week',
-            'immediate_emergency_care',
-            'musculoskeletal_exam',
-            'non_musculoskeletal_exam',
-            'taping_bracing',
-            'rehabilitation_reconditioning',
-            'modalities',
-            'pharmacology',
-            'injury_illness_prevention',
-            'non_sport_patient',
-            'interacted_hcps',
-            'healthcare_provider',
-            'total_experiences',
-        ]
-        sheet.append(headers)
-
-        for report in clinic_reports.iterator():
-            total_experiences = (
-                (report.immediate_emergency_care or 0)
-                + (report.musculoskeletal_exam or 0)
-                + (report.non_musculoskeletal_exam or 0)
-                + (report.taping_bracing or 0)
-                + (report.rehabilitation_reconditioning or 0)
-                + (report.modalities or 0)
-                + (report.pharmacology or 0)
-                + (report.injury_illness_prevention or 0)
-                + (report.non_sport_patient or 0)
-            )
-
-            sheet.append([
-                report.id,
-                report.created_at.isoformat() if report.created_at else '',
-                report.first_name,
-                report.last_name,
-                report.email,
-                report.sport.name if report.sport else '',
-                report.semester,
-                report.week,
-                report.immediate_emergency_care,
-                report.musculoskeletal_exam,
-                report.non_musculoskeletal_exam,
-                report.taping_bracing,
-                report.rehabilitation_reconditioning,
-                report.modalities,
-                report.pharmacology,
-                report.injury_illness_prevention,
-                report.non_sport_patient,
-                report.interacted_hcps,
-                report.healthcare_provider.name if report.healthcare_provider else '',
-                total_experiences,
-            ])
+        sheet.append(exports.RAW_EXPORT_HEADERS)
+
+        with statement_budget('export.excel', _export_timeout_ms()):
+            for report in clinic_reports.iterator():
+                total_experiences = (
+                    (report.immediate_emergency_care or 0)
+                    + (report.musculoskeletal_exam or 0)
+                    + (report.non_musculoskeletal_exam or 0)
+                    + (report.taping_bracing or 0)
+                    + (report.rehabilitation_reconditioning or 0)
+                    + (report.modalities or 0)
+                    + (report.pharmacology or 0)
+                    + (report.injury_illness_prevention or 0)
+                    + (report.non_sport_patient or 0)
+                )
+
+                sheet.append([
+                    report.id,
+                    report.created_at.isoformat() if report.created_at else '',
+                    report.first_name,
+                    report.last_name,
+                    report.email,
+                    report.sport.name if report.sport else '',
+                    report.semester,
+                    report.week,
+                    report.immediate_emergency_care,
+                    report.musculoskeletal_exam,
+                    report.non_musculoskeletal_exam,
+                    report.taping_bracing,
+                    report.rehabilitation_reconditioning,
+                    report.modalities,
+                    report.pharmacology,
+                    report.injury_illness_prevention,
+                    report.non_sport_patient,
+                    report.interacted_hcps,
+                    report.healthcare_provider.name if report.healthcare_provider else '',
+                    total_experiences,
+                ])
 
         response = HttpResponse(
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -621,6 +606,9 @@ def export_dashboard_excel(request):
         response['Content-Disposition'] = f'attachment; filename="dashboard_raw_{timestamp}.xlsx"'
         workbook.save(response)
         return response
+    except QueryBudgetExceeded:
+        logger.warning("Dashboard export hit the statement timeout")
+        return _export_timed_out_response()
     except ValueError as e:
         logger.error(f"Dashboard export validation error: {e}")
         return JsonResponse({'success': False, 'error': 'Invalid filter parameters'}, status=400)
@@ -628,9 +616,166 @@ def export_dashboard_excel(request):
         logger.error(f"Dashboard export error: {e}")
         return JsonResponse({'success': False, 'error': 'Failed to export dashboard data'}, status=500)
 
+
+# Summary workbook sheets: (title, group-by columns as (header, lookup), extra
+# per-group aggregates as (header, expression)). Each sheet is one GROUP BY query.
+SUMMARY_SHEETS = [
+    ('by_sport', [('sport', 'sport__name')], [('students', Count('email', distinct=True))]),
+    ('by_student', [('email', 'email')], [('first_name', Max('first_name')), ('last_name', Max('last_name'))]),
+    (
+        'by_week',
+        [('year', 'year'), ('semester', 'semester'), ('week', 'week')],
+        [('students', Count('email', distinct=True))],
+    ),
+]
+
+
+def _summary_rows(clinic_reports, group_by, extra):
+    """Yield the header and one row per group: group columns, extras, report count and care totals."""
+    lookups = [lookup for _, lookup in group_by]
+    aggregates = {f'extra_{index}': expression for index, (_, expression) in enumerate(extra)}
+    aggregates['reports'] = Count('id')
+    # Aliased so the total's F() expressions still refer to the columns, not the sums.
+    aggregates.update({f'{field}_sum': Sum(field) for field in DASHBOARD_CARE_FIELDS})
+    aggregates['total_experiences'] = Sum(exports.total_experiences())
+
+    yield [header for header, _ in group_by] + [header for header, _ in extra] + [
+        'reports', *DASHBOARD_CARE_FIELDS, 'total_experiences',
+    ]
+    rows = clinic_reports.order_by().values(*lookups).annotate(**aggregates).order_by(*lookups)
+    for row in rows:
+        yield [row[lookup] for lookup in lookups] + [row[name] for name in aggregates]
+
+
+def _provider_summary_rows(clinic_reports):
+    """Yield the header and one row per healthcare provider students worked with."""
+    yield ['healthcare_provider', 'interactions', 'students']
+    rows = (
+        clinic_reports.filter(interacted_hcps=True, healthcare_provider__isnull=False)
+        .order_by()
+        .values('healthcare_provider__name')
+        .annotate(interactions=Count('id'), students=Count('email', distinct=True))
+        .order_by('healthcare_provider__name')
+    )
+    for row in rows:
+        yield [row['healthcare_provider__name'], row['interactions'], row['students']]
+
+
+@require_http_methods(["POST"])
+@login_required
+@throttle('export')
+@replica_reads
+def export_dashboard_summary(request):
+    """Export per-sport, per-student, per-week and per-provider totals as an Excel workbook.
+
+    Takes the same form fields as export_dashboard_excel. Every sheet is one
+    GROUP BY query, so the download stays small; the raw rows are only added
+    when ``include_raw`` is set. The workbook is written in openpyxl's
+    write-only mode, so rows are not kept in memory.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        clinic_reports = exports.export_reports_queryset(request.POST)
+
+        # openpyxl is only needed for exports, so it is not imported at worker boot.
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheets = [
+            (title, _summary_rows(clinic_reports, group_by, extra)) for title, group_by, extra in SUMMARY_SHEETS
+        ]
+        sheets.append(('by_provider', _provider_summary_rows(clinic_reports)))
+        if request.POST.get('include_raw'):
+            sheets.append(('clinic_reports_raw', exports.raw_sheet_rows(clinic_reports)))
+        with statement_budget('export.summary', _export_timeout_ms()):
+            for title, rows in sheets:
+                sheet = workbook.create_sheet(title)
+                for row in rows:
+                    sheet.append(row)
+
+        response = HttpResponse(
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        response['Content-Disposition'] = f'attachment; filename="dashboard_summary_{timestamp}.xlsx"'
+        workbook.save(response)
+        return response
+    except QueryBudgetExceeded:
+        logger.warning("Dashboard summary export hit the statement timeout")
+        return _export_timed_out_response()
+    except ValueError as e:
+        logger.error(f"Dashboard summary export validation error: {e}")
+        return JsonResponse({'success': False, 'error': 'Invalid filter parameters'}, status=400)
+    except Exception as e:
+        logger.error(f"Dashboard summary export error: {e}")
+        return JsonResponse({'success': False, 'error': 'Failed to export dashboard summary'}, status=500)
+
+
+@require_http_methods(["POST"])
+@login_required
+@throttle('export')
+@replica_reads
+def export_dashboard_csv(request):
+    """Stream filtered raw ClinicReport data as CSV, formatted by Postgres COPY.
+
+    Takes the same form fields as export_dashboard_excel. Rows never become
+    Python objects, so full-table dumps are limited by I/O rather than the worker.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        clinic_reports = exports.raw_export_values(exports.export_reports_queryset(request.POST))
+    except ValueError as e:
+        logger.error(f"Dashboard CSV export validation error: {e}")
+        return JsonResponse({'success': False, 'error': 'Invalid filter parameters'}, status=400)
+
+    response = StreamingHttpResponse(
+        # COPY runs on its own thread, so it is given the routed alias explicitly.
+        streaming.for_server(
+            request,
+            copy_export.stream_copy(clinic_reports, header=exports.RAW_EXPORT_HEADERS, using=clinic_reports.db),
+        ),
+        content_type='text/csv',
+    )
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="dashboard_raw_{timestamp}.csv"'
+    return response
+
+@require_http_methods(["GET"])
+@login_required
+@throttle('export')
+def export_report_changes(request):
+    """Stream the reports inserted, edited or deleted since a watermark, as JSON lines.
+
+    ``?since=`` takes the watermark from the previous pull (omit it for a
+    full initial load) and ``?limit=`` caps the rows of each kind. The last
+    line carries the next watermark; see clinic_reports.change_feed. Reads
+    stay on the primary: replica lag must never exceed the feed's safety lag.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        watermark = change_feed.Watermark.decode(request.GET.get('since', ''))
+        limit = int(request.GET.get('limit', change_feed.DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid since or limit parameter'}, status=400)
+    if limit < 1:
+        return JsonResponse({'success': False, 'error': 'Invalid since or limit parameter'}, status=400)
+    limit = min(limit, change_feed.DEFAULT_LIMIT)
+
+    return StreamingHttpResponse(
+        streaming.for_server(request, change_feed.json_lines(change_feed.changes_since(watermark, limit))),
+        content_type='application/x-ndjson',
+    )
+
+
 @require_http_methods(["POST"])
 @login_required
-def fetch_data(request):
+async def fetch_data(request):
     """[UNUSED] Legacy API endpoint for faculty dashboard data.
 
     This endpoint is no longer exposed via URL routing and is kept only
@@ -644,14 +789,15 @@ def fetch_data(request):
     - Returns aggregated pie-chart and summary metrics.
     - Can only be used by staff users (AT faculty and administrators).
     """
-    if not request.user.is_staff:
+    user = await request.auser()
+    if not user.is_staff:
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
     
     try:
         filters = json.loads(request.body)
         clinic_reports = ClinicReport.objects.all()
-        clinic_reports = _apply_dashboard_filters(clinic_reports, filters)
-        return JsonResponse(_build_dashboard_payload(clinic_reports))
+        clinic_reports = exports.apply_dashboard_filters(clinic_reports, filters)
+        return JsonResponse(await _abuild_dashboard_payload(clinic_reports))
     
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
@@ -665,16 +811,24 @@ def fetch_data(request):
 
 @require_http_methods(["POST"])
 @login_required
-def fetch_student_data(request):
-    """API endpoint for student dashboard data (self-only)."""
-    if request.user.is_staff:
+@throttle('dashboard')
+@replica_reads
+async def fetch_student_data(request):
+    """API endpoint for student dashboard data (self-only).
+
+    Async so concurrent dashboard polls can share one ASGI worker. Clients
+    that send ``"format": "columnar"`` get the compact pie chart payload.
+    """
+    user = await request.auser()
+    if user.is_staff:
         return JsonResponse({'success': False, 'error': 'Use the faculty endpoint for staff requests.'}, status=403)
 
     try:
         filters = json.loads(request.body)
-        clinic_reports = ClinicReport.objects.filter(email=request.user.email)
-        clinic_reports = _apply_dashboard_filters(clinic_reports, filters)
-        return JsonResponse(_build_dashboard_payload(clinic_reports))
+        clinic_reports = ClinicReport.objects.filter(email=user.email)
+        clinic_reports = exports.apply_dashboard_filters(clinic_reports, filters)
+        columnar = filters.get('format') == 'columnar'
+        return chart_payload.ChartJsonResponse(await _abuild_dashboard_payload(clinic_reports, columnar))
 
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
@@ -684,3 +838,28 @@ def fetch_student_data(request):
     except Exception as e:
         logger.error(f"Student data fetch error: {e}")
         return JsonResponse({'success': False, 'error': 'Failed to fetch student data'}, status=500)
+
+
+@require_http_methods(["GET"])
+@login_required
+def metrics_view(request):
+    """Return process-level operational metrics (DB connections, etc.) to staff users."""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    return JsonResponse({'success': True, 'metrics': metrics.snapshot()})
+
+
+def health_ready_view(request):
+    """Readiness probe: 200 once this worker has finished warming up, 503 otherwise.
+
+    Workers not started through gunicorn.conf.py (runserver, plain uvicorn)
+    warm up on their first probe, and a failed warmup (e.g. the database was
+    unreachable at boot) is retried by the next probe.
+    """
+    if not warmup.is_ready():
+        warmup.run_warmup()
+    status = warmup.warmup_status()
+    return JsonResponse(
+        {'status': 'ready' if status['ready'] else 'warming', **status},
+        status=200 if status['ready'] else 503,
+    )
@@ -0,0 +1,139 @@
+"""Worker warmup: do the one-off work of a cold worker before it takes traffic.
+
+``run_warmup`` is called from gunicorn's ``post_worker_init`` hook (see
+gunicorn.conf.py) after the app is loaded in the forked worker. It compiles
+the project's templates into the cached template loader, populates the URL
+resolver, fetches the Azure database token if one is used, opens the
+database connection and loads the clinic report reference data.
+``/health/ready/`` reports the result so the load balancer only routes to warm
+workers.
+
+Keeping the connection warm needs persistent connections (DB_CONN_MAX_AGE > 0).
+With DB_CONN_MAX_AGE=0 Django closes the connection at the start of the first
+request, so the connection step is skipped and only the token is prefetched.
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {
+    'finished': False,
+    'duration_ms': None,
+    'steps': {},
+    'errors': {},
+}
+
+
+def project_template_names():
+    """Return the template names shipped by this project's own apps (not third-party ones)."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    names = []
+    for app_config in apps.get_app_configs():
+        app_path = Path(app_config.path).resolve()
+        if base_dir not in app_path.parents:
+            continue
+        template_dir = app_path / 'templates'
+        names.extend(sorted(
+            name for name in (path.relative_to(template_dir).as_posix() for path in template_dir.rglob('*.html'))
+            # Staff-only admin overrides would pull in the whole admin template tree.
+            if not name.startswith('admin/')
+        ))
+    return names
+
+
+def warm_templates():
+    """Compile every project template into the cached loader."""
+    for name in project_template_names():
+        get_template(name)
+
+
+def warm_urls():
+    """Import every view module and build the resolver's reverse lookup tables."""
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+
+def warm_database_token():
+    """Fetch the Azure database token when one is used, so the first connect does not wait for it."""
+    password = connection.settings_dict['PASSWORD']
+    if getattr(password, 'expiry', None) is not None:
+        str(password)
+
+
+def warm_database():
+    """Open the database connection the first request will reuse."""
+    connection.ensure_connection()
+
+
+def warm_reference_data():
+    """Load the active sports and providers used by the report form."""
+    from clinic_reports.reference_data import get_reference_data
+
+    get_reference_data()
+
+
+WARMUP_STEPS = [
+    ('templates', warm_templates),
+    ('urls', warm_urls),
+    ('database_token', warm_database_token),
+    ('database', warm_database),
+    ('reference_data', warm_reference_data),
+]
+
+
+def warmup_steps():
+    """Return the steps to run, leaving out the connection when it would not outlive the first request."""
+    if connection.settings_dict['CONN_MAX_AGE'] != 0:
+        return list(WARMUP_STEPS)
+    return [(name, step) for name, step in WARMUP_STEPS if name != 'database']
+
+
+def run_warmup():
+    """Run every warmup step, recording per-step time and failures. Returns is_ready()."""
+    with _lock:
+        started = time.monotonic()
+        steps = {}
+        errors = {}
+        for name, step in warmup_steps():
+            step_started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                logger.error(f"Worker warmup step {name} failed: {e}")
+                errors[name] = str(e)
+            steps[name] = round((time.monotonic() - step_started) * 1000, 1)
+
+        _state.update(
+            finished=True,
+            duration_ms=round((time.monotonic() - started) * 1000, 1),
+            steps=steps,
+            errors=errors,
+        )
+        logger.info(f"Worker warmup finished in {_state['duration_ms']} ms (errors: {sorted(errors) or 'none'})")
+    return is_ready()
+
+
+def is_ready():
+    """Return True once warmup has finished without errors."""
+    return _state['finished'] and not _state['errors']
+
+
+def warmup_status():
+    """Return a copy of the warmup state for the readiness endpoint."""
+    return {
+        'ready': is_ready(),
+        'duration_ms': _state['duration_ms'],
+        'steps': dict(_state['steps']),
+        'errors': dict(_state['errors']),
+    }
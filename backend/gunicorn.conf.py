@@ -0,0 +1,36 @@
+"""Gunicorn settings used by the Docker image.
+
+SERVER_INTERFACE=asgi serves config.asgi with uvicorn workers, so one worker
+can hold many concurrent requests to the async dashboard endpoints. The
+default (wsgi) keeps the classic sync workers on config.wsgi. Streamed
+downloads (CSV export, change feed) stay bounded in memory under both; see
+core.streaming.
+
+Each worker warms up (templates, URLs, DB token and connection, reference
+data) after it is forked and before it accepts requests; set
+WORKER_WARMUP=False to skip. The DB connection is only opened when
+DB_CONN_MAX_AGE > 0, since otherwise the first request would close it.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', '3'))
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'debug')
+
+if os.environ.get('SERVER_INTERFACE', 'wsgi').lower() == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+
+
+def post_worker_init(worker):
+    """Warm the freshly forked worker before it starts accepting requests."""
+    if os.environ.get('WORKER_WARMUP', 'True').lower() not in ('1', 'true', 'yes'):
+        return
+    from core.warmup import run_warmup
+
+    run_warmup()
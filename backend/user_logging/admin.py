@@ -1,10 +1,13 @@
 from django.contrib import admin
 
+from core.query_budget import StatementTimeoutChangeListMixin
+from core.replica import ReplicaChangeListMixin
+
 from .models import AdminPortalLog
 
 
 @admin.register(AdminPortalLog)
-class AdminPortalLogAdmin(admin.ModelAdmin):
+class AdminPortalLogAdmin(ReplicaChangeListMixin, StatementTimeoutChangeListMixin, admin.ModelAdmin):
     list_display = ('created_at', 'event_type', 'username', 'email', 'ip_address', 'path')
     list_filter = ('event_type', 'created_at')
     search_fields = ('username', 'email', 'ip_address', 'path')
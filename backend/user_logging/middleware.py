@@ -1,5 +1,7 @@
+import asyncio
 from urllib.parse import parse_qsl
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 
 from .models import AdminPortalLog
@@ -36,7 +38,7 @@ def _get_ip_address(request):
     return candidate
 
 
-def _sanitize_query_string(raw_query):
+def sanitize_query_string(raw_query):
     """Redact sensitive keys and truncate query strings before logging."""
     if not raw_query:
         return ''
@@ -51,63 +53,123 @@ def _sanitize_query_string(raw_query):
     return '&'.join(f'{k}={v}' for k, v in safe_pairs)[:1000]
 
 
+# Strong references to in-flight async log writes so they are not garbage collected.
+_pending_writes = set()
+
+
+def _discard_finished_write(task):
+    """Forget a finished background log write, consuming any error it raised."""
+    _pending_writes.discard(task)
+    if not task.cancelled():
+        # Never break user requests because logging fails.
+        task.exception()
+
+
+async def drain_pending_writes():
+    """Wait for background log writes scheduled by the async middleware path."""
+    while _pending_writes:
+        await asyncio.gather(*list(_pending_writes), return_exceptions=True)
+
+
 class UserActivityLoggingMiddleware:
-    """Capture high-level navigation activity while avoiding sensitive request data."""
+    """Capture high-level navigation activity while avoiding sensitive request data.
+
+    Works under both WSGI and ASGI. In async mode the log row is written in a
+    background task so the response is not held up by the INSERT.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
-        if not getattr(settings, 'USER_LOGGING_ENABLED', True):
-            return response
+        response = self.get_response(request)
 
         try:
-            path = request.path or ''
-            excluded_prefixes = getattr(
-                settings,
-                'USER_LOGGING_EXCLUDED_PREFIXES',
-                [
-                    '/static/',
-                    '/media/',
-                    '/health/',
-                    '/favicon.ico',
-                    '/admin/jsi18n/',
-                    '/admin/user_logging/adminportallog/',
-                ],
-            )
-
-            if any(path.startswith(prefix) for prefix in excluded_prefixes):
-                return response
-
-            include_anonymous = getattr(settings, 'USER_LOGGING_INCLUDE_ANONYMOUS', False)
-            if not include_anonymous and not request.user.is_authenticated:
-                return response
-
-            user = request.user if request.user.is_authenticated else None
-            include_query_string = getattr(settings, 'USER_LOGGING_INCLUDE_QUERY_STRING', False)
-            raw_query = request.META.get('QUERY_STRING', '') if include_query_string else ''
-
-            AdminPortalLog.objects.create(
-                user=user,
-                username=user.get_username() if user else '',
-                email=getattr(user, 'email', '') if user else '',
-                event_type=AdminPortalLog.EVENT_ACTIVITY,
-                ip_address=_get_ip_address(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:512],
-                path=path[:512],
-                extra_data={
-                    'source': 'request_middleware',
-                    'method': request.method,
-                    'status_code': response.status_code,
-                    'query': _sanitize_query_string(raw_query),
-                    'query_logging_enabled': include_query_string,
-                    'is_authenticated': bool(user),
-                },
-            )
+            log_entry = self._build_log_entry(request, response, lambda: request.user)
+            if log_entry is not None:
+                AdminPortalLog.objects.create(**log_entry)
         except Exception:
             # Never break user requests because logging fails.
             pass
 
         return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+
+        try:
+            if self._should_log_path(request):
+                user = await request.auser()
+                log_entry = self._build_log_entry(request, response, lambda: user)
+                if log_entry is not None:
+                    task = asyncio.create_task(AdminPortalLog.objects.acreate(**log_entry))
+                    _pending_writes.add(task)
+                    task.add_done_callback(_discard_finished_write)
+        except Exception:
+            pass
+
+        return response
+
+    def _should_log_path(self, request):
+        """Return True when logging is enabled and the path is not excluded."""
+        if not getattr(settings, 'USER_LOGGING_ENABLED', True):
+            return False
+
+        path = request.path or ''
+        excluded_prefixes = getattr(
+            settings,
+            'USER_LOGGING_EXCLUDED_PREFIXES',
+            [
+                '/static/',
+                '/media/',
+                '/health/',
+                '/favicon.ico',
+                '/admin/jsi18n/',
+                '/admin/user_logging/adminportallog/',
+            ],
+        )
+        return not any(path.startswith(prefix) for prefix in excluded_prefixes)
+
+    def _build_log_entry(self, request, response, get_user):
+        """Return AdminPortalLog field values for this request, or None when it is not logged.
+
+        ``get_user`` is only called for paths that are logged, so excluded
+        requests never load the session user.
+        """
+        if not self._should_log_path(request):
+            return None
+
+        request_user = get_user()
+        include_anonymous = getattr(settings, 'USER_LOGGING_INCLUDE_ANONYMOUS', False)
+        if not include_anonymous and not request_user.is_authenticated:
+            return None
+
+        user = request_user if request_user.is_authenticated else None
+        include_query_string = getattr(settings, 'USER_LOGGING_INCLUDE_QUERY_STRING', False)
+        raw_query = request.META.get('QUERY_STRING', '') if include_query_string else ''
+
+        return {
+            'user': user,
+            'username': user.get_username() if user else '',
+            'email': getattr(user, 'email', '') if user else '',
+            'event_type': AdminPortalLog.EVENT_ACTIVITY,
+            'ip_address': _get_ip_address(request),
+            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:512],
+            'path': (request.path or '')[:512],
+            'extra_data': {
+                'source': 'request_middleware',
+                'method': request.method,
+                'status_code': response.status_code,
+                'query': sanitize_query_string(raw_query),
+                'query_logging_enabled': include_query_string,
+                'is_authenticated': bool(user),
+            },
+        }